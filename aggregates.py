@@ -0,0 +1,240 @@
+"""
+Search statistics for Yaswanth's AI Search Engine
+Running aggregates updated once per logged search, mergeable across
+sessions and processes and queried in constant time
+"""
+
+import math
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import STATS_CONFIG
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram in the style of HdrHistogram
+
+    Bucket bounds grow by a factor of (1 + precision), so any recorded value
+    is reported within that relative error. The bucket layout is fixed by
+    the constructor arguments; histograms with the same layout can be merged
+    by adding their counts.
+
+    Args:
+        min_value (float): Smallest distinguished value in seconds
+        max_value (float): Largest distinguished value in seconds
+        precision (float): Relative error of reported percentiles
+    """
+
+    def __init__(
+        self,
+        min_value: float = STATS_CONFIG["latency_min"],
+        max_value: float = STATS_CONFIG["latency_max"],
+        precision: float = STATS_CONFIG["latency_precision"]
+    ):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.precision = precision
+        self._log_growth = math.log1p(precision)
+        # Bucket 0 holds values <= min_value and the last holds values >= max_value
+        self.counts = np.zeros(math.ceil(math.log(max_value / min_value) / self._log_growth) + 2, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min_seen = math.inf
+        self.max_seen = 0.0
+
+    def _bucket(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        return min(len(self.counts) - 1, int(math.log(value / self.min_value) / self._log_growth) + 1)
+
+    def record(self, value: float) -> None:
+        """Add one latency in seconds"""
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min_seen = min(self.min_seen, value)
+        self.max_seen = max(self.max_seen, value)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Get the latency at a percentile
+
+        Args:
+            p (float): Percentile between 0 and 100
+
+        Returns:
+            Optional[float]: Latency in seconds, or None if nothing was recorded
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(p / 100 * self.count))
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank))
+        # Report the geometric middle of the bucket, clamped to what was seen
+        value = self.min_value * math.exp((bucket - 0.5) * self._log_growth) if bucket else self.min_value
+        return min(max(value, self.min_seen), self.max_seen)
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """
+        Add another histogram's counts into this one
+
+        Args:
+            other (LatencyHistogram): Histogram with the same layout
+
+        Returns:
+            LatencyHistogram: This histogram
+        """
+        if (other.min_value, other.max_value, other.precision) != (self.min_value, self.max_value, self.precision):
+            raise ValueError("Histograms with different bucket layouts cannot be merged")
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min_seen = min(self.min_seen, other.min_seen)
+        self.max_seen = max(self.max_seen, other.max_seen)
+        return self
+
+    def summary(self, percentiles: Iterable[int] = (50, 95, 99)) -> Dict[str, float]:
+        """Get the count and the requested percentiles as 'p50', 'p95', ..."""
+        return {'count': self.count, **{f"p{p}": self.percentile(p) for p in percentiles}}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize with sparse bucket counts"""
+        nonzero = np.flatnonzero(self.counts)
+        return {
+            'min_value': self.min_value,
+            'max_value': self.max_value,
+            'precision': self.precision,
+            'buckets': {str(int(bucket)): int(self.counts[bucket]) for bucket in nonzero},
+            'total': self.total,
+            'min_seen': self.min_seen if self.count else None,
+            'max_seen': self.max_seen
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        """Rebuild a histogram serialized with to_dict"""
+        histogram = cls(data['min_value'], data['max_value'], data['precision'])
+        for bucket, count in data['buckets'].items():
+            histogram.counts[int(bucket)] = count
+        histogram.count = int(histogram.counts.sum())
+        histogram.total = data['total']
+        histogram.min_seen = math.inf if data['min_seen'] is None else data['min_seen']
+        histogram.max_seen = data['max_seen']
+        return histogram
+
+
+class SearchAggregates:
+    """
+    Running search statistics
+
+    Each logged search updates success counters, per-source counts, a
+    streaming mean of query length and one latency histogram per pipeline
+    stage. Summaries cost the same however many searches were logged.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.successful = 0
+        self.source_counts: Counter = Counter()
+        self.mean_query_length = 0.0
+        self.stage_latency: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def add(self, query: str, sources: List[str], success: bool = True, metrics: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Update the aggregates with one search
+
+        Args:
+            query (str): Search query
+            sources (List[str]): Search sources used
+            success (bool): Whether the search succeeded
+            metrics (Optional[Dict[str, Any]]): Timing metrics with 'spans' of stage durations
+        """
+        with self._lock:
+            self.total += 1
+            self.successful += int(success)
+            self.source_counts.update(sources)
+            self.mean_query_length += (len(query) - self.mean_query_length) / self.total
+            for span in (metrics or {}).get('spans', []):
+                if span['stage'] not in self.stage_latency:
+                    self.stage_latency[span['stage']] = LatencyHistogram()
+                self.stage_latency[span['stage']].record(span['duration'])
+
+    def merge(self, other: "SearchAggregates") -> "SearchAggregates":
+        """
+        Add another set of aggregates into this one
+
+        Args:
+            other (SearchAggregates): Aggregates from another session or process
+
+        Returns:
+            SearchAggregates: These aggregates
+        """
+        # Work from a snapshot so only one lock is held at a time
+        other = SearchAggregates.from_dict(other.to_dict())
+        with self._lock:
+            combined = self.total + other.total
+            if combined:
+                self.mean_query_length = (
+                    self.mean_query_length * self.total + other.mean_query_length * other.total
+                ) / combined
+            self.total = combined
+            self.successful += other.successful
+            self.source_counts.update(other.source_counts)
+            for stage, histogram in other.stage_latency.items():
+                if stage in self.stage_latency:
+                    self.stage_latency[stage].merge(histogram)
+                else:
+                    self.stage_latency[stage] = histogram
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Get success counts, source usage, mean query length and stage latency percentiles
+
+        Returns:
+            Dict[str, Any]: Statistics in the shape of utils.get_search_statistics
+        """
+        with self._lock:
+            return {
+                'successful_searches': self.successful,
+                'failed_searches': self.total - self.successful,
+                'most_used_sources': dict(self.source_counts),
+                'average_query_length': self.mean_query_length,
+                'stage_latency': {stage: histogram.summary() for stage, histogram in self.stage_latency.items()}
+            }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for merging in another process"""
+        with self._lock:
+            return {
+                'total': self.total,
+                'successful': self.successful,
+                'source_counts': dict(self.source_counts),
+                'mean_query_length': self.mean_query_length,
+                'stage_latency': {stage: histogram.to_dict() for stage, histogram in self.stage_latency.items()}
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchAggregates":
+        """Rebuild aggregates serialized with to_dict"""
+        aggregates = cls()
+        aggregates.total = data['total']
+        aggregates.successful = data['successful']
+        aggregates.source_counts = Counter(data['source_counts'])
+        aggregates.mean_query_length = data['mean_query_length']
+        aggregates.stage_latency = {
+            stage: LatencyHistogram.from_dict(histogram) for stage, histogram in data['stage_latency'].items()
+        }
+        return aggregates
+
+
+_search_aggregates = SearchAggregates()
+
+
+def get_search_aggregates() -> SearchAggregates:
+    """Get the aggregates for every search logged in this process"""
+    return _search_aggregates
@@ -0,0 +1,211 @@
+"""
+Headless HTTP API for Yaswanth's AI Search Engine
+Exposes the search engine to non-UI clients without Streamlit reruns
+
+Run with: uvicorn api:app --host 127.0.0.1 --port 8000
+"""
+
+import hashlib
+import hmac
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Header, HTTPException
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+from aggregates import get_search_aggregates
+from config import API_CONFIG, APP_CONFIG, HISTORY_CONFIG, RESPONSE_LENGTHS, SEARCH_CONFIG
+from engine import get_engine_stats, run_search
+from history import get_history_store
+from utils import format_search_query, validate_search_sources
+
+load_dotenv()
+
+app = FastAPI(title=APP_CONFIG["name"], version=APP_CONFIG["version"], description=APP_CONFIG["description"])
+
+# Prefix of the per-caller history sessions
+HISTORY_SESSION_PREFIX = "api:"
+
+
+def get_history_session(credential: str) -> str:
+    """
+    Get the history session of an API caller
+
+    Sessions are keyed on a hash of the caller's credential, so clients only
+    see their own searches and the credential itself is never stored.
+
+    Args:
+        credential (str): Caller's Groq API key or access token
+
+    Returns:
+        str: History session id
+    """
+    return HISTORY_SESSION_PREFIX + hashlib.sha256(credential.encode()).hexdigest()[:16]
+
+
+def resolve_caller(x_groq_api_key: Optional[str], authorization: Optional[str]) -> Tuple[str, str]:
+    """
+    Authenticate a request and get its Groq API key and history session
+
+    Args:
+        x_groq_api_key (Optional[str]): Caller's Groq API key header
+        authorization (Optional[str]): Authorization header
+
+    Returns:
+        Tuple[str, str]: Groq API key and history session id
+
+    Raises:
+        HTTPException: 401 when neither a key nor a valid token is supplied
+    """
+    if x_groq_api_key:
+        return x_groq_api_key, get_history_session(x_groq_api_key)
+    return resolve_api_key(None, authorization), get_history_session(authorization.partition(" ")[2].strip())
+
+
+def resolve_api_key(x_groq_api_key: Optional[str], authorization: Optional[str]) -> str:
+    """
+    Get the Groq API key a search request may spend
+
+    Callers either send their own key, or present the SEARCH_API_TOKEN
+    configured on the server as a bearer token to use its GROQ_API_KEY.
+
+    Args:
+        x_groq_api_key (Optional[str]): Caller's Groq API key header
+        authorization (Optional[str]): Authorization header
+
+    Returns:
+        str: Groq API key
+
+    Raises:
+        HTTPException: 401 when neither a key nor a valid token is supplied
+    """
+    if x_groq_api_key:
+        return x_groq_api_key
+
+    access_token = os.getenv("SEARCH_API_TOKEN")
+    server_key = os.getenv("GROQ_API_KEY")
+    scheme, _, token = (authorization or "").partition(" ")
+    if (
+        access_token and server_key and scheme.lower() == "bearer"
+        and hmac.compare_digest(token.strip().encode(), access_token.encode())
+    ):
+        return server_key
+    raise HTTPException(
+        status_code=401,
+        detail="Missing Groq API key (X-Groq-Api-Key header, or a bearer SEARCH_API_TOKEN to use the server key)"
+    )
+
+
+class SearchRequest(BaseModel):
+    """Search request body"""
+    query: str = Field(..., min_length=1)
+    sources: List[str] = Field(default_factory=lambda: list(SEARCH_CONFIG["default_sources"]))
+    max_results: int = Field(SEARCH_CONFIG["max_results_per_source"], ge=1, le=5)
+    response_length: str = SEARCH_CONFIG["default_response_length"]
+    search_timeout: float = Field(SEARCH_CONFIG["search_timeout"], gt=0, le=60)
+    mode: str = SEARCH_CONFIG["default_search_mode"]
+    model: Optional[str] = None
+
+
+class SearchResponse(BaseModel):
+    """Search response body"""
+    query: str
+    output: str
+    sources: List[str]
+    mode: str
+    cached: bool
+    duration: float
+
+
+@app.post("/search", response_model=SearchResponse)
+async def search(
+    request: SearchRequest,
+    x_groq_api_key: Optional[str] = Header(None),
+    authorization: Optional[str] = Header(None)
+) -> Dict[str, Any]:
+    """Run a search; the agent and tools are shared across requests"""
+    api_key, session_id = resolve_caller(x_groq_api_key, authorization)
+
+    query = format_search_query(request.query)
+    sources = validate_search_sources(request.sources)
+    if not query:
+        raise HTTPException(status_code=422, detail="Invalid input. Please provide a valid search query.")
+    if not sources:
+        raise HTTPException(status_code=422, detail="Please select at least one search source.")
+    if request.response_length not in RESPONSE_LENGTHS:
+        raise HTTPException(status_code=422, detail=f"response_length must be one of {list(RESPONSE_LENGTHS)}")
+    if request.mode not in SEARCH_CONFIG["search_modes"]:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {SEARCH_CONFIG['search_modes']}")
+    if request.model and request.model not in SEARCH_CONFIG["supported_models"]:
+        raise HTTPException(status_code=422, detail=f"model must be one of {SEARCH_CONFIG['supported_models']}")
+
+    try:
+        # The pipeline is blocking, so run it on the worker thread pool
+        response = await run_in_threadpool(
+            run_search,
+            api_key,
+            request.query,
+            sources,
+            max_results=request.max_results,
+            response_length=request.response_length,
+            timeout=request.search_timeout,
+            mode=request.mode,
+            model=request.model or API_CONFIG["default_model"]
+        )
+    except Exception as e:
+        get_history_store().record_search(request.query, sources, session_id=session_id, success=False)
+        get_search_aggregates().add(request.query, sources, success=False)
+        raise HTTPException(status_code=502, detail=f"Search failed: {str(e)}")
+
+    get_history_store().record_search(request.query, sources, session_id=session_id)
+    get_search_aggregates().add(request.query, sources, metrics={"spans": [{"stage": "search", "duration": response["duration"]}]})
+
+    return {
+        "query": request.query,
+        "output": response["output"],
+        "sources": sources,
+        "mode": response["mode"],
+        "cached": response["cached"],
+        "duration": response["duration"]
+    }
+
+
+@app.get("/history")
+async def history(
+    limit: int = 5,
+    before_id: Optional[int] = None,
+    source: Optional[str] = None,
+    x_groq_api_key: Optional[str] = Header(None),
+    authorization: Optional[str] = Header(None)
+) -> List[Dict[str, Any]]:
+    """Get a page of the caller's recent searches, newest first; pass the last page's smallest id as before_id for the next"""
+    _, session_id = resolve_caller(x_groq_api_key, authorization)
+    if limit <= 0:
+        return []
+    searches = await run_in_threadpool(
+        get_history_store().get_searches,
+        session_id=session_id,
+        source=source,
+        before_id=before_id,
+        limit=min(limit, HISTORY_CONFIG["max_page_size"])
+    )
+    return [
+        {key: search[key] for key in ("id", "query", "timestamp", "sources")}
+        for search in searches
+    ]
+
+
+# A plain def so FastAPI runs the blocking SQLite and histogram reads on its thread pool
+@app.get("/stats")
+def stats(x_groq_api_key: Optional[str] = Header(None), authorization: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Get engine cache statistics and search aggregates for this process"""
+    resolve_api_key(x_groq_api_key, authorization)
+    return {**get_engine_stats(), 'searches': get_search_aggregates().summary()}
+
+
+@app.get("/health")
+async def health() -> Dict[str, str]:
+    """Liveness check"""
+    return {"status": "ok", "version": APP_CONFIG["version"]}
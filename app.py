@@ -6,18 +6,21 @@ A comprehensive search platform combining multiple AI-powered search tools
 
 import streamlit as st
 import os
+import uuid
 from datetime import datetime
-import json
 from typing import List, Dict, Any
 
-# LangChain imports
-from langchain_groq import ChatGroq
-from langchain_community.utilities import ArxivAPIWrapper, WikipediaAPIWrapper
-from langchain_community.tools import ArxivQueryRun, WikipediaQueryRun, DuckDuckGoSearchRun
-from langchain.agents import initialize_agent, AgentType
-from langchain_community.callbacks.streamlit import StreamlitCallbackHandler
+# LangChain integrations are loaded by the engine when a search first needs them
 from dotenv import load_dotenv
 
+from callbacks import StreamingAnswerHandler, TracingHandler
+from config import EXPORT_CONFIG, HISTORY_CONFIG, SEARCH_CONFIG, SEARCH_SOURCES, is_feature_enabled
+from engine import get_prefetcher, run_search, select_route
+from export import export_to_bytes
+from history import get_history_store
+from transcript import ChatTranscript
+from utils import get_search_statistics, log_search_activity, validate_search_sources
+
 # Load environment variables
 load_dotenv()
 
@@ -87,15 +90,17 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if "search_history" not in st.session_state:
-    st.session_state.search_history = []
+# Initialize session state; searches and messages live in the history store
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if "total_searches" not in st.session_state:
     st.session_state.total_searches = 0
-if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {"role": "assistant", "content": "👋 Welcome to my AI Search Engine! I can help you search across Wikipedia, ArXiv research papers, and the web. What would you like to explore today?"}
-    ]
+
+history_store = get_history_store()
+if "transcript" not in st.session_state:
+    st.session_state.transcript = ChatTranscript(st.session_state.session_id, history_store)
+transcript = st.session_state.transcript
+WELCOME_MESSAGE = {"role": "assistant", "content": "👋 Welcome to my AI Search Engine! I can help you search across Wikipedia, ArXiv research papers, and the web. What would you like to explore today?"}
 
 # Header
 st.markdown("""
@@ -120,8 +125,8 @@ api_key = st.sidebar.text_input(
 st.sidebar.markdown("### 🔧 Search Options")
 search_sources = st.sidebar.multiselect(
     "Select search sources:",
-    ["Wikipedia", "ArXiv", "Web Search"],
-    default=["Wikipedia", "ArXiv", "Web Search"],
+    list(SEARCH_SOURCES),
+    default=SEARCH_CONFIG["default_sources"],
     help="Choose which sources to include in your search"
 )
 
@@ -130,12 +135,40 @@ with st.sidebar.expander("🔬 Advanced Settings"):
     max_results = st.slider("Max results per source:", 1, 5, 2)
     response_length = st.selectbox("Response length:", ["Short", "Medium", "Detailed"], index=1)
     search_timeout = st.slider("Search timeout (seconds):", 10, 60, 30)
+    search_mode = st.selectbox(
+        "Search mode:",
+        SEARCH_CONFIG["search_modes"],
+        index=SEARCH_CONFIG["search_modes"].index(SEARCH_CONFIG["default_search_mode"]),
+        help="Parallel retrieval queries all sources at once and answers with a single LLM call"
+    )
+    prefetch_followups = st.checkbox(
+        "Prefetch follow-up searches",
+        value=is_feature_enabled("speculative_prefetch"),
+        help="Fetch suggested follow-up searches in the background so clicking one is answered from cache"
+    )
 
 # Statistics
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 📊 Statistics")
 st.sidebar.metric("Total Searches", st.session_state.total_searches)
-st.sidebar.metric("Session Duration", f"{len(st.session_state.messages)} interactions")
+st.sidebar.metric("Session Duration", f"{transcript.total + 1} interactions")
+
+stage_latency = get_search_statistics()["stage_latency"]
+if stage_latency:
+    with st.sidebar.expander("⏱️ Latency by Stage"):
+        for stage, latency in sorted(stage_latency.items()):
+            st.markdown(
+                f"**{stage}** ({latency['count']} calls)  \n"
+                f"p50 {latency['p50']:.2f}s · p95 {latency['p95']:.2f}s · p99 {latency['p99']:.2f}s"
+            )
+
+prefetch_stats = get_prefetcher().stats()
+if prefetch_stats.get("warmed"):
+    st.sidebar.metric(
+        "Prefetch Hit Rate",
+        f"{prefetch_stats['hit_rate']:.0%}",
+        help=f"{prefetch_stats.get('used', 0)} of {prefetch_stats['warmed']} prefetched results were used"
+    )
 
 # Main Content Area
 col1, col2 = st.columns([2, 1])
@@ -153,88 +186,97 @@ with col1:
     
     st.markdown('</div>', unsafe_allow_html=True)
     
-    # Chat Interface
-    for message in st.session_state.messages:
+    # A clicked follow-up suggestion runs as the next search
+    user_input = user_input or st.session_state.pop("followup_query", None)
+    
+    # Chat Interface; only the recent window and any loaded older pages are rendered
+    if transcript.has_older():
+        st.button("⬆️ Load older messages", key="load_older", on_click=transcript.load_older)
+    else:
+        st.chat_message("assistant").write(WELCOME_MESSAGE["content"])
+    for message in transcript.visible():
         with st.chat_message(message["role"]):
             st.write(message["content"])
     
     # Process search
     if user_input and api_key:
         # Add user message
-        st.session_state.messages.append({"role": "user", "content": user_input})
+        transcript.append("user", user_input)
         st.chat_message("user").write(user_input)
         
-        # Initialize tools based on selection
-        tools = []
-        
-        if "Wikipedia" in search_sources:
-            wiki_wrapper = WikipediaAPIWrapper(
-                top_k_results=max_results, 
-                doc_content_chars_max=300 if response_length == "Short" else 500 if response_length == "Medium" else 800
-            )
-            wiki_tool = WikipediaQueryRun(api_wrapper=wiki_wrapper)
-            tools.append(wiki_tool)
-        
-        if "ArXiv" in search_sources:
-            arxiv_wrapper = ArxivAPIWrapper(
-                top_k_results=max_results, 
-                doc_content_chars_max=300 if response_length == "Short" else 500 if response_length == "Medium" else 800
-            )
-            arxiv_tool = ArxivQueryRun(api_wrapper=arxiv_wrapper)
-            tools.append(arxiv_tool)
-        
-        if "Web Search" in search_sources:
-            web_tool = DuckDuckGoSearchRun(name="WebSearch")
-            tools.append(web_tool)
-        
-        if tools:
-            # Initialize LLM
-            llm = ChatGroq(
-                groq_api_key=api_key,
-                model_name="Gemma2-9b-it",
-                streaming=True,
-                temperature=0.7
-            )
-            
-            # Create agent
-            search_agent = initialize_agent(
-                tools, 
-                llm, 
-                agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-                handle_parsing_errors=True,
-                verbose=True
-            )
+        if validate_search_sources(search_sources):
+            from langchain_community.callbacks.streamlit import StreamlitCallbackHandler
             
             # Generate response
             with st.chat_message("assistant"):
                 st_callback = StreamlitCallbackHandler(st.container(), expand_new_thoughts=True)
+                answer_placeholder = st.empty()
+                stream_callback = StreamingAnswerHandler(
+                    answer_placeholder,
+                    answer_prefix="Final Answer:" if select_route(user_input, search_sources, search_mode) == "agent" else None
+                )
+                tracer = TracingHandler()
                 
                 try:
-                    response = search_agent.invoke(
-                        {"input": user_input}, 
-                        callbacks=[st_callback]
+                    response = run_search(
+                        api_key,
+                        user_input,
+                        search_sources,
+                        max_results=max_results,
+                        response_length=response_length,
+                        timeout=search_timeout,
+                        mode=search_mode,
+                        callbacks=[st_callback, stream_callback, tracer],
+                        tool_callbacks=[tracer],
+                        prefetch=prefetch_followups,
+                        conversation=transcript.summary(exclude_last=1)
                     )
                     
-                    # Add to session state
-                    st.session_state.messages.append({
-                        "role": "assistant", 
-                        "content": response["output"]
-                    })
+                    if response["cached"]:
+                        st.caption(f"⚡ Answered from cache (similar to: \"{response['cached_query']}\")")
+                    elif response.get("budget_exhausted"):
+                        st.caption("⏳ Search budget reached; showing partial findings")
+                    
+                    # Add to the transcript
+                    transcript.append("assistant", response["output"])
                     
                     # Update statistics
                     st.session_state.total_searches += 1
-                    st.session_state.search_history.append({
-                        "query": user_input,
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "sources": search_sources
-                    })
                     
-                    st.write(response["output"])
+                    # Replace the streamed text with the exact final answer
+                    answer_placeholder.markdown(response["output"])
+                    
+                    stream_metrics = stream_callback.metrics()
+                    log_search_activity(
+                        user_input,
+                        search_sources,
+                        success=True,
+                        metrics={**stream_metrics, **tracer.summary()}
+                    )
+                    if stream_metrics["time_to_first_answer_token"] is not None:
+                        st.caption(
+                            f"⏱️ First token in {stream_metrics['time_to_first_answer_token']:.2f}s"
+                            + (f" · {stream_metrics['tokens_per_second']:.0f} tokens/s" if stream_metrics["tokens_per_second"] else "")
+                        )
+                    
+                    for i, suggestion in enumerate(response.get("suggestions", [])):
+                        st.button(
+                            f"🔎 {suggestion}",
+                            key=f"followup_{st.session_state.total_searches}_{i}",
+                            on_click=st.session_state.__setitem__,
+                            args=("followup_query", suggestion)
+                        )
                     
                 except Exception as e:
                     error_msg = f"❌ Search failed: {str(e)}"
-                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                    st.write(error_msg)
+                    transcript.append("assistant", error_msg)
+                    log_search_activity(
+                        user_input,
+                        search_sources,
+                        success=False,
+                        metrics={**stream_callback.metrics(), **tracer.summary()}
+                    )
+                    answer_placeholder.write(error_msg)
         else:
             st.warning("⚠️ Please select at least one search source!")
     
@@ -266,9 +308,14 @@ with col2:
     """, unsafe_allow_html=True)
     
     # Search History
-    if st.session_state.search_history:
+    recent_searches = history_store.get_searches(
+        session_id=st.session_state.session_id,
+        success=True,
+        limit=HISTORY_CONFIG["recent_searches"]
+    )
+    if recent_searches:
         st.markdown("### 📚 Recent Searches")
-        for i, search in enumerate(st.session_state.search_history[-5:]):
+        for i, search in enumerate(reversed(recent_searches)):
             st.markdown(f"""
             <div class="search-history-item">
                 <strong>{search['query']}</strong><br>
@@ -286,12 +333,17 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Export functionality
-if st.session_state.search_history:
-    if st.sidebar.button("📥 Export Search History"):
-        history_json = json.dumps(st.session_state.search_history, indent=2)
-        st.sidebar.download_button(
-            label="Download JSON",
-            data=history_json,
-            file_name=f"search_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-            mime="application/json"
-        )
\ No newline at end of file
+if st.session_state.total_searches:
+    export_format = st.sidebar.selectbox("Export format:", list(EXPORT_CONFIG["formats"]))
+    mime, extension = EXPORT_CONFIG["formats"][export_format]
+    session_id = st.session_state.session_id
+    # The export is only built when the download is clicked, streamed from the store in pages
+    st.sidebar.download_button(
+        label="📥 Export Search History",
+        data=lambda: export_to_bytes(
+            history_store.iter_searches(session_id=session_id, success=True),
+            export_format
+        ),
+        file_name=f"search_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+        mime=mime
+    )
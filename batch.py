@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Batch query runner for Yaswanth's AI Search Engine
+Answers a JSONL file of queries with bounded concurrency and writes results
+incrementally so an interrupted run can resume where it stopped
+
+Input lines are either JSON strings or objects with a "query" key and optional
+"sources", "max_results", "response_length" and "mode" overrides. Other
+lines are written as failed results.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from config import BATCH_CONFIG, SEARCH_CONFIG
+from engine import run_search
+from ratelimit import set_rate_limit
+
+
+def read_queries(input_path: str) -> Iterator[Tuple[int, str]]:
+    """
+    Stream query lines from a JSONL file
+
+    Lines are parsed by the workers, so a malformed line fails on its own.
+
+    Args:
+        input_path (str): Path to the input JSONL file
+
+    Yields:
+        Tuple[int, str]: 1-based line number and non-empty line
+    """
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if line:
+                yield line_number, line
+
+
+def parse_query(line: str) -> Dict[str, Any]:
+    """
+    Parse one input line into a query record
+
+    Args:
+        line (str): JSON string or object with a "query" key
+
+    Returns:
+        Dict[str, Any]: Query record
+
+    Raises:
+        ValueError: The line is not valid JSON or has no query string
+    """
+    record = json.loads(line)
+    if isinstance(record, str):
+        record = {"query": record}
+    if not isinstance(record, dict) or not isinstance(record.get("query"), str):
+        raise ValueError('Expected a JSON string or an object with a "query" string')
+    return record
+
+
+def load_completed(output_path: str) -> Set[int]:
+    """
+    Get the input line numbers already answered successfully
+
+    A partially written last line from a crash is ignored.
+
+    Args:
+        output_path (str): Path to the output JSONL file
+
+    Returns:
+        Set[int]: Completed input line numbers
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("success"):
+                completed.add(record["line"])
+    return completed
+
+
+def _open_output(output_path: str):
+    """Open the output for appending, terminating any torn last line"""
+    needs_newline = False
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+
+    output = open(output_path, "a", encoding="utf-8")
+    if needs_newline:
+        output.write("\n")
+    return output
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    api_key: str,
+    workers: int = BATCH_CONFIG["workers"],
+    rate_limits: Optional[Dict[str, float]] = None,
+    search: Callable[..., Optional[Dict[str, Any]]] = run_search
+) -> Dict[str, int]:
+    """
+    Answer every query in the input file that is not already in the output
+
+    Args:
+        input_path (str): Path to the input JSONL file
+        output_path (str): Path to the output JSONL file (appended to)
+        api_key (str): Groq API key
+        workers (int): Number of concurrent searches
+        rate_limits (Optional[Dict[str, float]]): Requests per second per source
+        search (Callable): Search function, defaults to engine.run_search
+
+    Returns:
+        Dict[str, int]: Counts of submitted, succeeded, failed and skipped queries
+    """
+    limits = BATCH_CONFIG["rate_limits"] if rate_limits is None else rate_limits
+    for source, rate in limits.items():
+        set_rate_limit(source, rate)
+
+    completed = load_completed(output_path)
+    summary = {"submitted": 0, "succeeded": 0, "failed": 0, "skipped": 0}
+    write_lock = threading.Lock()
+    pending = threading.BoundedSemaphore(workers * BATCH_CONFIG["max_pending_per_worker"])
+
+    def answer(line_number: int, line: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result = {"line": line_number, "query": ""}
+        try:
+            record = parse_query(line)
+            result["query"] = record["query"]
+            response = search(
+                api_key,
+                record["query"],
+                record.get("sources", SEARCH_CONFIG["default_sources"]),
+                max_results=record.get("max_results", SEARCH_CONFIG["max_results_per_source"]),
+                response_length=record.get("response_length", SEARCH_CONFIG["default_response_length"]),
+                mode=record.get("mode", SEARCH_CONFIG["default_search_mode"])
+            )
+            if response is None:
+                raise ValueError("No valid search source selected")
+            result.update({"success": True, "output": response["output"], "cached": response.get("cached", False)})
+        except Exception as e:
+            result.update({"success": False, "error": str(e)})
+        result["duration"] = round(time.perf_counter() - start, 3)
+        return result
+
+    with _open_output(output_path) as output, ThreadPoolExecutor(max_workers=workers) as pool:
+        def write_result(future) -> None:
+            try:
+                result = future.result()
+                with write_lock:
+                    output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    output.flush()
+                    summary["succeeded" if result["success"] else "failed"] += 1
+            finally:
+                pending.release()
+
+        for line_number, line in read_queries(input_path):
+            if line_number in completed:
+                summary["skipped"] += 1
+                continue
+            # Bound the number of queued queries so large files are streamed
+            pending.acquire()
+            summary["submitted"] += 1
+            pool.submit(answer, line_number, line).add_done_callback(write_result)
+
+    return summary
+
+
+def parse_rate_limits(values) -> Dict[str, float]:
+    """Parse SOURCE=RATE arguments into a rate limit mapping"""
+    limits = dict(BATCH_CONFIG["rate_limits"])
+    for value in values or []:
+        source, _, rate = value.partition("=")
+        limits[source] = float(rate) if rate else None
+    return limits
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of queries")
+    parser.add_argument("input", help="Input JSONL file of queries")
+    parser.add_argument("--output", help="Output JSONL file (default: <input>.results.jsonl)")
+    parser.add_argument("--workers", type=int, default=BATCH_CONFIG["workers"], help="Concurrent searches")
+    parser.add_argument(
+        "--rate-limit",
+        action="append",
+        metavar="SOURCE=RATE",
+        help="Requests per second for a source, e.g. 'ArXiv=0.5' (repeatable)"
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        print("❌ GROQ_API_KEY is not set")
+        return 1
+
+    output_path = args.output or f"{os.path.splitext(args.input)[0]}.results.jsonl"
+    print(f"🔄 Answering queries from {args.input} into {output_path} with {args.workers} workers...")
+    summary = run_batch(
+        args.input,
+        output_path,
+        api_key,
+        workers=args.workers,
+        rate_limits=parse_rate_limits(args.rate_limit)
+    )
+    print(
+        f"✅ Batch finished: {summary['succeeded']} succeeded, {summary['failed']} failed, "
+        f"{summary['skipped']} already done"
+    )
+    return 0 if summary["failed"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
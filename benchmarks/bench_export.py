@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Export benchmark for Yaswanth's AI Search Engine
+Compares building the whole export as one string with the streaming
+exporters, on synthetic history records written to a temporary file
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export import write_export
+
+SOURCES = ["Wikipedia", "ArXiv", "Web Search", "Local Knowledge"]
+WORDS = "quantum computing neural network transformer protein folding climate \"model\" graph, encryption".split()
+
+def make_records(count: int, seed: int = 7):
+    """Generate history records lazily; some queries contain quotes and commas"""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "timestamp": f"2024-01-{1 + i % 28:02d} 12:{i % 60:02d}:{i % 59:02d}",
+            "query": ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 8))),
+            "sources": rng.sample(SOURCES, rng.randint(1, 3))
+        }
+
+def materialized_json(records, fileobj):
+    """Previous export: the full list and the full string in memory"""
+    fileobj.write(json.dumps(list(records), indent=2, default=str).encode("utf-8"))
+
+def materialized_csv(records, fileobj):
+    """Previous export: hand-quoted CSV lines joined into one string"""
+    csv_lines = ['timestamp,query,sources']
+    for item in list(records):
+        csv_lines.append(','.join([item['timestamp'], f'"{item["query"]}"', f'"{",".join(item["sources"])}"']))
+    fileobj.write('\n'.join(csv_lines).encode("utf-8"))
+
+def run_method(name: str, rows: int) -> dict:
+    """Run one export method; called in a fresh process so peak RSS belongs to it alone"""
+    with tempfile.TemporaryFile() as fileobj:
+        start = time.perf_counter()
+        METHODS[name](make_records(rows), fileobj)
+        seconds = time.perf_counter() - start
+        size = fileobj.tell()
+    return {
+        "seconds": seconds,
+        "bytes": size,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+METHODS = {
+    "json (one string)": materialized_json,
+    "csv (one string)": materialized_csv,
+    "json (streaming)": lambda records, f: write_export(records, f, "json"),
+    "ndjson (streaming)": lambda records, f: write_export(records, f, "ndjson"),
+    "csv (streaming)": lambda records, f: write_export(records, f, "csv"),
+    "parquet (streaming)": lambda records, f: write_export(records, f, "parquet")
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark search history export")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="History records to export")
+    parser.add_argument("--methods", nargs="+", choices=list(METHODS), default=list(METHODS), help="Methods to run")
+    args = parser.parse_args()
+
+    print(f"Exporting {args.rows:,} history records")
+    context = multiprocessing.get_context("spawn")
+    for name in args.methods:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_method, name, args.rows).result()
+        print(
+            f"  {name:22s} {result['seconds']:7.2f} s  {result['bytes'] / 1e6:8.1f} MB written"
+            f"  peak RSS {result['peak_rss_mb']:8.1f} MB",
+            flush=True
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark for Yaswanth's AI Search Engine
+Drives the engine search pipeline against fake Groq, Wikipedia, ArXiv and
+DuckDuckGo backends with configurable latency and payload sizes, under
+sequential and concurrent load, and saves the results as JSON
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.tools import Tool
+from pydantic import ConfigDict
+
+import engine
+from cache import ToolResultCache, set_tool_result_cache
+from config import ENGINE_CONFIG, FEATURES, SEARCH_CONFIG, SEARCH_SOURCES
+from ratelimit import set_rate_limit
+from utils import calculate_percentiles
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TOOL_NAMES = {"Wikipedia": "wikipedia", "ArXiv": "arxiv", "Web Search": "WebSearch", "Local Knowledge": "LocalKnowledge"}
+WORDS = (
+    "quantum neural protein climate graph galaxy enzyme market language vision "
+    "robot energy battery genome ocean crystal network fusion vaccine semiconductor"
+).split()
+
+
+class LatencyModel:
+    """
+    Lognormal latency distribution with a given mean
+
+    Args:
+        mean_ms (float): Mean latency in milliseconds
+        jitter (float): Lognormal sigma; 0 gives a constant latency
+        seed (Optional[int]): Random seed
+    """
+
+    def __init__(self, mean_ms: float, jitter: float = 0.3, seed: Optional[int] = None):
+        self.mean_ms = mean_ms
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """Draw a latency in seconds"""
+        if self.mean_ms <= 0:
+            return 0.0
+        if self.jitter <= 0:
+            return self.mean_ms / 1000
+        mu = math.log(self.mean_ms) - self.jitter ** 2 / 2
+        with self._lock:
+            return self._random.lognormvariate(mu, self.jitter) / 1000
+
+
+class FakeSearchLLM(LLM):
+    """
+    Stand-in for ChatGroq that follows the ReAct format
+
+    It calls each tool in turn for tool_calls steps, then gives a final
+    answer. Synthesis prompts from parallel retrieval are answered directly.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    tool_names: List[str]
+    latency: LatencyModel
+    tool_calls: int = 1
+    answer_chars: int = 400
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-search-llm"
+
+    def _answer(self) -> str:
+        text = ("Synthetic answer text. " * (self.answer_chars // 23 + 1))[:self.answer_chars]
+        return text
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        time.sleep(self.latency.sample())
+
+        if "Search results:" in prompt:
+            return self._answer()
+
+        question = prompt.rsplit("Question:", 1)[-1]
+        query = question.split("\n", 1)[0].strip()
+        steps = question.count("Observation:")
+        if steps < self.tool_calls and self.tool_names:
+            tool = self.tool_names[steps % len(self.tool_names)]
+            return f" I should search {tool}.\nAction: {tool}\nAction Input: {query}"
+        return f" I now know the final answer\nFinal Answer: {self._answer()}"
+
+
+def make_tool_builder(latencies: Dict[str, LatencyModel], payload_chars: int):
+    """
+    Build a replacement for engine.build_search_tool returning fake tools
+
+    Args:
+        latencies (Dict[str, LatencyModel]): Latency per source
+        payload_chars (int): Characters returned per result
+
+    Returns:
+        Callable: (source, max_results, response_length) -> Tool
+    """
+    def build(source: str, max_results: int, response_length: str) -> Tool:
+        latency = latencies[source]
+        size = min(payload_chars, engine.get_content_length(response_length)) * max_results
+
+        def run(query: str) -> str:
+            time.sleep(latency.sample())
+            return (f"{source} result for {query}. " * (size // 20 + 1))[:size]
+
+        return Tool(name=TOOL_NAMES[source], func=run, description=f"Fake {source} search")
+
+    return build
+
+
+@contextmanager
+def offline_backends(llm: FakeSearchLLM, tool_builder, answer_cache: bool = False):
+    """
+    Route the engine to fake backends with fresh in-memory caches
+
+    Source rate limits are lifted, since no request reaches the real APIs.
+
+    Args:
+        llm (FakeSearchLLM): LLM returned for every API key and model
+        tool_builder (Callable): Replacement for engine.build_search_tool
+        answer_cache (bool): Keep the semantic answer cache enabled
+    """
+    original_llm, original_tool = engine.build_llm, engine.build_search_tool
+    original_feature = FEATURES.get("semantic_answer_cache", False)
+    original_verbose = ENGINE_CONFIG["agent_verbose"]
+    original_rates = {source: settings.get("rate_limit") for source, settings in SEARCH_SOURCES.items()}
+
+    for source in SEARCH_SOURCES:
+        SEARCH_SOURCES[source]["rate_limit"] = None
+        set_rate_limit(source, None)
+    engine.build_llm = lambda api_key, model=None: llm
+    engine.build_search_tool = tool_builder
+    FEATURES["semantic_answer_cache"] = answer_cache
+    ENGINE_CONFIG["agent_verbose"] = False
+    engine.reset_caches()
+    set_tool_result_cache(ToolResultCache())
+    try:
+        yield
+    finally:
+        engine.build_llm, engine.build_search_tool = original_llm, original_tool
+        FEATURES["semantic_answer_cache"] = original_feature
+        ENGINE_CONFIG["agent_verbose"] = original_verbose
+        for source, rate in original_rates.items():
+            SEARCH_SOURCES[source]["rate_limit"] = rate
+            set_rate_limit(source, None)
+        engine.reset_caches()
+        set_tool_result_cache(None)
+
+
+def make_queries(count: int, distinct: int, seed: int = 11) -> List[str]:
+    """Generate count queries drawn from distinct topics"""
+    rng = random.Random(seed)
+    topics = [' '.join(rng.sample(WORDS, 4)) for _ in range(max(1, distinct))]
+    return [f"What is {topics[i % len(topics)]}?" for i in range(count)]
+
+
+def run_load(queries: List[str], concurrency: int, mode: str, sources: List[str], timeout: float) -> Dict[str, Any]:
+    """
+    Run queries through engine.run_search with a fixed number of workers
+
+    Returns:
+        Dict[str, Any]: Throughput, latency percentiles and error count
+    """
+    latencies: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def one(query: str) -> None:
+        start = time.perf_counter()
+        try:
+            engine.run_search("gsk_offline_benchmark_key", query, sources, timeout=timeout, mode=mode)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, queries))
+    duration = time.perf_counter() - start
+
+    return {
+        'requests': len(queries),
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'duration_s': round(duration, 3),
+        'throughput_qps': round(len(latencies) / duration, 2) if duration else 0.0,
+        'latency_s': {
+            'mean': round(sum(latencies) / len(latencies), 4) if latencies else None,
+            **{name: round(value, 4) for name, value in calculate_percentiles(latencies).items()}
+        }
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def git_commit() -> Optional[str]:
+    """Current git commit, if available"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every scenario and collect the report"""
+    sources = list(SEARCH_CONFIG["default_sources"])
+    tool_latencies = {
+        "Wikipedia": LatencyModel(args.wikipedia_ms, args.jitter, seed=1),
+        "ArXiv": LatencyModel(args.arxiv_ms, args.jitter, seed=2),
+        "Web Search": LatencyModel(args.web_ms, args.jitter, seed=3)
+    }
+    llm = FakeSearchLLM(
+        tool_names=[TOOL_NAMES[source] for source in sources],
+        latency=LatencyModel(args.llm_ms, args.jitter, seed=4),
+        tool_calls=args.tool_calls,
+        answer_chars=args.answer_chars
+    )
+
+    scenarios = {}
+    for mode in SEARCH_CONFIG["search_modes"]:
+        for label, concurrency in (("sequential", 1), ("concurrent", args.concurrency)):
+            queries = make_queries(args.requests, args.distinct_queries or args.requests)
+            with offline_backends(llm, make_tool_builder(tool_latencies, args.payload_chars), args.answer_cache):
+                scenarios[f"{mode} / {label}"] = run_load(queries, concurrency, mode, sources, args.timeout)
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'config': vars(args),
+        'scenarios': scenarios,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print throughput and p95 changes against a baseline report"""
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for name, result in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        qps_change = (result['throughput_qps'] / previous['throughput_qps'] - 1) * 100 if previous['throughput_qps'] else 0.0
+        p95, previous_p95 = result['latency_s'].get('p95'), previous['latency_s'].get('p95')
+        p95_change = (p95 / previous_p95 - 1) * 100 if p95 and previous_p95 else 0.0
+        print(f"  {name:<36} throughput {qps_change:+6.1f}%   p95 {p95_change:+6.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the search pipeline")
+    parser.add_argument("--requests", type=int, default=40, help="Queries per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Workers for the concurrent scenarios")
+    parser.add_argument("--distinct-queries", type=int, default=0, help="Distinct queries (default: all unique)")
+    parser.add_argument("--llm-ms", type=float, default=300, help="Mean fake LLM latency")
+    parser.add_argument("--wikipedia-ms", type=float, default=250, help="Mean fake Wikipedia latency")
+    parser.add_argument("--arxiv-ms", type=float, default=500, help="Mean fake ArXiv latency")
+    parser.add_argument("--web-ms", type=float, default=700, help="Mean fake web search latency")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Lognormal sigma for all latencies")
+    parser.add_argument("--tool-calls", type=int, default=3, help="Tool calls the fake agent makes per query")
+    parser.add_argument("--payload-chars", type=int, default=500, help="Characters per fake tool result")
+    parser.add_argument("--answer-chars", type=int, default=400, help="Characters per fake answer")
+    parser.add_argument("--timeout", type=float, default=SEARCH_CONFIG["search_timeout"], help="Per-source timeout")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache enabled")
+    parser.add_argument("--output", default="bench_results.json", help="Where to save the JSON report")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="Report changes against a saved report")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args)
+
+    print(f"{'scenario':<38}{'qps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+    for name, result in report['scenarios'].items():
+        latency = result['latency_s']
+        print(
+            f"{name:<38}{result['throughput_qps']:>8.2f}{latency.get('p50', 0):>9.3f}"
+            f"{latency.get('p95', 0):>9.3f}{latency.get('p99', 0):>9.3f}{result['errors']:>8}"
+        )
+    print(f"Peak RSS: {report['peak_rss_mb']} MB")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved report to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for relevance scoring in Yaswanth's AI Search Engine
+Compares per-string scoring with the batch scoring API on synthetic snippets
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import STOP_WORDS, score_search_results
+
+VOCABULARY = (
+    "quantum computing machine learning neural network transformer attention "
+    "protein folding climate model graph database encryption qubit algorithm "
+    "research paper dataset benchmark optimization gradient training inference"
+).split()
+
+def make_snippets(count: int, words: int, seed: int = 7) -> list:
+    """Generate random snippets drawn from a small vocabulary"""
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(VOCABULARY) for _ in range(words)) for _ in range(count)]
+
+def original_extract_keywords(query: str) -> list:
+    """Previous extract_keywords, without the shared normalizer's cache"""
+    stop_words = set(STOP_WORDS)
+    words = re.findall(r'\b\w+\b', query.lower())
+    return [word for word in words if word not in stop_words and len(word) > 2]
+
+def per_string_score(query: str, result: str) -> float:
+    """Previous calculate_search_score: re-extracts keywords for every result"""
+    if not query or not result:
+        return 0.0
+    query_keywords = original_extract_keywords(query)
+    result_lower = result.lower()
+    if not query_keywords:
+        return 0.0
+    matches = sum(1 for keyword in query_keywords if keyword in result_lower)
+    return min(matches / len(query_keywords), 1.0)
+
+def timed(func, repeat: int) -> float:
+    """Return the best wall time of several runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark relevance scoring")
+    parser.add_argument("--snippets", type=int, default=10000, help="Number of result snippets")
+    parser.add_argument("--words", type=int, default=60, help="Words per snippet")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per method (best is reported)")
+    args = parser.parse_args()
+    
+    query = "latest research on quantum computing algorithms and neural network training"
+    snippets = make_snippets(args.snippets, args.words)
+    
+    baseline = [per_string_score(query, snippet) for snippet in snippets]
+    assert score_search_results(query, snippets) == baseline
+    
+    per_string = timed(lambda: [per_string_score(query, snippet) for snippet in snippets], args.repeat)
+    batch = timed(lambda: score_search_results(query, snippets), args.repeat)
+    bm25 = timed(lambda: score_search_results(query, snippets, method='bm25'), args.repeat)
+    
+    print(f"Scoring {args.snippets} snippets of {args.words} words")
+    print(f"  per-string keyword score: {per_string * 1000:8.1f} ms")
+    print(f"  batch keyword score:      {batch * 1000:8.1f} ms  ({per_string / batch:.1f}x)")
+    print(f"  batch BM25 score:         {bm25 * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
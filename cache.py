@@ -0,0 +1,549 @@
+"""
+Caching primitives for Yaswanth's AI Search Engine
+Contains thread-safe in-memory caches shared across Streamlit reruns and users,
+a two-tier (memory + SQLite) cache for search tool results and a semantic
+cache for final answers
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from config import CACHE_CONFIG, SEARCH_SOURCES, SEMANTIC_CACHE_CONFIG
+from utils import format_search_query
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with a fixed number of entries
+
+    Args:
+        maxsize (int): Maximum number of entries kept before evicting the oldest
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = max(1, maxsize)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._building: Dict[Hashable, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value and mark it as recently used
+
+        Args:
+            key (Hashable): Cache key
+            default (Any): Value returned when the key is missing
+
+        Returns:
+            Any: Cached value or default
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry when full
+
+        Args:
+            key (Hashable): Cache key
+            value (Any): Value to store
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Get a cached value, building and storing it on a miss
+
+        The factory runs outside the cache lock, so a slow build only blocks
+        callers waiting for the same key; they share its result or exception.
+
+        Args:
+            key (Hashable): Cache key
+            factory (Callable[[], Any]): Builds the value when it is not cached
+
+        Returns:
+            Any: Cached or newly built value
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            future = self._building.get(key)
+            leader = future is None
+            if leader:
+                future = self._building[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            value = factory()
+            self.set(key, value)
+            future.set_result(value)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._building.pop(key, None)
+        return value
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Remove a key and return its value"""
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters
+
+        Returns:
+            Dict[str, int]: Size, hits, misses and evictions
+        """
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+def normalize_cache_query(query: str) -> str:
+    """
+    Normalize a query for use in cache keys
+
+    Args:
+        query (str): Raw search query
+
+    Returns:
+        str: Formatted, lowercased query
+    """
+    return format_search_query(query).lower()
+
+
+class ToolResultCache:
+    """
+    Two-tier cache for search tool results
+
+    Entries live in an in-memory LRU and in a SQLite table that survives
+    restarts. Each source has its own TTL and the table is pruned to a
+    maximum number of rows.
+
+    Args:
+        db_path (Optional[str]): SQLite file path, or None for memory only
+        memory_entries (int): Maximum entries in the memory tier
+        disk_max_entries (int): Maximum rows kept in the SQLite tier
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        memory_entries: int = CACHE_CONFIG["memory_entries"],
+        disk_max_entries: int = CACHE_CONFIG["disk_max_entries"]
+    ):
+        self.db_path = db_path
+        self.disk_max_entries = disk_max_entries
+        self._memory = LRUCache(memory_entries)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tool_results ("
+                "key TEXT PRIMARY KEY, source TEXT, value TEXT, "
+                "created_at REAL, expires_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tool_results_created ON tool_results (created_at)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(source: str, query: str, params: Tuple = ()) -> str:
+        """
+        Build the cache key for a tool call
+
+        Args:
+            source (str): Search source name
+            query (str): Raw search query
+            params (Tuple): Tool settings such as top_k_results and doc_content_chars_max
+
+        Returns:
+            str: Stable hex digest key
+        """
+        payload = json.dumps([source, normalize_cache_query(query), list(params)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_ttl(source: str) -> float:
+        """Get the TTL in seconds configured for a source"""
+        return SEARCH_SOURCES.get(source, {}).get("cache_ttl", CACHE_CONFIG["default_ttl"])
+
+    def _count(self, source: str, event: str) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(source, {})
+            counters[event] = counters.get(event, 0) + 1
+
+    def get(self, source: str, query: str, params: Tuple = ()) -> Optional[str]:
+        """
+        Look up a cached tool result
+
+        Args:
+            source (str): Search source name
+            query (str): Raw search query
+            params (Tuple): Tool settings included in the key
+
+        Returns:
+            Optional[str]: Cached result, or None on a miss
+        """
+        key = self.make_key(source, query, params)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._count(source, "memory_hits")
+                return value
+            self._memory.pop(key)
+            self._count(source, "expired")
+
+        if self._conn is not None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM tool_results WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None:
+                value, expires_at = row
+                if expires_at > now:
+                    self._memory.set(key, (expires_at, value))
+                    self._count(source, "disk_hits")
+                    return value
+                self._count(source, "expired")
+
+        self._count(source, "misses")
+        return None
+
+    def contains(self, source: str, query: str, params: Tuple = ()) -> bool:
+        """
+        Check for a live cached result without counting a hit or miss
+
+        Args:
+            source (str): Search source name
+            query (str): Raw search query
+            params (Tuple): Tool settings included in the key
+
+        Returns:
+            bool: True if an unexpired result is cached
+        """
+        key = self.make_key(source, query, params)
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None and entry[0] > now:
+            return True
+        if self._conn is None:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM tool_results WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        return row is not None
+
+    def set(self, source: str, query: str, value: str, params: Tuple = ()) -> None:
+        """
+        Store a tool result in both tiers
+
+        Args:
+            source (str): Search source name
+            query (str): Raw search query
+            value (str): Tool result text
+            params (Tuple): Tool settings included in the key
+        """
+        key = self.make_key(source, query, params)
+        now = time.time()
+        expires_at = now + self.get_ttl(source)
+        self._memory.set(key, (expires_at, value))
+        self._count(source, "stores")
+
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tool_results (key, source, value, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, source, value, now, expires_at)
+                )
+                self._writes += 1
+                if self._writes % CACHE_CONFIG["prune_every"] == 0:
+                    self._prune(now)
+                self._conn.commit()
+
+    def _prune(self, now: float) -> None:
+        """Delete expired rows and the oldest rows beyond the size limit"""
+        self._conn.execute("DELETE FROM tool_results WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM tool_results WHERE key IN ("
+            "SELECT key FROM tool_results ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
+
+    def get_or_compute(
+        self,
+        source: str,
+        query: str,
+        compute: Callable[[], str],
+        params: Tuple = ()
+    ) -> str:
+        """
+        Return a cached result or compute and store it
+
+        Exceptions from compute are not cached.
+
+        Args:
+            source (str): Search source name
+            query (str): Raw search query
+            compute (Callable[[], str]): Runs the real tool call
+            params (Tuple): Tool settings included in the key
+
+        Returns:
+            str: Tool result text
+        """
+        value = self.get(source, query, params)
+        if value is None:
+            value = compute()
+            self.set(source, query, value, params)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss counters overall and per source
+
+        Returns:
+            Dict[str, Any]: Totals, per-source counters and tier sizes
+        """
+        with self._lock:
+            per_source = {source: dict(counters) for source, counters in self._counters.items()}
+            disk_entries = 0
+            if self._conn is not None:
+                disk_entries = self._conn.execute("SELECT COUNT(*) FROM tool_results").fetchone()[0]
+
+        totals: Dict[str, int] = {}
+        for counters in per_source.values():
+            for event, count in counters.items():
+                totals[event] = totals.get(event, 0) + count
+
+        lookups = totals.get("memory_hits", 0) + totals.get("disk_hits", 0) + totals.get("misses", 0)
+        hits = totals.get("memory_hits", 0) + totals.get("disk_hits", 0)
+        return {
+            'totals': totals,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'sources': per_source,
+            'memory_entries': len(self._memory),
+            'disk_entries': disk_entries
+        }
+
+    def clear(self) -> None:
+        """Remove every cached result from both tiers"""
+        self._memory.clear()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM tool_results")
+                self._conn.commit()
+
+
+_tool_result_cache: Optional[ToolResultCache] = None
+_tool_result_cache_lock = threading.Lock()
+
+
+def get_tool_result_cache() -> ToolResultCache:
+    """
+    Get the process-wide tool result cache, creating it on first use
+
+    Returns:
+        ToolResultCache: Shared cache backed by the configured SQLite file
+    """
+    global _tool_result_cache
+    with _tool_result_cache_lock:
+        if _tool_result_cache is None:
+            _tool_result_cache = ToolResultCache(
+                os.path.join(CACHE_CONFIG["directory"], CACHE_CONFIG["tool_results_db"])
+            )
+        return _tool_result_cache
+
+
+def set_tool_result_cache(result_cache: Optional[ToolResultCache]) -> None:
+    """
+    Replace the process-wide tool result cache
+
+    Args:
+        result_cache (Optional[ToolResultCache]): New cache, or None to recreate
+            the configured one on next use
+    """
+    global _tool_result_cache
+    with _tool_result_cache_lock:
+        _tool_result_cache = result_cache
+
+
+class SemanticAnswerCache:
+    """
+    Cache of final answers looked up by query similarity
+
+    Each scope (for example selected sources and response length) keeps its
+    own NumPy matrix of unit-length query embeddings, so a lookup is a single
+    matrix-vector product. Once a scope is full the oldest entry is overwritten.
+
+    Args:
+        embedder: Object with an encode(texts) method returning unit vectors
+        threshold (Optional[float]): Minimum cosine similarity for a hit
+        max_entries (int): Maximum entries kept per scope
+    """
+
+    def __init__(
+        self,
+        embedder,
+        threshold: Optional[float] = None,
+        max_entries: int = SEMANTIC_CACHE_CONFIG["max_entries_per_scope"]
+    ):
+        self.embedder = embedder
+        self.threshold = threshold if threshold is not None else \
+            SEMANTIC_CACHE_CONFIG["thresholds"].get(embedder.name, 0.9)
+        self.max_entries = max(1, max_entries)
+        self._vectors: Dict[Hashable, np.ndarray] = {}
+        self._entries: Dict[Hashable, List[Tuple[str, str]]] = {}
+        self._cursors: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        vector = self.embedder.encode([query])[0]
+        if not vector.any():
+            return None
+        return vector
+
+    def lookup(self, query: str, scope: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Find the stored answer for the most similar earlier query
+
+        Args:
+            query (str): Incoming query
+            scope (Hashable): Scope the answer must have been stored under
+
+        Returns:
+            Optional[Dict[str, Any]]: 'output', matched 'query' and 'similarity',
+            or None when nothing clears the threshold
+        """
+        vector = self._embed(query)
+        with self._lock:
+            entries = self._entries.get(scope)
+            if vector is None or not entries:
+                self.misses += 1
+                return None
+
+            similarities = self._vectors[scope][:len(entries)] @ vector
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            matched_query, output = entries[best]
+            return {'output': output, 'query': matched_query, 'similarity': similarity}
+
+    def store(self, query: str, scope: Hashable, output: str) -> None:
+        """
+        Remember the final answer for a query
+
+        Args:
+            query (str): Query that was answered
+            scope (Hashable): Scope to store the answer under
+            output (str): Final answer text
+        """
+        vector = self._embed(query)
+        if vector is None:
+            return
+
+        with self._lock:
+            entries = self._entries.setdefault(scope, [])
+            matrix = self._vectors.get(scope)
+
+            if len(entries) < self.max_entries:
+                if matrix is None or len(entries) == len(matrix):
+                    # Grow capacity geometrically so stores stay amortized O(dim)
+                    capacity = min(self.max_entries, max(16, len(entries) * 2))
+                    grown = np.zeros((capacity, len(vector)), dtype=np.float32)
+                    if matrix is not None:
+                        grown[:len(entries)] = matrix[:len(entries)]
+                    matrix = grown
+                    self._vectors[scope] = matrix
+                matrix[len(entries)] = vector
+                entries.append((query, output))
+            else:
+                position = self._cursors.get(scope, 0)
+                matrix[position] = vector
+                entries[position] = (query, output)
+                self._cursors[scope] = (position + 1) % self.max_entries
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss counters and size
+
+        Returns:
+            Dict[str, Any]: Counters, entry count and similarity threshold
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': sum(len(entries) for entries in self._entries.values()),
+                'threshold': self.threshold,
+                'embedder': self.embedder.name
+            }
+
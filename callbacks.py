@@ -0,0 +1,307 @@
+"""
+LangChain callback handlers for Yaswanth's AI Search Engine
+Streams final answers into the chat pane, records streaming metrics and
+traces per-stage latency of LLM and tool calls
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+trace_logger = logging.getLogger("search.trace")
+
+
+class StreamingAnswerHandler(BaseCallbackHandler):
+    """
+    Write final-answer tokens progressively as the LLM streams them
+
+    For ReAct agents only the text after the answer prefix of an LLM call is
+    shown, so intermediate thoughts and actions are not streamed. Without a
+    prefix every token is part of the answer.
+
+    Args:
+        placeholder: Object with a markdown(text) method (e.g. st.empty()), or None
+        answer_prefix (Optional[str]): Marker that starts the final answer
+        cursor (str): Suffix shown while tokens are still arriving
+    """
+
+    def __init__(self, placeholder: Any = None, answer_prefix: Optional[str] = "Final Answer:", cursor: str = "▌"):
+        self.placeholder = placeholder
+        self.answer_prefix = answer_prefix
+        self.cursor = cursor
+        self.start_time = time.perf_counter()
+        self.first_token_time: Optional[float] = None
+        self.first_answer_token_time: Optional[float] = None
+        self.last_answer_token_time: Optional[float] = None
+        self.answer_tokens = 0
+        self.answer = ""
+        self._buffer = ""
+        self._answer_started = False
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, **kwargs: Any) -> None:
+        self._reset_call()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, **kwargs: Any) -> None:
+        self._reset_call()
+
+    def _reset_call(self) -> None:
+        """Start a new LLM call; only the last call's answer is kept"""
+        self._buffer = ""
+        self._answer_started = self.answer_prefix is None
+        if self._answer_started:
+            self.answer = ""
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        now = time.perf_counter()
+        if self.first_token_time is None:
+            self.first_token_time = now
+
+        if not self._answer_started:
+            self._buffer += token
+            index = self._buffer.find(self.answer_prefix)
+            if index == -1:
+                return
+            self._answer_started = True
+            self.answer = ""
+            token = self._buffer[index + len(self.answer_prefix):].lstrip()
+            if not token:
+                return
+
+        if self.first_answer_token_time is None:
+            self.first_answer_token_time = now
+        self.last_answer_token_time = now
+        self.answer_tokens += 1
+        self.answer += token
+
+        if self.placeholder is not None:
+            self.placeholder.markdown(self.answer + self.cursor)
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        if self._answer_started and self.placeholder is not None and self.answer:
+            self.placeholder.markdown(self.answer)
+
+    def metrics(self) -> Dict[str, Optional[float]]:
+        """
+        Get streaming metrics for the query
+
+        Returns:
+            Dict[str, Optional[float]]: Seconds to the first LLM token and first
+            answer token, answer token count and answer tokens per second
+        """
+        def since_start(moment: Optional[float]) -> Optional[float]:
+            return round(moment - self.start_time, 3) if moment is not None else None
+
+        tokens_per_second = None
+        if self.first_answer_token_time is not None and self.answer_tokens > 1:
+            duration = self.last_answer_token_time - self.first_answer_token_time
+            if duration > 0:
+                tokens_per_second = round((self.answer_tokens - 1) / duration, 1)
+
+        return {
+            'time_to_first_token': since_start(self.first_token_time),
+            'time_to_first_answer_token': since_start(self.first_answer_token_time),
+            'answer_tokens': self.answer_tokens,
+            'tokens_per_second': tokens_per_second
+        }
+
+
+class TracingHandler(BaseCallbackHandler):
+    """
+    Record a span for every LLM and tool call in a search
+
+    Spans carry the stage ('llm' or 'tool:<name>'), start/end wall-clock
+    times, duration and, for LLM calls, token counts. Each finished span is
+    logged as JSON on the 'search.trace' logger. Safe to use from the
+    retrieval thread pool.
+
+    Args:
+        trace_id (Optional[str]): Identifier attached to every span
+    """
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id
+        self.spans: List[Dict[str, Any]] = []
+        self.iterations = 0
+        self._open: Dict[UUID, Dict[str, Any]] = {}
+        self._streamed: Dict[UUID, int] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, stage: str, parent_run_id: Optional[UUID]) -> None:
+        with self._lock:
+            self._open[run_id] = {
+                'trace_id': self.trace_id,
+                'stage': stage,
+                'run_id': str(run_id),
+                'parent_run_id': str(parent_run_id) if parent_run_id else None,
+                'start': time.time(),
+                '_perf_start': time.perf_counter()
+            }
+
+    def _end(self, run_id: UUID, **fields: Any) -> None:
+        with self._lock:
+            span = self._open.pop(run_id, None)
+            if span is None:
+                return
+            span['end'] = time.time()
+            span['duration'] = round(time.perf_counter() - span.pop('_perf_start'), 4)
+            span.update(fields)
+            self.spans.append(span)
+        trace_logger.info(json.dumps(span, default=str))
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._start(run_id, "llm", parent_run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._start(run_id, "llm", parent_run_id)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._streamed[run_id] = self._streamed.get(run_id, 0) + 1
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt_tokens, completion_tokens = self._token_usage(response)
+        with self._lock:
+            streamed = self._streamed.pop(run_id, 0)
+        if completion_tokens is None and streamed:
+            completion_tokens = streamed
+        self._end(run_id, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, success=True)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._streamed.pop(run_id, None)
+        self._end(run_id, success=False, error=str(error))
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._start(run_id, f"tool:{(serialized or {}).get('name', 'unknown')}", parent_run_id)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, output_chars=len(str(output)), success=True)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, success=False, error=str(error))
+
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        with self._lock:
+            self.iterations += 1
+
+    @staticmethod
+    def _token_usage(response: Any):
+        """Read prompt and completion token counts from an LLM result"""
+        usage = (getattr(response, 'llm_output', None) or {}).get('token_usage') or {}
+        if usage:
+            return usage.get('prompt_tokens'), usage.get('completion_tokens')
+
+        for generations in getattr(response, 'generations', None) or []:
+            for generation in generations:
+                metadata = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+                if metadata:
+                    return metadata.get('input_tokens'), metadata.get('output_tokens')
+        return None, None
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Get the spans and totals recorded for the search
+
+        Returns:
+            Dict[str, Any]: Spans, agent iterations, LLM call count and token totals
+        """
+        with self._lock:
+            spans = list(self.spans)
+            iterations = self.iterations
+
+        llm_spans = [span for span in spans if span['stage'] == 'llm']
+        return {
+            'spans': spans,
+            'agent_iterations': iterations,
+            'llm_calls': len(llm_spans),
+            'prompt_tokens': sum(span.get('prompt_tokens') or 0 for span in llm_spans),
+            'completion_tokens': sum(span.get('completion_tokens') or 0 for span in llm_spans)
+        }
+
+
+class BudgetExceededError(Exception):
+    """Raised when a search spends more LLM tokens than its budget"""
+
+
+class ExecutionBudgetHandler(BaseCallbackHandler):
+    """
+    Stop an agent run once it has spent its LLM token budget
+
+    Prompt tokens are estimated from prompt length when the provider does not
+    report usage. Tool outputs are kept so a partial answer can be built.
+
+    Args:
+        max_tokens (int): Total prompt and completion tokens allowed
+    """
+
+    raise_error = True
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.tokens_used = 0
+        self.observations: List[str] = []
+        self._prompt_estimates: Dict[UUID, int] = {}
+        self._streamed: Dict[UUID, int] = {}
+        self._lock = threading.Lock()
+
+    def _check(self) -> None:
+        if self.tokens_used >= self.max_tokens:
+            raise BudgetExceededError(f"Token budget of {self.max_tokens} exhausted")
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._check()
+            self._prompt_estimates[run_id] = sum(len(prompt) for prompt in prompts) // 4
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._check()
+            self._prompt_estimates[run_id] = sum(
+                len(str(getattr(message, 'content', message))) for batch in messages for message in batch
+            ) // 4
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._streamed[run_id] = self._streamed.get(run_id, 0) + 1
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt_tokens, completion_tokens = TracingHandler._token_usage(response)
+        with self._lock:
+            estimate = self._prompt_estimates.pop(run_id, 0)
+            streamed = self._streamed.pop(run_id, 0)
+            if completion_tokens is None:
+                completion_tokens = streamed or sum(
+                    len(generation.text) for generations in response.generations for generation in generations
+                ) // 4
+            self.tokens_used += (prompt_tokens if prompt_tokens is not None else estimate) + completion_tokens
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        with self._lock:
+            self.observations.append(str(output))
+
+    def findings(self, max_chars: int) -> str:
+        """
+        Get the most recent tool outputs within a character limit
+
+        Args:
+            max_chars (int): Maximum characters returned
+
+        Returns:
+            str: Latest observations first, separated by blank lines
+        """
+        with self._lock:
+            observations = list(self.observations)
+
+        parts, used = [], 0
+        for observation in reversed(observations):
+            if used + len(observation) > max_chars:
+                parts.append(observation[:max(0, max_chars - used)])
+                break
+            parts.append(observation)
+            used += len(observation) + 2
+        return "\n\n".join(part for part in parts if part)
@@ -21,6 +21,8 @@ SEARCH_CONFIG = {
     "max_results_per_source": 2,
     "default_response_length": "Medium",
     "search_timeout": 30,
+    "search_modes": ["Agent (ReAct)", "Parallel retrieval"],
+    "default_search_mode": "Agent (ReAct)",
     "supported_models": [
         "Gemma2-9b-it",
         "Llama-3.1-70b-versatile",
@@ -51,7 +53,10 @@ API_CONFIG = {
     "default_model": "Gemma2-9b-it",
     "temperature": 0.7,
     "max_tokens": 1000,
-    "timeout": 30
+    "timeout": 30,
+    # Token bucket shared by every chat model using the same Groq API key
+    "requests_per_second": 0.5,
+    "request_burst": 5
 }
 
 # Search Sources Configuration
@@ -60,19 +65,248 @@ SEARCH_SOURCES = {
         "enabled": True,
         "max_results": 2,
         "content_length": 500,
-        "description": "Comprehensive encyclopedia articles"
+        "description": "Comprehensive encyclopedia articles",
+        "cache_ttl": 7 * 24 * 3600,
+        "rate_limit": 10.0,
+        "rate_burst": 20
     },
     "ArXiv": {
         "enabled": True,
         "max_results": 2,
         "content_length": 500,
-        "description": "Latest research papers and academic content"
+        "description": "Latest research papers and academic content",
+        "cache_ttl": 24 * 3600,
+        # arXiv API terms allow one request every 3 seconds
+        "rate_limit": 0.34,
+        "rate_burst": 1
     },
     "Web Search": {
         "enabled": True,
         "max_results": 3,
         "content_length": 300,
-        "description": "Real-time web search results"
+        "description": "Real-time web search results",
+        "cache_ttl": 15 * 60,
+        "rate_limit": 1.0,
+        "rate_burst": 3
+    },
+    "Local Knowledge": {
+        "enabled": True,
+        "max_results": 3,
+        "content_length": 800,
+        "description": "Documents ingested into the local vector index",
+        # Local lookups are cheap and must reflect re-ingestion, so they are not cached
+        "cache_ttl": 0,
+        "rate_limit": None,
+        "rate_burst": None
+    }
+}
+
+# Content length (characters per source result) for each response length
+RESPONSE_LENGTHS = {
+    "Short": 300,
+    "Medium": 500,
+    "Detailed": 800
+}
+
+# Engine Settings
+ENGINE_CONFIG = {
+    "agent_cache_size": 32,
+    "tool_cache_size": 64,
+    "http_max_connections": 20,
+    "http_max_keepalive_connections": 10,
+    "agent_verbose": True,
+    "llm_cache_size": 32,
+    "retrieval_workers": 16
+}
+
+# Outbound HTTP Settings for the search sources
+HTTP_CONFIG = {
+    "connect_timeout": 3.0,
+    "read_timeout": 8.0,
+    "keepalive_expiry": 30.0,
+    "user_agent": "YaswanthAISearchEngine/1.0 (https://github.com/YASWANTHthottempudi/SearchEnging_langchain)",
+    # Retries use exponential backoff with full jitter
+    "retry_attempts": 3,
+    "retry_base_delay": 0.25,
+    "retry_max_delay": 2.0,
+    # A source is skipped for breaker_reset_timeout seconds after this many consecutive failures
+    "breaker_failure_threshold": 5,
+    "breaker_reset_timeout": 30.0,
+    # Web searches send a second request when the first attempt is slower than this; retries are not hedged
+    "web_hedge_delay": 1.5,
+    "hedge_workers": 8
+}
+
+# Tool Result Cache Settings
+CACHE_CONFIG = {
+    "directory": os.getenv("SEARCH_CACHE_DIR", ".cache"),
+    "tool_results_db": "tool_results.sqlite3",
+    "memory_entries": 1024,
+    "disk_max_entries": 100000,
+    "default_ttl": 3600,
+    "prune_every": 100
+}
+
+# Search History Settings
+HISTORY_CONFIG = {
+    "db_path": os.getenv("SEARCH_HISTORY_DB", os.path.join(CACHE_CONFIG["directory"], "history.sqlite3")),
+    # Background writes are committed in batches
+    "batch_size": 64,
+    "flush_interval": 0.5,
+    "max_queue": 10000,
+    # Longest a read waits for its own session's queued writes
+    "read_wait_timeout": 5.0,
+    "page_size": 20,
+    "max_page_size": 1000,
+    "recent_searches": 5
+}
+
+# Chat Transcript Settings
+TRANSCRIPT_CONFIG = {
+    # Messages kept in memory and rendered on every rerun; older ones are read from the history store
+    "window_messages": 20,
+    # Older messages loaded per "Load older messages" click
+    "page_messages": 20,
+    # The LLM sees the latest context_messages messages, each cut to message_chars,
+    # plus up to summary_questions earlier questions cut to question_chars
+    "context_messages": 4,
+    "message_chars": 300,
+    "summary_questions": 10,
+    "question_chars": 80
+}
+
+# Export Settings
+EXPORT_CONFIG = {
+    # Rows encoded at a time (one Parquet row group each)
+    "chunk_rows": 10000,
+    # Format: (MIME type, file extension)
+    "formats": {
+        "json": ("application/json", "json"),
+        "ndjson": ("application/x-ndjson", "ndjson"),
+        "csv": ("text/csv", "csv"),
+        "parquet": ("application/vnd.apache.parquet", "parquet")
+    }
+}
+
+# Search Statistics Settings
+STATS_CONFIG = {
+    # Latency histograms cover latency_min to latency_max seconds with this relative error
+    "latency_min": 0.0001,
+    "latency_max": 3600.0,
+    "latency_precision": 0.02
+}
+
+# Embedding Settings
+EMBEDDING_CONFIG = {
+    "backend": os.getenv("EMBEDDING_BACKEND", "auto"),
+    "model_name": "sentence-transformers/all-MiniLM-L6-v2",
+    "hash_dim": 1024,
+    # Norm of the question-type feature relative to the content terms
+    "hash_intent_weight": 0.5,
+    # Micro-batching of concurrent requests to the local model
+    "max_batch_size": 64,
+    "max_wait_ms": 5,
+    "memory_entries": 4096,
+    # Content-addressed vector cache under CACHE_CONFIG["directory"]/embeddings
+    "disk_cache": True,
+    "disk_cache_initial_rows": 1024
+}
+
+# Local Knowledge Settings
+KNOWLEDGE_CONFIG = {
+    "directory": os.getenv("LOCAL_KNOWLEDGE_DIR", "knowledge_index"),
+    "index_file": "index.faiss",
+    "store_db": "chunks.sqlite3",
+    "chunk_size": 1000,
+    "chunk_overlap": 200,
+    "embed_batch_size": 64,
+    "file_extensions": [".txt", ".md", ".rst", ".html"],
+    # Hybrid retrieval: BM25 and vector rankings merged by reciprocal rank fusion
+    "hybrid_search": True,
+    "hybrid_candidates": 20,
+    "rrf_k": 60,
+    "bm25_k1": 1.5,
+    "bm25_b": 0.75,
+    "lexical_pointer": "lexical.current"
+}
+
+# Context Packing Settings
+CONTEXT_CONFIG = {
+    # Gemma2-9b-it context window; API_CONFIG["max_tokens"] of it is kept for the answer
+    "context_window": 8192,
+    "prompt_reserve_tokens": 300,
+    # Target tokens of search results per response length
+    "context_tokens": {
+        "Short": 700,
+        "Medium": 1200,
+        "Detailed": 2000
+    },
+    "max_passage_chars": 400,
+    # Near-duplicate detection: MinHash over word pairs
+    "shingle_size": 2,
+    "minhash_permutations": 128,
+    "minhash_seed": 7,
+    "duplicate_threshold": 0.6
+}
+
+# Semantic Answer Cache Settings
+SEMANTIC_CACHE_CONFIG = {
+    "thresholds": {
+        "hashing": 0.9,
+        "sentence-transformers": 0.88
+    },
+    "max_entries_per_scope": 5000,
+    # Questions that lean on earlier turns are not cached in a conversation
+    "follow_up_words": [
+        "it", "its", "they", "them", "their", "theirs", "he", "him", "his",
+        "she", "her", "hers", "this", "that", "these", "those", "former", "latter"
+    ],
+    "follow_up_prefixes": ["what about", "how about", "and ", "also ", "what else", "tell me more"]
+}
+
+# Agent Execution Budget Settings
+BUDGET_CONFIG = {
+    "max_iterations": 6,
+    "max_tokens": 6000,
+    # "generate" asks the LLM for a final answer from the steps so far
+    "early_stopping_method": "generate",
+    "partial_answer_chars": 1500
+}
+
+# Query Router Settings
+ROUTER_CONFIG = {
+    "max_keywords": 3,
+    "simple_patterns": [
+        r"^(what|who) (is|are|was|were) ",
+        r"^(define|definition of|meaning of) ",
+        r"^when (was|did|is) ",
+        r"^where (is|was) "
+    ],
+    "complex_markers": ["latest", "recent", "compare", " vs ", "versus", "how to", "why", "difference"],
+    # Direct-route source order; Local Knowledge is skipped while its index is empty
+    "preferred_sources": ["Local Knowledge", "Wikipedia", "Web Search", "ArXiv"]
+}
+
+# Speculative Prefetch Settings
+PREFETCH_CONFIG = {
+    # Top follow-up suggestions warmed after each answer
+    "suggestions": 2,
+    "workers": 2,
+    "max_pending": 8,
+    "tracked_keys": 1024,
+    # Added to the worker threads' niceness where supported
+    "niceness": 10
+}
+
+# Batch Query Settings
+BATCH_CONFIG = {
+    "workers": 4,
+    "max_pending_per_worker": 2,
+    # Requests per second per source while a batch runs
+    "rate_limits": {
+        "Wikipedia": 5.0,
+        "ArXiv": 0.34,
+        "Web Search": 1.0
     }
 }
 
@@ -83,7 +317,11 @@ FEATURES = {
     "advanced_settings": True,
     "statistics_tracking": True,
     "custom_styling": True,
-    "multi_source_search": True
+    "multi_source_search": True,
+    "semantic_answer_cache": True,
+    "query_router": True,
+    "context_packing": True,
+    "speculative_prefetch": False
 }
 
 # Error Messages
@@ -106,6 +344,21 @@ SUCCESS_MESSAGES = {
 DEFAULT_PROMPTS = {
     "welcome": "👋 Welcome to my AI Search Engine! I can help you search across Wikipedia, ArXiv research papers, and the web. What would you like to explore today?",
     "placeholder": "Ask me anything! Try: 'What is quantum computing?' or 'Latest AI research papers'",
+    "synthesis": (
+        "Answer the question using the search results below. "
+        "Cite the source names you rely on and say so if the results do not answer the question.\n"
+        "Keep the answer {length_hint}.\n\n"
+        "Search results:\n{context}\n\n"
+        "Question: {query}\n"
+        "Answer:"
+    ),
+    "length_hints": {
+        "Short": "to two or three sentences",
+        "Medium": "to one or two paragraphs",
+        "Detailed": "thorough, with sections where helpful"
+    },
+    "conversation": "Conversation so far, for context only:\n{conversation}\n\nCurrent question: {query}",
+    "partial_answer": "⏳ The search budget ran out before a final answer. Best findings so far:\n\n{findings}",
     "help": "💡 Try asking about:\n• Scientific concepts\n• Recent research papers\n• Current events\n• Technical topics\n• Historical information"
 }
 
@@ -117,6 +370,22 @@ def get_config(section: str) -> Dict:
         "ui": UI_CONFIG,
         "api": API_CONFIG,
         "sources": SEARCH_SOURCES,
+        "response_lengths": RESPONSE_LENGTHS,
+        "engine": ENGINE_CONFIG,
+        "http": HTTP_CONFIG,
+        "cache": CACHE_CONFIG,
+        "history": HISTORY_CONFIG,
+        "transcript": TRANSCRIPT_CONFIG,
+        "stats": STATS_CONFIG,
+        "export": EXPORT_CONFIG,
+        "embeddings": EMBEDDING_CONFIG,
+        "knowledge": KNOWLEDGE_CONFIG,
+        "context": CONTEXT_CONFIG,
+        "semantic_cache": SEMANTIC_CACHE_CONFIG,
+        "batch": BATCH_CONFIG,
+        "prefetch": PREFETCH_CONFIG,
+        "budget": BUDGET_CONFIG,
+        "router": ROUTER_CONFIG,
         "features": FEATURES,
         "errors": ERROR_MESSAGES,
         "success": SUCCESS_MESSAGES,
@@ -0,0 +1,206 @@
+"""
+Context packing for Yaswanth's AI Search Engine
+Splits search tool outputs into passages, drops near-duplicates across
+sources with MinHash signatures and packs the most relevant passages into
+the LLM's token budget
+"""
+
+import re
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import API_CONFIG, CONTEXT_CONFIG
+from utils import score_search_results
+
+_PARAGRAPH_PATTERN = re.compile(r'\n\s*\n')
+_SENTENCE_PATTERN = re.compile(r'(?<=[.!?])\s+')
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+# Universal hash family (a * x + b) mod p standing in for random permutations
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_permutation_rng = np.random.default_rng(CONTEXT_CONFIG["minhash_seed"])
+_PERMUTATION_A = _permutation_rng.integers(1, (1 << 31) - 1, CONTEXT_CONFIG["minhash_permutations"], dtype=np.uint64)
+_PERMUTATION_B = _permutation_rng.integers(0, (1 << 31) - 1, CONTEXT_CONFIG["minhash_permutations"], dtype=np.uint64)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def get_context_budget(response_length: str) -> int:
+    """
+    Get the prompt tokens available for search results
+
+    The response length sets the target and the model's context window,
+    minus API_CONFIG["max_tokens"] kept free for the answer and the prompt
+    template, caps it.
+
+    Args:
+        response_length (str): Selected response length
+
+    Returns:
+        int: Token budget for the packed context
+    """
+    available = CONTEXT_CONFIG["context_window"] - API_CONFIG["max_tokens"] - CONTEXT_CONFIG["prompt_reserve_tokens"]
+    target = CONTEXT_CONFIG["context_tokens"].get(response_length, CONTEXT_CONFIG["context_tokens"]["Medium"])
+    return max(0, min(target, available))
+
+
+def split_passages(text: str, max_chars: int = CONTEXT_CONFIG["max_passage_chars"]) -> List[str]:
+    """
+    Split a tool output into passages
+
+    Paragraphs are kept whole when short enough; longer ones are cut at
+    sentence boundaries into pieces of at most max_chars.
+
+    Args:
+        text (str): Tool output
+        max_chars (int): Maximum characters per passage
+
+    Returns:
+        List[str]: Non-empty passages in order
+    """
+    passages = []
+    for paragraph in _PARAGRAPH_PATTERN.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            passages.append(paragraph)
+            continue
+
+        current = ""
+        for sentence in _SENTENCE_PATTERN.split(paragraph):
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                passages.append(current)
+                current = ""
+            current = f"{current} {sentence}".strip()
+            while len(current) > max_chars:
+                passages.append(current[:max_chars])
+                current = current[max_chars:]
+        if current:
+            passages.append(current)
+    return passages
+
+
+def minhash_signature(text: str, shingle_size: int = CONTEXT_CONFIG["shingle_size"]) -> np.ndarray:
+    """
+    Compute a MinHash signature over word shingles
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the texts' shingle sets.
+
+    Args:
+        text (str): Passage text
+        shingle_size (int): Words per shingle
+
+    Returns:
+        np.ndarray: Signature of CONTEXT_CONFIG["minhash_permutations"] values
+    """
+    words = _TOKEN_PATTERN.findall(text.lower())
+    if not words:
+        return np.full(len(_PERMUTATION_A), _MERSENNE_PRIME, dtype=np.uint64)
+    shingles = {' '.join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))}
+    hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    # a < 2^31 and hash < 2^32, so the products fit in 64 bits
+    return ((hashes[:, np.newaxis] * _PERMUTATION_A + _PERMUTATION_B) % _MERSENNE_PRIME).min(axis=0)
+
+
+def find_near_duplicates(passages: List[str], threshold: float = CONTEXT_CONFIG["duplicate_threshold"]) -> List[bool]:
+    """
+    Flag passages that repeat an earlier passage
+
+    Args:
+        passages (List[str]): Passages in priority order
+        threshold (float): Estimated Jaccard similarity at which a passage is a duplicate
+
+    Returns:
+        List[bool]: True for each passage that duplicates an earlier one
+    """
+    if not passages:
+        return []
+
+    signatures = np.stack([minhash_signature(passage) for passage in passages])
+    duplicates = [False] * len(passages)
+    kept: List[int] = []
+
+    for i in range(len(passages)):
+        if kept and (signatures[kept] == signatures[i]).mean(axis=1).max() >= threshold:
+            duplicates[i] = True
+            continue
+        kept.append(i)
+    return duplicates
+
+
+def pack_context(query: str, results: Dict[str, str], budget_tokens: int) -> Dict[str, Any]:
+    """
+    Turn per-source tool outputs into a deduplicated, budgeted context
+
+    Passages from all sources are ranked with BM25 against the query;
+    near-duplicates of a better passage are dropped, then passages are added
+    best first while they fit in the budget. Sources keep their order and
+    each source's passages keep their original order.
+
+    Args:
+        query (str): User query
+        results (Dict[str, str]): Tool output keyed by source tool name
+        budget_tokens (int): Token budget for the packed context
+
+    Returns:
+        Dict[str, Any]: Packed 'results' keyed by source, and 'stats' with
+        passage, duplicate, packed and token counts
+    """
+    passages = [
+        (name, position, passage)
+        for name, text in results.items()
+        for position, passage in enumerate(split_passages(text))
+    ]
+    scores = score_search_results(query, [passage for _, _, passage in passages], method='bm25')
+    order = sorted(range(len(passages)), key=lambda i: scores[i], reverse=True)
+    duplicates = find_near_duplicates([passages[i][2] for i in order])
+
+    chosen, used = [], 0
+    for i, duplicate in zip(order, duplicates):
+        if duplicate:
+            continue
+        tokens = estimate_tokens(passages[i][2])
+        if used + tokens > budget_tokens:
+            continue
+        chosen.append(i)
+        used += tokens
+
+    source_order = {name: rank for rank, name in enumerate(results)}
+    packed: Dict[str, List[str]] = {}
+    for i in sorted(chosen, key=lambda i: (source_order[passages[i][0]], passages[i][1])):
+        packed.setdefault(passages[i][0], []).append(passages[i][2])
+
+    return {
+        'results': {name: "\n\n".join(texts) for name, texts in packed.items()},
+        'stats': {
+            'passages': len(passages),
+            'duplicates': sum(duplicates),
+            'packed': len(chosen),
+            'tokens': used,
+            'budget': budget_tokens
+        }
+    }
+
+
+def pack_results(query: str, results: Dict[str, str], response_length: str, budget_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Pack tool outputs into the context budget for a response length
+
+    Args:
+        query (str): User query
+        results (Dict[str, str]): Tool output keyed by source tool name
+        response_length (str): Selected response length
+        budget_tokens (Optional[int]): Override for the token budget
+
+    Returns:
+        Dict[str, Any]: Same as pack_context
+    """
+    budget = get_context_budget(response_length) if budget_tokens is None else budget_tokens
+    return pack_context(query, results, budget)
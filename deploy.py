@@ -61,6 +61,67 @@ def run_tests():
     
     return run_command(f"{python_path} -m pytest test_app.py -v", "Running tests")
 
+# Integrations the app must only import when a search first needs them
+LAZY_IMPORTS = (
+    "langchain_groq",
+    "langchain.agents",
+    "langchain_community",
+    "faiss",
+    "sentence_transformers"
+)
+
+def parse_import_times(output):
+    """Parse `python -X importtime` output into (module, self_us, cumulative_us, depth) rows"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        module = name.strip()
+        rows.append((module, int(self_us), int(cumulative_us), (len(name) - len(name.lstrip()) - 1) // 2))
+    return rows
+
+def report_import_time(module="app", top=10, budget=None):
+    """Report the cold-start import time of a module and catch eager heavy imports"""
+    # Determine the correct python path
+    if os.name == 'nt':  # Windows
+        python_path = ".venv\\Scripts\\python"
+    else:  # Unix/Linux/macOS
+        python_path = ".venv/bin/python"
+    
+    print(f"⏱️  Measuring import time of {module}...")
+    result = subprocess.run([python_path, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True)
+    rows = parse_import_times(result.stderr)
+    if result.returncode != 0 or not any(row[0] == module and row[3] == 0 for row in rows):
+        print(f"❌ Importing {module} failed")
+        print(f"Error output: {result.stderr[-2000:]}")
+        return False
+    
+    # Children are listed before their parent, so the module's imports directly precede it
+    end = max(index for index, row in enumerate(rows) if row[0] == module and row[3] == 0)
+    start = end
+    while start > 0 and rows[start - 1][3] > 0:
+        start -= 1
+    total = rows[end][2]
+    print(f"📦 import {module}: {total / 1e6:.2f}s")
+    # Packages imported directly by the module, slowest first
+    direct = sorted((row for row in rows[start:end] if row[3] == 1), key=lambda row: row[2], reverse=True)
+    for name, _, cumulative, _ in direct[:top]:
+        print(f"   {cumulative / 1e6:6.2f}s  {name}")
+    
+    success = True
+    imported = {name for name, _, _, _ in rows}
+    eager = [name for name in LAZY_IMPORTS if name in imported]
+    if eager:
+        print(f"❌ Imported at startup, should be lazy: {', '.join(eager)}")
+        success = False
+    if budget is not None and total / 1e6 > budget:
+        print(f"❌ Import time {total / 1e6:.2f}s is over the {budget:.2f}s budget")
+        success = False
+    if success:
+        print("✅ Import time check passed")
+    return success
+
 def check_environment():
     """Check environment setup"""
     print("🔍 Checking environment setup...")
@@ -103,6 +164,60 @@ def start_application():
     except subprocess.CalledProcessError as e:
         print(f"❌ Failed to start application: {e}")
 
+def start_api(host="127.0.0.1", port=8000):
+    """Start the headless search API"""
+    # Determine the correct uvicorn path
+    if os.name == 'nt':  # Windows
+        uvicorn_path = ".venv\\Scripts\\uvicorn"
+    else:  # Unix/Linux/macOS
+        uvicorn_path = ".venv/bin/uvicorn"
+    
+    print("🚀 Starting Yaswanth's AI Search Engine API...")
+    print(f"📡 The API will listen on http://{host}:{port} (docs at /docs)")
+    print("🛑 Press Ctrl+C to stop the API")
+    
+    try:
+        subprocess.run(f"{uvicorn_path} api:app --host {host} --port {port}", shell=True, check=True)
+    except KeyboardInterrupt:
+        print("\n👋 API stopped by user")
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Failed to start API: {e}")
+
+def run_batch_queries(input_path, output_path=None, workers=None):
+    """Answer a JSONL file of queries with the batch runner"""
+    # Determine the correct python path
+    if os.name == 'nt':  # Windows
+        python_path = ".venv\\Scripts\\python"
+    else:  # Unix/Linux/macOS
+        python_path = ".venv/bin/python"
+    
+    command = f'{python_path} batch.py "{input_path}"'
+    if output_path:
+        command += f' --output "{output_path}"'
+    if workers:
+        command += f" --workers {workers}"
+    
+    try:
+        subprocess.run(command, shell=True, check=True)
+        return True
+    except KeyboardInterrupt:
+        print("\n⏸️  Batch interrupted; rerun the same command to resume")
+        return False
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Batch run failed: {e}")
+        return False
+
+def ingest_knowledge(locations):
+    """Build the Local Knowledge index from files, directories and URLs"""
+    # Determine the correct python path
+    if os.name == 'nt':  # Windows
+        python_path = ".venv\\Scripts\\python"
+    else:  # Unix/Linux/macOS
+        python_path = ".venv/bin/python"
+    
+    quoted = " ".join(f'"{location}"' for location in locations)
+    return run_command(f"{python_path} ingest.py {quoted}", "Ingesting local knowledge")
+
 def main():
     """Main deployment function"""
     parser = argparse.ArgumentParser(description="Deploy Yaswanth's AI Search Engine")
@@ -110,6 +225,15 @@ def main():
     parser.add_argument("--test", action="store_true", help="Run tests")
     parser.add_argument("--start", action="store_true", help="Start the application")
     parser.add_argument("--all", action="store_true", help="Run setup, test, and start")
+    parser.add_argument("--api", action="store_true", help="Start the headless search API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface for the search API (0.0.0.0 exposes it to the network)")
+    parser.add_argument("--port", type=int, default=8000, help="Port for the search API")
+    parser.add_argument("--batch", metavar="QUERIES_JSONL", help="Answer a JSONL file of queries")
+    parser.add_argument("--batch-output", metavar="RESULTS_JSONL", help="Output file for --batch")
+    parser.add_argument("--workers", type=int, help="Concurrent searches for --batch")
+    parser.add_argument("--ingest", nargs="+", metavar="PATH_OR_URL", help="Build the Local Knowledge index")
+    parser.add_argument("--importtime", nargs="?", const="app", metavar="MODULE", help="Report the cold-start import time of a module (default: app)")
+    parser.add_argument("--importtime-budget", type=float, metavar="SECONDS", help="Fail --importtime or --test when the import takes longer")
     
     args = parser.parse_args()
     
@@ -131,6 +255,7 @@ def main():
     if args.test or args.all:
         print("\n🧪 Running tests...")
         success &= run_tests()
+        success &= report_import_time(budget=args.importtime_budget)
     
     if args.start or args.all:
         if success:
@@ -139,11 +264,34 @@ def main():
         else:
             print("❌ Cannot start application due to previous errors")
     
-    if not any([args.setup, args.test, args.start, args.all]):
+    if args.importtime:
+        print("\n⏱️  Checking cold start...")
+        success &= report_import_time(args.importtime, budget=args.importtime_budget)
+    
+    if args.ingest:
+        print("\n📚 Building local knowledge index...")
+        success &= ingest_knowledge(args.ingest)
+    
+    if args.batch:
+        print("\n📦 Running batch queries...")
+        success &= run_batch_queries(args.batch, args.batch_output, args.workers)
+    
+    if args.api:
+        if success:
+            print("\n📡 Starting search API...")
+            start_api(host=args.host, port=args.port)
+        else:
+            print("❌ Cannot start API due to previous errors")
+    
+    if not any([args.setup, args.test, args.start, args.all, args.api, args.batch, args.ingest, args.importtime]):
         print("ℹ️  No action specified. Use --help for available options")
         print("\nQuick start:")
         print("  python deploy.py --all    # Full setup and start")
         print("  python deploy.py --start  # Just start the app")
+        print("  python deploy.py --api    # Start the headless search API")
+        print("  python deploy.py --batch queries.jsonl  # Answer a file of queries")
+        print("  python deploy.py --ingest docs/  # Build the Local Knowledge index")
+        print("  python deploy.py --importtime  # Report the app's cold-start import time")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,472 @@
+"""
+Text embeddings for Yaswanth's AI Search Engine
+Provides a local CPU embedding model with a deterministic hashing fallback,
+behind a shared service that micro-batches concurrent requests and caches
+vectors on disk by content hash
+"""
+
+import hashlib
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cache import LRUCache
+from config import CACHE_CONFIG, EMBEDDING_CONFIG
+from lexical import tokenize_terms
+
+# Words that phrase a request without changing its topic
+INTENT_WORDS = frozenset({
+    'explain', 'define', 'definition', 'describe', 'meaning', 'tell', 'me', 'about',
+    'please', 'give', 'overview', 'mean', 'means'
+})
+
+# Leading question words that change what is being asked about a topic.
+# "What is X" and "explain X" share the definitional default (no feature).
+QUESTION_INTENTS = (
+    (re.compile(r"^\W*(?:who|whom|whose)\b", re.IGNORECASE), "person"),
+    (re.compile(r"^\W*when\b", re.IGNORECASE), "time"),
+    (re.compile(r"^\W*where\b", re.IGNORECASE), "place"),
+    (re.compile(r"^\W*why\b", re.IGNORECASE), "reason"),
+    (re.compile(r"^\W*how\s+(?:many|much)\b", re.IGNORECASE), "quantity"),
+    (re.compile(r"^\W*how\b", re.IGNORECASE), "method"),
+)
+
+
+def get_question_intent(text: str) -> Optional[str]:
+    """
+    Get the kind of answer a question asks for from its leading wh-word
+
+    Args:
+        text (str): Question text
+
+    Returns:
+        Optional[str]: Intent label, or None for definitional or other text
+    """
+    for pattern, intent in QUESTION_INTENTS:
+        if pattern.match(text or ""):
+            return intent
+    return None
+
+
+class HashingEmbedder:
+    """
+    Deterministic bag-of-words embedder using the hashing trick
+
+    Query terms (stop words and request phrasing removed, numbers and short
+    acronyms kept) are hashed into a fixed number of buckets with sublinear term-frequency weights, then L2
+    normalized so a dot product is the cosine similarity. A question's
+    leading wh-word adds one more hashed feature with a fixed share of the
+    norm, so "when was X born" and "where was X born" stay apart.
+
+    Args:
+        dim (int): Number of hash buckets
+        intent_weight (float): Norm of the question-type feature relative to
+            the unit-length content terms
+    """
+
+    name = "hashing"
+    # Cheaper to recompute than to batch or look up in a cache
+    expensive = False
+
+    def __init__(
+        self,
+        dim: int = EMBEDDING_CONFIG["hash_dim"],
+        intent_weight: float = EMBEDDING_CONFIG["hash_intent_weight"]
+    ):
+        self.dim = dim
+        self.intent_weight = intent_weight
+        self.model_name = f"crc32-{dim}"
+
+    def tokenize(self, text: str) -> List[str]:
+        """
+        Get the terms that are hashed for a text
+
+        Args:
+            text (str): Input text
+
+        Returns:
+            List[str]: Content terms
+        """
+        return [term for term in tokenize_terms(text) if term not in INTENT_WORDS]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a batch of texts
+
+        Args:
+            texts (List[str]): Texts to embed
+
+        Returns:
+            np.ndarray: Float32 array of shape (len(texts), dim) with unit rows
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for term in self.tokenize(text):
+                bucket = zlib.crc32(term.encode("utf-8")) % self.dim
+                counts[bucket] = counts.get(bucket, 0) + 1
+            for bucket, count in counts.items():
+                vectors[row, bucket] = 1.0 + np.log(count)
+
+            intent = get_question_intent(text)
+            if intent and self.intent_weight > 0:
+                norm = np.linalg.norm(vectors[row])
+                if norm > 0:
+                    vectors[row] /= norm
+                bucket = zlib.crc32(f"?{intent}".encode("utf-8")) % self.dim
+                vectors[row, bucket] += self.intent_weight
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerEmbedder:
+    """
+    Local CPU embedder backed by a sentence-transformers model
+
+    Args:
+        model_name (str): Model to load
+    """
+
+    name = "sentence-transformers"
+    expensive = True
+
+    def __init__(self, model_name: str = EMBEDDING_CONFIG["model_name"]):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a batch of texts
+
+        Args:
+            texts (List[str]): Texts to embed
+
+        Returns:
+            np.ndarray: Float32 array of shape (len(texts), dim) with unit rows
+        """
+        vectors = self.model.encode(
+            [re.sub(r'\s+', ' ', text.strip()) for text in texts],
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
+        return vectors.astype(np.float32)
+
+
+def text_key(text: str) -> str:
+    """Get the content address of a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingDiskCache:
+    """
+    Content-addressed on-disk store of embedding vectors
+
+    Vectors are rows of a float32 file that is memory-mapped and grown
+    geometrically; a SQLite table maps each text hash to its row. A row is
+    written before its mapping commits, so readers in other processes never
+    see a half-written vector.
+
+    Args:
+        directory (str): Directory for this model's files
+        dim (int): Vector dimension
+    """
+
+    def __init__(self, directory: str, dim: int):
+        os.makedirs(directory, exist_ok=True)
+        self.dim = dim
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.memmap] = None
+        self._conn = sqlite3.connect(os.path.join(directory, "keys.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER)")
+        self._conn.commit()
+        if not os.path.exists(self.vectors_path):
+            open(self.vectors_path, "wb").close()
+
+    def _rows_on_disk(self) -> int:
+        return os.path.getsize(self.vectors_path) // (self.dim * 4)
+
+    def _map(self, rows: int) -> np.memmap:
+        """Map at least the given number of rows, remapping after growth"""
+        if self._matrix is None or len(self._matrix) < rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self._rows_on_disk(), self.dim))
+        return self._matrix
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up cached vectors
+
+        Args:
+            keys (List[str]): Text hashes
+
+        Returns:
+            Dict[str, np.ndarray]: Vectors for the keys that are cached
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, row FROM vectors WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                if rows:
+                    matrix = self._map(max(row for _, row in rows) + 1)
+                    found.update((key, np.array(matrix[row])) for key, row in rows)
+        return found
+
+    def put_many(self, keys: List[str], vectors: np.ndarray) -> None:
+        """
+        Store vectors under their text hashes
+
+        Args:
+            keys (List[str]): Text hashes
+            vectors (np.ndarray): One float32 row per key
+        """
+        with self._lock:
+            # BEGIN IMMEDIATE serializes row allocation across processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                next_row = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+                rows = []
+                for key in keys:
+                    if self._conn.execute("SELECT 1 FROM vectors WHERE key = ?", (key,)).fetchone() is None:
+                        self._conn.execute("INSERT INTO vectors (key, row) VALUES (?, ?)", (key, next_row))
+                        rows.append(next_row)
+                        next_row += 1
+                    else:
+                        rows.append(None)
+
+                if next_row > self._rows_on_disk():
+                    capacity = max(next_row, 2 * self._rows_on_disk(), EMBEDDING_CONFIG["disk_cache_initial_rows"])
+                    with open(self.vectors_path, "r+b") as f:
+                        f.truncate(capacity * self.dim * 4)
+                matrix = self._map(next_row)
+                for row, vector in zip(rows, vectors):
+                    if row is not None:
+                        matrix[row] = vector
+                matrix.flush()
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+
+class EmbeddingService:
+    """
+    Shared front end for an embedder
+
+    Expensive embedders get a memory LRU and an optional disk cache keyed by
+    text hash, and cache misses from concurrent callers are gathered by a
+    background thread into micro-batches of up to max_batch_size texts,
+    waiting at most max_wait seconds for a batch to fill. Cheap embedders are
+    called directly. The service has the embedder's name, dim and encode()
+    interface, so the vector index and the semantic cache use it unchanged.
+
+    Args:
+        embedder: Embedder with an encode(texts) method and name/dim attributes
+        disk_cache (Optional[EmbeddingDiskCache]): Persistent vector cache
+        max_batch_size (int): Maximum texts per embedder call
+        max_wait (float): Seconds to wait for more requests before embedding
+        memory_entries (int): Vectors kept in memory
+    """
+
+    def __init__(
+        self,
+        embedder,
+        disk_cache: Optional[EmbeddingDiskCache] = None,
+        max_batch_size: int = EMBEDDING_CONFIG["max_batch_size"],
+        max_wait: float = EMBEDDING_CONFIG["max_wait_ms"] / 1000,
+        memory_entries: int = EMBEDDING_CONFIG["memory_entries"]
+    ):
+        self.embedder = embedder
+        self.name = embedder.name
+        self.dim = embedder.dim
+        self.disk_cache = disk_cache
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._memory = LRUCache(memory_entries)
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._counters = {'texts': 0, 'memory_hits': 0, 'disk_hits': 0, 'embedded': 0, 'batches': 0}
+
+    def _count(self, **increments: int) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a batch of texts
+
+        Args:
+            texts (List[str]): Texts to embed
+
+        Returns:
+            np.ndarray: Float32 array of shape (len(texts), dim)
+        """
+        if not getattr(self.embedder, "expensive", True):
+            return self.embedder.encode(texts)
+
+        keys = [text_key(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        for key in set(keys):
+            vector = self._memory.get(key)
+            if vector is not None:
+                vectors[key] = vector
+        memory_hits = len(vectors)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing and self.disk_cache is not None:
+            vectors.update(self.disk_cache.get_many(missing))
+        disk_hits = len(vectors) - memory_hits
+
+        texts_by_key = dict(zip(keys, texts))
+        missing = [key for key in missing if key not in vectors]
+        if missing:
+            computed = self._submit([texts_by_key[key] for key in missing])
+            vectors.update(zip(missing, computed))
+            if self.disk_cache is not None:
+                self.disk_cache.put_many(missing, computed)
+
+        for key, vector in vectors.items():
+            self._memory.set(key, vector)
+        self._count(texts=len(texts), memory_hits=memory_hits, disk_hits=disk_hits, embedded=len(missing))
+
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys]).astype(np.float32, copy=False)
+
+    def _submit(self, texts: List[str]) -> np.ndarray:
+        """Queue texts for the batching thread and wait for their vectors"""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _run(self) -> None:
+        """Gather queued requests into micro-batches and embed them"""
+        while True:
+            requests = [self._queue.get()]
+            size = len(requests[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                requests.append(request)
+                size += len(request[0])
+
+            try:
+                vectors = self.embedder.encode([text for texts, _ in requests for text in texts])
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            self._count(batches=1)
+            offset = 0
+            for texts, future in requests:
+                future.set_result(np.asarray(vectors[offset:offset + len(texts)], dtype=np.float32))
+                offset += len(texts)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get cache and batching counters
+
+        Returns:
+            Dict[str, float]: Text, hit, embedded and batch counts, mean batch size and hit rate
+        """
+        with self._lock:
+            counters = dict(self._counters)
+        hits = counters['memory_hits'] + counters['disk_hits']
+        counters['mean_batch_size'] = round(counters['embedded'] / counters['batches'], 2) if counters['batches'] else 0.0
+        counters['hit_rate'] = round(hits / counters['texts'], 3) if counters['texts'] else 0.0
+        counters['disk_entries'] = len(self.disk_cache) if self.disk_cache is not None else 0
+        return counters
+
+
+def get_cache_namespace(embedder) -> str:
+    """Name of the disk cache directory for an embedder's model and dimension"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', f"{embedder.name}-{getattr(embedder, 'model_name', '')}-{embedder.dim}")
+
+
+def build_embedding_service(embedder, directory: Optional[str] = None) -> EmbeddingService:
+    """
+    Wrap an embedder in a service with the configured caches
+
+    Args:
+        embedder: Embedder to wrap
+        directory (Optional[str]): Disk cache root, defaults to the configured cache directory
+
+    Returns:
+        EmbeddingService: Batched, cached embedder
+    """
+    disk_cache = None
+    if EMBEDDING_CONFIG["disk_cache"] and getattr(embedder, "expensive", True):
+        root = directory or os.path.join(CACHE_CONFIG["directory"], "embeddings")
+        disk_cache = EmbeddingDiskCache(os.path.join(root, get_cache_namespace(embedder)), embedder.dim)
+    return EmbeddingService(embedder, disk_cache)
+
+
+_services: Dict[str, EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedder(backend: Optional[str] = None) -> EmbeddingService:
+    """
+    Get the process-wide embedding service for a backend
+
+    With the 'auto' backend the local model is used when sentence-transformers
+    is installed and loads, otherwise the hashing embedder.
+
+    Args:
+        backend (Optional[str]): 'auto', 'sentence-transformers' or 'hashing'
+
+    Returns:
+        EmbeddingService: Shared service with an encode(texts) method and a dim attribute
+    """
+    backend = backend or EMBEDDING_CONFIG["backend"]
+
+    with _services_lock:
+        if backend in _services:
+            return _services[backend]
+
+        if backend == "hashing":
+            embedder = HashingEmbedder()
+        elif backend == "sentence-transformers":
+            embedder = SentenceTransformerEmbedder()
+        else:
+            try:
+                embedder = SentenceTransformerEmbedder()
+            except Exception:
+                embedder = HashingEmbedder()
+
+        service = _services.get(embedder.name) or build_embedding_service(embedder)
+        _services[backend] = _services[embedder.name] = service
+        return service
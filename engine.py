@@ -0,0 +1,805 @@
+"""
+Search engine core for Yaswanth's AI Search Engine
+Builds the LLM, search tools and agent executors once and reuses them across
+Streamlit reruns, users and non-UI clients, and runs the search pipeline
+"""
+
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from langchain_core.tools import BaseTool, Tool
+
+from cache import LRUCache, SemanticAnswerCache, ToolResultCache, get_tool_result_cache
+from callbacks import BudgetExceededError, ExecutionBudgetHandler
+from config import (
+    API_CONFIG,
+    BUDGET_CONFIG,
+    DEFAULT_PROMPTS,
+    ENGINE_CONFIG,
+    KNOWLEDGE_CONFIG,
+    RESPONSE_LENGTHS,
+    ROUTER_CONFIG,
+    SEARCH_CONFIG,
+    SEARCH_SOURCES,
+    is_feature_enabled
+)
+from context import pack_results
+from embeddings import get_embedder
+from prefetch import Prefetcher
+from ratelimit import KeyedRateLimiter, SingleFlight, get_rate_limit_stats, try_acquire
+from ratelimit import acquire as acquire_rate_limit
+from sources import (
+    ARXIV_DESCRIPTION,
+    WEB_SEARCH_DESCRIPTION,
+    WIKIPEDIA_DESCRIPTION,
+    search_arxiv,
+    search_web,
+    search_wikipedia
+)
+from transcript import add_conversation
+from transport import get_http_client, get_transport_stats, install_wikipedia_session
+from utils import format_search_query, is_follow_up_query, is_simple_factual_query
+
+# The Groq client, the agent framework and the Local Knowledge index are slow
+# to import, so they are loaded on first use rather than at startup
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
+    from langchain_groq import ChatGroq
+
+_tool_cache = LRUCache(ENGINE_CONFIG["tool_cache_size"])
+_llm_cache = LRUCache(ENGINE_CONFIG["llm_cache_size"])
+_agent_cache = LRUCache(ENGINE_CONFIG["agent_cache_size"])
+_retrieval_pool = ThreadPoolExecutor(
+    max_workers=ENGINE_CONFIG["retrieval_workers"],
+    thread_name_prefix="retrieval"
+)
+_tool_calls = SingleFlight()
+_semantic_cache: Optional[SemanticAnswerCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def hash_api_key(api_key: str) -> str:
+    """
+    Hash an API key so raw keys are never used as cache keys
+
+    Args:
+        api_key (str): Groq API key
+
+    Returns:
+        str: Hex digest identifying the key
+    """
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+
+
+def get_content_length(response_length: str) -> int:
+    """
+    Get the per-result character budget for a response length
+
+    Args:
+        response_length (str): One of the configured response lengths
+
+    Returns:
+        int: Maximum characters per source result
+    """
+    return RESPONSE_LENGTHS.get(response_length, RESPONSE_LENGTHS["Medium"])
+
+
+def normalize_sources(sources: List[str]) -> Tuple[str, ...]:
+    """
+    Put selected sources in a stable, validated order
+
+    Args:
+        sources (List[str]): Sources selected by the user
+
+    Returns:
+        Tuple[str, ...]: Known sources in configuration order
+    """
+    return tuple(source for source in SEARCH_SOURCES if source in sources)
+
+
+def build_search_tool(source: str, max_results: int, response_length: str) -> BaseTool:
+    """
+    Build the LangChain tool for a single search source
+
+    Args:
+        source (str): Source name ('Wikipedia', 'ArXiv', 'Web Search' or 'Local Knowledge')
+        max_results (int): Maximum results per source
+        response_length (str): Selected response length
+
+    Returns:
+        BaseTool: Tool querying the source
+    """
+    content_length = get_content_length(response_length)
+
+    if source == "Wikipedia":
+        install_wikipedia_session()
+        return Tool(
+            name="wikipedia",
+            func=lambda query: search_wikipedia(query, max_results, content_length),
+            description=WIKIPEDIA_DESCRIPTION
+        )
+
+    if source == "ArXiv":
+        return Tool(
+            name="arxiv",
+            func=lambda query: search_arxiv(query, max_results, content_length),
+            description=ARXIV_DESCRIPTION
+        )
+
+    if source == "Web Search":
+        return Tool(name="WebSearch", func=search_web, description=WEB_SEARCH_DESCRIPTION)
+
+    if source == "Local Knowledge":
+        from knowledge import search_local_knowledge
+
+        return Tool(
+            name="LocalKnowledge",
+            func=lambda query: search_local_knowledge(query, max_results, content_length),
+            description=(
+                "Search the documents ingested into the local knowledge base. "
+                "Input should be a search query."
+            )
+        )
+
+    raise ValueError(f"Unknown search source: {source}")
+
+
+def with_result_cache(tool: BaseTool, source: str, max_results: int, response_length: str) -> BaseTool:
+    """
+    Wrap a tool so repeated queries are answered from the tool result cache
+
+    Cache misses wait for the source's rate limiter before calling the tool,
+    and concurrent identical calls (same normalized query, source and
+    settings) share one upstream request. Sources with a cache TTL of 0 are
+    never cached. Source failures are returned to the agent as the tool's
+    output and are not cached.
+
+    Args:
+        tool (BaseTool): Tool querying the source
+        source (str): Source name used for the cache key and TTL
+        max_results (int): top_k_results the tool was built with
+        response_length (str): Response length the tool was built with
+
+    Returns:
+        BaseTool: Tool with the same name and description that checks the cache first
+    """
+    params = (max_results, get_content_length(response_length))
+
+    def call(query: str) -> str:
+        acquire_rate_limit(source)
+        return tool.run(query)
+
+    def fetch(query: str) -> str:
+        return _tool_calls.run(ToolResultCache.make_key(source, query, params), lambda: call(query))
+
+    if ToolResultCache.get_ttl(source) <= 0:
+        return Tool(name=tool.name, description=tool.description, func=fetch, handle_tool_error=True)
+
+    def run(query: str) -> str:
+        computed = []
+
+        def compute() -> str:
+            computed.append(True)
+            return fetch(query)
+
+        value = get_tool_result_cache().get_or_compute(source, query, compute, params)
+        _prefetcher.record_request(ToolResultCache.make_key(source, query, params), hit=not computed)
+        return value
+
+    return Tool(name=tool.name, description=tool.description, func=run, handle_tool_error=True)
+
+
+def warm_tool_result(source: str, query: str, max_results: int, response_length: str) -> Tuple[str, str]:
+    """
+    Fetch a tool result into the cache ahead of a likely request
+
+    Only spare rate limit capacity is used: when the source has no token
+    available right now, the prefetch is skipped rather than delaying real
+    searches. A real call for the same query while this one runs shares it.
+
+    Args:
+        source (str): Source name
+        query (str): Predicted query
+        max_results (int): Maximum results per source
+        response_length (str): Selected response length
+
+    Returns:
+        Tuple[str, str]: Outcome ('warmed', 'cached', 'throttled' or
+        'uncacheable') and the tool result cache key
+    """
+    query = format_search_query(query)
+    params = (max_results, get_content_length(response_length))
+    key = ToolResultCache.make_key(source, query, params)
+    result_cache = get_tool_result_cache()
+
+    if ToolResultCache.get_ttl(source) <= 0:
+        return "uncacheable", key
+    if result_cache.contains(source, query, params):
+        return "cached", key
+    if not try_acquire(source):
+        return "throttled", key
+
+    tool = build_search_tool(source, max_results, response_length)
+    result_cache.set(source, query, _tool_calls.run(key, lambda: tool.run(query)), params)
+    return "warmed", key
+
+
+_prefetcher = Prefetcher(warm_tool_result)
+
+
+def get_prefetcher() -> Prefetcher:
+    """Get the process-wide speculative prefetcher"""
+    return _prefetcher
+
+
+def get_search_tools(sources: List[str], max_results: int, response_length: str) -> List[BaseTool]:
+    """
+    Get cached tools for the selected sources
+
+    Tools only depend on source settings, so they are shared by every API key.
+    Each tool checks the tool result cache before going to the network.
+
+    Args:
+        sources (List[str]): Selected sources
+        max_results (int): Maximum results per source
+        response_length (str): Selected response length
+
+    Returns:
+        List[BaseTool]: One tool per selected source
+    """
+    return [
+        _tool_cache.get_or_create(
+            (source, max_results, response_length),
+            lambda source=source: with_result_cache(
+                build_search_tool(source, max_results, response_length),
+                source,
+                max_results,
+                response_length
+            )
+        )
+        for source in normalize_sources(sources)
+    ]
+
+
+def build_llm(api_key: str, model: Optional[str] = None) -> "ChatGroq":
+    """
+    Build the Groq chat model on the shared HTTP client
+
+    Requests are throttled by a token bucket shared by every model built for
+    the same API key.
+
+    Args:
+        api_key (str): Groq API key
+        model (Optional[str]): Model name, defaults to the configured model
+
+    Returns:
+        ChatGroq: Chat model
+    """
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        groq_api_key=api_key,
+        model_name=model or API_CONFIG["default_model"],
+        streaming=True,
+        temperature=API_CONFIG["temperature"],
+        http_client=get_http_client(),
+        rate_limiter=KeyedRateLimiter(("groq", hash_api_key(api_key)))
+    )
+
+
+def get_llm(api_key: str, model: Optional[str] = None) -> "ChatGroq":
+    """
+    Get a cached chat model for an API key and model
+
+    Args:
+        api_key (str): Groq API key
+        model (Optional[str]): Model name, defaults to the configured model
+
+    Returns:
+        ChatGroq: Chat model
+    """
+    model = model or API_CONFIG["default_model"]
+    return _llm_cache.get_or_create(
+        (hash_api_key(api_key), model),
+        lambda: build_llm(api_key, model)
+    )
+
+
+def get_search_agent(
+    api_key: str,
+    sources: List[str],
+    max_results: int,
+    response_length: str,
+    model: Optional[str] = None
+) -> Optional["AgentExecutor"]:
+    """
+    Get a ready agent executor for the given settings, building it once
+
+    Args:
+        api_key (str): Groq API key
+        sources (List[str]): Selected sources
+        max_results (int): Maximum results per source
+        response_length (str): Selected response length
+        model (Optional[str]): Model name, defaults to the configured model
+
+    Returns:
+        Optional[AgentExecutor]: Agent executor, or None if no valid source is selected
+    """
+    selected = normalize_sources(sources)
+    if not selected:
+        return None
+
+    model = model or API_CONFIG["default_model"]
+    key = (hash_api_key(api_key), selected, max_results, response_length, model)
+
+    def factory() -> "AgentExecutor":
+        from langchain.agents import AgentType, initialize_agent
+
+        tools = get_search_tools(list(selected), max_results, response_length)
+        return initialize_agent(
+            tools,
+            get_llm(api_key, model),
+            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            handle_parsing_errors=True,
+            max_iterations=BUDGET_CONFIG["max_iterations"],
+            early_stopping_method=BUDGET_CONFIG["early_stopping_method"],
+            verbose=ENGINE_CONFIG["agent_verbose"]
+        )
+
+    return _agent_cache.get_or_create(key, factory)
+
+
+def parallel_retrieve(
+    query: str,
+    tools: List[BaseTool],
+    timeout: float,
+    callbacks: Optional[List[Any]] = None
+) -> Dict[str, str]:
+    """
+    Query every tool at the same time and collect what finishes in time
+
+    All lookups start together, so the timeout applies to each source and the
+    wall time follows the slowest source rather than the sum of all of them.
+
+    Args:
+        query (str): Raw search query
+        tools (List[BaseTool]): Tools to query
+        timeout (float): Seconds to wait for each source
+        callbacks (Optional[List[Any]]): Thread-safe callbacks for the tool calls
+
+    Returns:
+        Dict[str, str]: Result text (or failure note) keyed by tool name
+    """
+    formatted_query = format_search_query(query)
+    futures = {
+        _retrieval_pool.submit(tool.run, formatted_query, callbacks=callbacks): tool.name
+        for tool in tools
+    }
+    done, _ = wait(futures, timeout=timeout)
+
+    results = {}
+    for future, name in futures.items():
+        if future in done:
+            try:
+                results[name] = str(future.result())
+            except Exception as e:
+                results[name] = f"Search failed: {str(e)}"
+        else:
+            future.cancel()
+            results[name] = f"Search timed out after {timeout} seconds"
+
+    return results
+
+
+def build_synthesis_prompt(query: str, results: Dict[str, str], response_length: str) -> str:
+    """
+    Build the single-call prompt that answers from merged search results
+
+    Args:
+        query (str): User query
+        results (Dict[str, str]): Result text keyed by source tool name
+        response_length (str): Selected response length
+
+    Returns:
+        str: Prompt for the LLM
+    """
+    context = "\n\n".join(f"[{name}]\n{text}" for name, text in results.items())
+    length_hints = DEFAULT_PROMPTS["length_hints"]
+    return DEFAULT_PROMPTS["synthesis"].format(
+        length_hint=length_hints.get(response_length, length_hints["Medium"]),
+        context=context,
+        query=query
+    )
+
+
+def run_parallel_search(
+    api_key: str,
+    query: str,
+    sources: List[str],
+    max_results: int,
+    response_length: str,
+    timeout: float,
+    callbacks: Optional[List[Any]] = None,
+    model: Optional[str] = None,
+    tool_callbacks: Optional[List[Any]] = None,
+    conversation: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Fan the query out to every source, then answer with one LLM call
+
+    Results are deduplicated across sources and packed into the context
+    budget for the response length before they reach the LLM.
+
+    Args:
+        api_key (str): Groq API key
+        query (str): User query
+        sources (List[str]): Selected sources
+        max_results (int): Maximum results per source
+        response_length (str): Selected response length
+        timeout (float): Seconds to wait for each source
+        callbacks (Optional[List[Any]]): LangChain callbacks for the LLM call
+        model (Optional[str]): Model name, defaults to the configured model
+        tool_callbacks (Optional[List[Any]]): Thread-safe callbacks for the tool calls
+        conversation (Optional[str]): Summary of earlier turns for the LLM; the
+            sources are searched with the query alone
+
+    Returns:
+        Optional[Dict[str, Any]]: 'output' answer, per-source 'results' and
+        packing 'context' stats, or None if no valid source is selected
+    """
+    tools = get_search_tools(sources, max_results, response_length)
+    if not tools:
+        return None
+
+    results = parallel_retrieve(query, tools, timeout, callbacks=tool_callbacks)
+    context, context_stats = results, None
+    if is_feature_enabled("context_packing"):
+        packed = pack_results(query, results, response_length)
+        context, context_stats = packed["results"], packed["stats"]
+
+    prompt = build_synthesis_prompt(add_conversation(query, conversation), context, response_length)
+    message = get_llm(api_key, model).invoke(prompt, config={"callbacks": callbacks or []})
+
+    output = message.content if hasattr(message, "content") else str(message)
+    return {"input": query, "output": output, "results": results, "context": context_stats}
+
+
+def get_semantic_cache() -> SemanticAnswerCache:
+    """
+    Get the process-wide semantic answer cache, creating it on first use
+
+    Returns:
+        SemanticAnswerCache: Shared answer cache
+    """
+    global _semantic_cache
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticAnswerCache(get_embedder())
+        return _semantic_cache
+
+
+def get_answer_scope(sources: List[str], response_length: str) -> Tuple:
+    """
+    Get the semantic cache scope for a set of search settings
+
+    Args:
+        sources (List[str]): Selected sources
+        response_length (str): Selected response length
+
+    Returns:
+        Tuple: Hashable scope
+    """
+    return (normalize_sources(sources), response_length)
+
+
+def lookup_cached_answer(query: str, sources: List[str], response_length: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a stored answer for a near-duplicate query
+
+    Args:
+        query (str): User query
+        sources (List[str]): Selected sources
+        response_length (str): Selected response length
+
+    Returns:
+        Optional[Dict[str, Any]]: Cached 'output' with the matched query and similarity
+    """
+    return get_semantic_cache().lookup(query, get_answer_scope(sources, response_length))
+
+
+def store_answer(query: str, sources: List[str], response_length: str, output: str) -> None:
+    """
+    Remember a final answer for later near-duplicate queries
+
+    Args:
+        query (str): User query
+        sources (List[str]): Selected sources
+        response_length (str): Selected response length
+        output (str): Final answer
+    """
+    get_semantic_cache().store(query, get_answer_scope(sources, response_length), output)
+
+
+def select_route(query: str, sources: List[str], mode: str) -> str:
+    """
+    Choose how a query is answered
+
+    Simple factual questions in agent mode skip the ReAct loop and go to a
+    single source with a single LLM call.
+
+    Args:
+        query (str): User query
+        sources (List[str]): Selected sources
+        mode (str): Selected search mode
+
+    Returns:
+        str: 'direct', 'parallel' or 'agent'
+    """
+    if mode == "Parallel retrieval":
+        return "parallel"
+    if is_feature_enabled("query_router") and normalize_sources(sources) and is_simple_factual_query(query):
+        return "direct"
+    return "agent"
+
+
+def has_local_knowledge() -> bool:
+    """
+    Check whether the Local Knowledge index has any vectors to search
+
+    Returns:
+        bool: True once documents have been ingested
+    """
+    index_path = os.path.join(KNOWLEDGE_CONFIG["directory"], KNOWLEDGE_CONFIG["index_file"])
+    if not os.path.exists(index_path):
+        return False
+
+    from knowledge import get_knowledge_index
+
+    index = get_knowledge_index()
+    return index is not None and len(index) > 0
+
+
+def get_direct_source(sources: List[str]) -> str:
+    """
+    Pick the single source used for direct answers
+
+    Local Knowledge is passed over while its index is missing or empty, so a
+    simple question is not answered from an index with nothing in it.
+
+    Args:
+        sources (List[str]): Selected sources
+
+    Returns:
+        str: First usable selected source in the router's preference order
+    """
+    selected = normalize_sources(sources)
+    for source in ROUTER_CONFIG["preferred_sources"]:
+        if source in selected and (source != "Local Knowledge" or has_local_knowledge()):
+            return source
+    return selected[0]
+
+
+def run_agent_with_budget(
+    search_agent: "AgentExecutor",
+    query: str,
+    timeout: float,
+    callbacks: Optional[List[Any]] = None,
+    conversation: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Run the ReAct agent within its iteration, time and token budget
+
+    When the token budget runs out the latest tool findings are returned as
+    a partial answer instead of an error. Runs that hit the iteration cap or
+    the deadline are flagged as exhausted even when the agent generated a
+    final answer from its steps so far.
+
+    Args:
+        search_agent (AgentExecutor): Cached agent executor
+        query (str): User query
+        timeout (float): Wall-clock deadline in seconds for the agent loop
+        callbacks (Optional[List[Any]]): LangChain callbacks for the run
+        conversation (Optional[str]): Summary of earlier turns for the agent
+
+    Returns:
+        Dict[str, Any]: Agent response, with 'budget_exhausted' set
+    """
+    budget = ExecutionBudgetHandler(BUDGET_CONFIG["max_tokens"])
+    # Shallow copy so concurrent users of the cached agent keep their own deadline
+    executor = search_agent.model_copy(update={"max_execution_time": timeout, "return_intermediate_steps": True})
+
+    start = time.perf_counter()
+    try:
+        response = executor.invoke(
+            {"input": add_conversation(query, conversation)},
+            config={"callbacks": [*(callbacks or []), budget]}
+        )
+    except BudgetExceededError:
+        response = {"output": None}
+    response["input"] = query
+
+    # With early_stopping_method="generate" the capped run still ends in an LLM
+    # answer, so exhaustion is read from the step count and the clock
+    steps = response.pop("intermediate_steps", [])
+    exhausted = (
+        response["output"] is None
+        or (executor.max_iterations is not None and len(steps) >= executor.max_iterations)
+        or time.perf_counter() - start >= timeout
+    )
+    if response["output"] is None or response["output"].startswith("Agent stopped due to"):
+        findings = budget.findings(BUDGET_CONFIG["partial_answer_chars"]) or "No results were retrieved."
+        response["output"] = DEFAULT_PROMPTS["partial_answer"].format(findings=findings)
+        exhausted = True
+
+    response["budget_exhausted"] = exhausted
+    response["tokens_used"] = budget.tokens_used
+    return response
+
+
+def run_search(
+    api_key: str,
+    query: str,
+    sources: List[str],
+    max_results: int = SEARCH_CONFIG["max_results_per_source"],
+    response_length: str = SEARCH_CONFIG["default_response_length"],
+    timeout: float = SEARCH_CONFIG["search_timeout"],
+    mode: str = SEARCH_CONFIG["default_search_mode"],
+    callbacks: Optional[List[Any]] = None,
+    model: Optional[str] = None,
+    tool_callbacks: Optional[List[Any]] = None,
+    prefetch: Optional[bool] = None,
+    conversation: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Run one search end to end
+
+    Checks the semantic answer cache, then runs the ReAct agent (within its
+    execution budget), the parallel retrieval pipeline or, for simple factual
+    questions, a single-source direct answer, and stores the new answer in the
+    cache. With prefetch on, likely follow-up queries are then fetched into
+    the tool result cache in the background. Errors from the LLM or tools are
+    raised to the caller.
+
+    In a conversation, questions that refer back to earlier turns, such as
+    'how fast is it?', bypass the answer cache; standalone questions use it.
+
+    Args:
+        api_key (str): Groq API key
+        query (str): User query
+        sources (List[str]): Selected sources
+        max_results (int): Maximum results per source
+        response_length (str): Selected response length
+        timeout (float): Seconds to wait for each source, and the agent deadline
+        mode (str): One of the configured search modes
+        callbacks (Optional[List[Any]]): LangChain callbacks for the run
+        model (Optional[str]): Model name, defaults to the configured model
+        tool_callbacks (Optional[List[Any]]): Thread-safe callbacks for tool calls
+            made from the retrieval pool in parallel mode
+        prefetch (Optional[bool]): Prefetch follow-up suggestions, defaults to
+            the speculative_prefetch feature flag
+        conversation (Optional[str]): Summary of earlier turns, e.g. from
+            ChatTranscript.summary, given to the LLM with the query
+
+    Returns:
+        Optional[Dict[str, Any]]: 'output' with 'mode', 'route', 'cached', 'duration'
+        and 'suggestions' (the prefetched follow-ups), or None if no valid source is selected
+    """
+    if not normalize_sources(sources):
+        return None
+
+    start = time.perf_counter()
+    use_answer_cache = is_feature_enabled("semantic_answer_cache") and not (
+        conversation and is_follow_up_query(query)
+    )
+
+    cached_answer = lookup_cached_answer(query, sources, response_length) if use_answer_cache else None
+    route = select_route(query, sources, mode)
+    if cached_answer:
+        response = {
+            "input": query,
+            "output": cached_answer["output"],
+            "cached_query": cached_answer["query"]
+        }
+    elif route == "direct":
+        response = run_parallel_search(
+            api_key,
+            query,
+            [get_direct_source(sources)],
+            max_results,
+            response_length,
+            timeout,
+            callbacks=callbacks,
+            model=model,
+            tool_callbacks=tool_callbacks,
+            conversation=conversation
+        )
+    elif route == "parallel":
+        response = run_parallel_search(
+            api_key,
+            query,
+            sources,
+            max_results,
+            response_length,
+            timeout,
+            callbacks=callbacks,
+            model=model,
+            tool_callbacks=tool_callbacks,
+            conversation=conversation
+        )
+    else:
+        search_agent = get_search_agent(api_key, sources, max_results, response_length, model)
+        response = run_agent_with_budget(search_agent, query, timeout, callbacks, conversation)
+
+    if not cached_answer and use_answer_cache and not response.get("budget_exhausted"):
+        store_answer(query, sources, response_length, response["output"])
+
+    response["mode"] = mode
+    response["route"] = "cache" if cached_answer else route
+    response["cached"] = bool(cached_answer)
+    response["duration"] = round(time.perf_counter() - start, 3)
+
+    if is_feature_enabled("speculative_prefetch") if prefetch is None else prefetch:
+        response["suggestions"] = _prefetcher.submit(
+            query, list(normalize_sources(sources)), max_results, response_length
+        )
+    return response
+
+
+def make_history_entry(query: str, sources: List[str]) -> Dict[str, Any]:
+    """
+    Build the search history record for a completed search
+
+    Args:
+        query (str): User query
+        sources (List[str]): Sources used
+
+    Returns:
+        Dict[str, Any]: History entry with query, timestamp and sources
+    """
+    return {
+        "query": query,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "sources": list(sources)
+    }
+
+
+def reset_caches() -> None:
+    """
+    Drop every cached agent, LLM, tool and stored answer
+
+    Used after swapping the tool or LLM builders, e.g. for offline benchmarks.
+    """
+    global _semantic_cache
+    _agent_cache.clear()
+    _llm_cache.clear()
+    _tool_cache.clear()
+    with _semantic_cache_lock:
+        _semantic_cache = None
+
+
+def get_engine_stats() -> dict:
+    """
+    Get agent, LLM, tool, answer and embedding cache counters, HTTP
+    transport statistics, rate limiting counters and prefetch outcomes
+
+    Returns:
+        dict: Statistics keyed by cache name, plus 'http', 'rate_limits',
+        'coalescing' and 'prefetch'
+    """
+    return {
+        'agents': _agent_cache.stats(),
+        'llms': _llm_cache.stats(),
+        'tools': _tool_cache.stats(),
+        'tool_results': get_tool_result_cache().stats(),
+        'answers': get_semantic_cache().stats(),
+        'embeddings': get_embedder().stats(),
+        'http': get_transport_stats(),
+        'rate_limits': get_rate_limit_stats(),
+        'coalescing': _tool_calls.stats(),
+        'prefetch': _prefetcher.stats()
+    }
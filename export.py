@@ -0,0 +1,185 @@
+"""
+Search history export for Yaswanth's AI Search Engine
+Streams history records as JSON, NDJSON, CSV or Parquet in fixed-size
+chunks, so exports never hold the whole history in memory
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Sequence
+
+from config import EXPORT_CONFIG
+
+EXPORT_FIELDS = ("timestamp", "query", "sources")
+
+# Reused encoders; json.dumps with options builds a new one per call
+_JSON_ENCODER = json.JSONEncoder(indent=2, default=str)
+_NDJSON_ENCODER = json.JSONEncoder(default=str)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _chunks(records: Iterable[Dict[str, Any]], fields: Sequence[str], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group records into lists of at most size rows holding only the export fields"""
+    iterator = iter(records)
+    while True:
+        chunk = [{field: record.get(field) for field in fields} for record in islice(iterator, size)]
+        if not chunk:
+            return
+        yield chunk
+
+
+def _iter_json(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    # Same text as json.dumps(records, indent=2), written one record at a time
+    first = True
+    for chunk in chunks:
+        parts = []
+        for record in chunk:
+            parts.append(("[\n  " if first else ",\n  ") + _JSON_ENCODER.encode(record).replace("\n", "\n  "))
+            first = False
+        yield "".join(parts).encode("utf-8")
+    yield b"[]" if first else b"\n]"
+
+
+def _iter_ndjson(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield "".join(_NDJSON_ENCODER.encode(record) + "\n" for record in chunk).encode("utf-8")
+
+
+def _iter_csv(chunks: Iterator[List[Dict[str, Any]]], fields: Sequence[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for chunk in chunks:
+        writer.writerows(
+            [','.join(value) if isinstance(value, list) else value for value in record.values()]
+            for record in chunk
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _iter_parquet(chunks: Iterator[List[Dict[str, Any]]], fields: Sequence[str]) -> Iterator[bytes]:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow. Install it with: pip install pyarrow")
+
+    sink = _ChunkSink()
+    writer = None
+    for chunk in chunks:
+        if writer is None:
+            # The first chunk fixes the column types for the whole file
+            schema = pa.schema([
+                pa.field(column.name, pa.string()) if pa.types.is_null(column.type) else column
+                for column in pa.Table.from_pylist(chunk).schema
+            ])
+            writer = pq.ParquetWriter(sink, schema)
+        writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+        yield sink.drain()
+    if writer is None:
+        writer = pq.ParquetWriter(sink, pa.schema([(field, pa.string()) for field in fields]))
+    writer.close()
+    yield sink.drain()
+
+
+def iter_export(
+    records: Iterable[Dict[str, Any]],
+    format_type: str = "json",
+    fields: Sequence[str] = EXPORT_FIELDS,
+    chunk_rows: int = EXPORT_CONFIG["chunk_rows"]
+) -> Iterator[bytes]:
+    """
+    Encode records in an export format, chunk by chunk
+
+    Only chunk_rows records are held at a time, so records can come from a
+    generator over any number of rows.
+
+    Args:
+        records (Iterable[Dict[str, Any]]): History records
+        format_type (str): 'json', 'ndjson', 'csv' or 'parquet'
+        fields (Sequence[str]): Record fields to export, in column order
+        chunk_rows (int): Records encoded per chunk (one Parquet row group each)
+
+    Returns:
+        Iterator[bytes]: Encoded chunks; concatenated they form the file
+    """
+    chunks = _chunks(records, fields, chunk_rows)
+    if format_type == "json":
+        return _iter_json(chunks)
+    if format_type == "ndjson":
+        return _iter_ndjson(chunks)
+    if format_type == "csv":
+        return _iter_csv(chunks, fields)
+    if format_type == "parquet":
+        return _iter_parquet(chunks, fields)
+    raise ValueError(f"Unknown export format: {format_type}")
+
+
+def write_export(records: Iterable[Dict[str, Any]], fileobj: BinaryIO, format_type: str = "json", **kwargs) -> int:
+    """
+    Stream an export into a binary file handle
+
+    Args:
+        records (Iterable[Dict[str, Any]]): History records
+        fileobj (BinaryIO): Destination opened for binary writing
+        format_type (str): 'json', 'ndjson', 'csv' or 'parquet'
+        **kwargs: fields and chunk_rows, as for iter_export
+
+    Returns:
+        int: Bytes written
+    """
+    written = 0
+    for chunk in iter_export(records, format_type, **kwargs):
+        fileobj.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def export_to_bytes(records: Iterable[Dict[str, Any]], format_type: str = "json", **kwargs) -> bytes:
+    """
+    Build an export as bytes, e.g. for st.download_button
+
+    Streamlit keeps download data in memory as bytes and rejects other file
+    objects, so the stream is collected into one buffer.
+
+    Args:
+        records (Iterable[Dict[str, Any]]): History records
+        format_type (str): 'json', 'ndjson', 'csv' or 'parquet'
+        **kwargs: fields and chunk_rows, as for iter_export
+
+    Returns:
+        bytes: Exported file contents
+    """
+    fileobj = io.BytesIO()
+    write_export(records, fileobj, format_type, **kwargs)
+    return fileobj.getvalue()
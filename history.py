@@ -0,0 +1,428 @@
+"""
+Search history storage for Yaswanth's AI Search Engine
+A durable SQLite (WAL) store for searches and chat messages, written in
+batches by a background thread and read back a page at a time
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import HISTORY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS searches ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, created_at REAL, "
+    "query TEXT, sources TEXT, success INTEGER, metrics TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_searches_created ON searches (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_searches_session ON searches (session_id, id)",
+    "CREATE TABLE IF NOT EXISTS search_sources (search_id INTEGER, source TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_search_sources ON search_sources (source, search_id)",
+    "CREATE TABLE IF NOT EXISTS messages ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, created_at REAL, "
+    "role TEXT, content TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)"
+)
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Open the history database in WAL mode, creating its tables
+
+    Args:
+        db_path (str): SQLite file path
+
+    Returns:
+        sqlite3.Connection: Connection usable from any thread
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    return conn
+
+
+class HistoryStore:
+    """
+    Append-only store for searches and chat messages
+
+    Writes are queued and committed by a background thread in batches of up
+    to batch_size records, at least every flush_interval seconds. Reads for a
+    session first wait until that session's queued records are committed, so
+    callers see their own writes without waiting on other sessions; reads
+    across sessions return what is already committed. Lookups by session,
+    time and source use indexes and return one page at a time, newest first
+    for searches.
+
+    Args:
+        db_path (str): SQLite file path
+        batch_size (int): Maximum records per write transaction
+        flush_interval (float): Maximum seconds a queued record waits
+        max_queue (int): Queued records before writers block
+        read_wait_timeout (float): Longest a read waits for its session's writes
+    """
+
+    def __init__(
+        self,
+        db_path: str = HISTORY_CONFIG["db_path"],
+        batch_size: int = HISTORY_CONFIG["batch_size"],
+        flush_interval: float = HISTORY_CONFIG["flush_interval"],
+        max_queue: int = HISTORY_CONFIG["max_queue"],
+        read_wait_timeout: float = HISTORY_CONFIG["read_wait_timeout"]
+    ):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.read_wait_timeout = read_wait_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        # Records are numbered in queue order; the writer advances _done_seq
+        self._enqueue_lock = threading.Lock()
+        self._seq_cond = threading.Condition()
+        self._queued_seq = 0
+        self._done_seq = 0
+        self._session_seq: Dict[Optional[str], int] = {}
+        self._conn = connect(db_path)
+        self._read_lock = threading.Lock()
+        self.failed_writes = 0
+        self._writer_conn = connect(db_path)
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def record_search(
+        self,
+        query: str,
+        sources: List[str],
+        session_id: Optional[str] = None,
+        success: bool = True,
+        metrics: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Queue a search for writing
+
+        Args:
+            query (str): Search query
+            sources (List[str]): Sources used
+            session_id (Optional[str]): Browser session or client the search belongs to
+            success (bool): Whether the search succeeded
+            metrics (Optional[Dict[str, Any]]): Timing metrics recorded for the search
+        """
+        self._enqueue("search", session_id, (session_id, time.time(), query, list(sources), success, metrics or {}))
+
+    def record_message(self, session_id: str, role: str, content: str) -> None:
+        """
+        Queue a chat message for writing
+
+        Args:
+            session_id (str): Browser session the message belongs to
+            role (str): 'user' or 'assistant'
+            content (str): Message text
+        """
+        self._enqueue("message", session_id, (session_id, time.time(), role, content))
+
+    def _enqueue(self, kind: str, session_id: Optional[str], record: Tuple) -> None:
+        # Numbering and queueing under one lock keeps sequence and queue order equal;
+        # _seq_cond is not held across put so a full queue cannot block the writer
+        with self._enqueue_lock:
+            with self._seq_cond:
+                self._queued_seq += 1
+                seq = self._session_seq[session_id] = self._queued_seq
+            self._queue.put((kind, seq, record))
+
+    def _write_loop(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # A waiting reader sends "flush" to have the batch committed now
+            while items[-1][0] != "flush" and len(items) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            batch = [(kind, record) for kind, _, record in items if kind != "flush"]
+            try:
+                if batch:
+                    self._write_batch(batch)
+            except Exception:
+                # History is best effort; a failed batch must not stop the writer
+                self.failed_writes += len(batch)
+                logger.exception("Dropped %d history records", len(batch))
+            finally:
+                self._mark_done(items)
+                for _ in items:
+                    self._queue.task_done()
+
+    def _mark_done(self, items: List[Tuple[str, Optional[int], Tuple]]) -> None:
+        done = max((seq for kind, seq, _ in items if kind != "flush"), default=None)
+        if done is None:
+            return
+        with self._seq_cond:
+            self._done_seq = done
+            for kind, _, record in items:
+                if kind != "flush" and self._session_seq.get(record[0], done + 1) <= done:
+                    del self._session_seq[record[0]]
+            self._seq_cond.notify_all()
+
+    def _wait_for_session(self, session_id: str) -> None:
+        """Wait until the session's queued records are committed, or read_wait_timeout passes"""
+        with self._seq_cond:
+            target = self._session_seq.get(session_id)
+            if target is None or target <= self._done_seq:
+                return
+        try:
+            self._queue.put_nowait(("flush", None, None))
+        except queue.Full:
+            # The writer is draining a full queue and will not wait out flush_interval
+            pass
+        with self._seq_cond:
+            self._seq_cond.wait_for(lambda: self._done_seq >= target, timeout=self.read_wait_timeout)
+
+    def _write_batch(self, batch: List[Tuple[str, Tuple]]) -> None:
+        conn = self._writer_conn
+        with conn:
+            for kind, record in batch:
+                if kind == "message":
+                    conn.execute(
+                        "INSERT INTO messages (session_id, created_at, role, content) VALUES (?, ?, ?, ?)",
+                        record
+                    )
+                    continue
+                session_id, created_at, query, sources, success, metrics = record
+                search_id = conn.execute(
+                    "INSERT INTO searches (session_id, created_at, query, sources, success, metrics) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (session_id, created_at, query, json.dumps(sources), int(success), json.dumps(metrics, default=str))
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO search_sources (search_id, source) VALUES (?, ?)",
+                    [(search_id, source) for source in sources]
+                )
+
+    def flush(self) -> None:
+        """Wait until every queued record from every session is committed"""
+        self._queue.join()
+
+    def get_searches(
+        self,
+        session_id: Optional[str] = None,
+        source: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        success: Optional[bool] = None,
+        before_id: Optional[int] = None,
+        limit: Optional[int] = HISTORY_CONFIG["page_size"]
+    ) -> List[Dict[str, Any]]:
+        """
+        Get one page of searches, newest first
+
+        Pass the smallest 'id' of a page as before_id to get the next page.
+
+        Args:
+            session_id (Optional[str]): Only searches from this session
+            source (Optional[str]): Only searches that used this source
+            since (Optional[float]): Only searches at or after this Unix time
+            until (Optional[float]): Only searches before this Unix time
+            success (Optional[bool]): Only successful or only failed searches
+            before_id (Optional[int]): Only searches older than this ID
+            limit (Optional[int]): Page size, or None for every match
+
+        Returns:
+            List[Dict[str, Any]]: Searches with id, session_id, timestamp,
+            created_at, query, sources, success and metrics
+        """
+        return self._select_searches(
+            session_id, source, since, until, success,
+            ("searches.id < ?", before_id), "DESC", limit
+        )
+
+    def iter_searches(
+        self,
+        session_id: Optional[str] = None,
+        source: Optional[str] = None,
+        success: Optional[bool] = None,
+        page_size: int = HISTORY_CONFIG["max_page_size"]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over matching searches, oldest first, one page at a time
+
+        Args:
+            session_id (Optional[str]): Only searches from this session
+            source (Optional[str]): Only searches that used this source
+            success (Optional[bool]): Only successful or only failed searches
+            page_size (int): Rows read per query
+
+        Returns:
+            Iterator[Dict[str, Any]]: Searches as returned by get_searches
+        """
+        after_id = None
+        while True:
+            page = self._select_searches(
+                session_id, source, None, None, success,
+                ("searches.id > ?", after_id), "ASC", page_size
+            )
+            yield from page
+            if len(page) < page_size:
+                return
+            after_id = page[-1]["id"]
+
+    def _select_searches(
+        self,
+        session_id: Optional[str],
+        source: Optional[str],
+        since: Optional[float],
+        until: Optional[float],
+        success: Optional[bool],
+        cursor: Tuple[str, Optional[int]],
+        order: str,
+        limit: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        conditions, params = [], []
+        table = "searches"
+        if source is not None:
+            table = "searches JOIN search_sources ON search_sources.search_id = searches.id"
+            conditions.append("search_sources.source = ?")
+            params.append(source)
+        for clause, value in (
+            ("searches.session_id = ?", session_id),
+            ("searches.created_at >= ?", since),
+            ("searches.created_at < ?", until),
+            ("searches.success = ?", None if success is None else int(success)),
+            cursor
+        ):
+            if value is not None:
+                conditions.append(clause)
+                params.append(value)
+
+        sql = (
+            f"SELECT searches.id, searches.session_id, searches.created_at, searches.query, "
+            f"searches.sources, searches.success, searches.metrics FROM {table}"
+        )
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY searches.id {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        if session_id is not None:
+            self._wait_for_session(session_id)
+        with self._read_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "id": search_id,
+                "session_id": row_session,
+                "timestamp": datetime.fromtimestamp(created_at).strftime("%Y-%m-%d %H:%M:%S"),
+                "created_at": created_at,
+                "query": query,
+                "sources": json.loads(sources),
+                "success": bool(succeeded),
+                "metrics": json.loads(metrics)
+            }
+            for search_id, row_session, created_at, query, sources, succeeded, metrics in rows
+        ]
+
+    def count_searches(self, session_id: Optional[str] = None) -> int:
+        """Count searches, optionally for one session"""
+        if session_id is not None:
+            self._wait_for_session(session_id)
+        with self._read_lock:
+            if session_id is None:
+                return self._conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM searches WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def get_messages(
+        self,
+        session_id: str,
+        before_id: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a session's chat messages in conversation order
+
+        With a limit, the page holds the newest messages older than
+        before_id.
+
+        Args:
+            session_id (str): Browser session
+            before_id (Optional[int]): Only messages older than this ID
+            limit (Optional[int]): Page size, or None for every message
+
+        Returns:
+            List[Dict[str, Any]]: Messages with id, role, content and created_at, oldest first
+        """
+        sql = "SELECT id, role, content, created_at FROM messages WHERE session_id = ?"
+        params: List[Any] = [session_id]
+        if before_id is not None:
+            sql += " AND id < ?"
+            params.append(before_id)
+        sql += " ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        self._wait_for_session(session_id)
+        with self._read_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"id": message_id, "role": role, "content": content, "created_at": created_at}
+            for message_id, role, content, created_at in reversed(rows)
+        ]
+
+    def count_messages(self, session_id: str) -> int:
+        """Count a session's chat messages"""
+        self._wait_for_session(session_id)
+        with self._read_lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+
+_history_store: Optional[HistoryStore] = None
+_history_store_lock = threading.Lock()
+
+
+def get_history_store() -> HistoryStore:
+    """
+    Get the process-wide history store
+
+    Returns:
+        HistoryStore: Store at HISTORY_CONFIG["db_path"]
+    """
+    global _history_store
+    with _history_store_lock:
+        if _history_store is None:
+            _history_store = HistoryStore()
+            atexit.register(_history_store.flush)
+        return _history_store
+
+
+def set_history_store(history_store: Optional[HistoryStore]) -> None:
+    """
+    Replace the process-wide history store
+
+    Args:
+        history_store (Optional[HistoryStore]): New store, or None to recreate
+            the configured one on next use
+    """
+    global _history_store
+    with _history_store_lock:
+        _history_store = history_store
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Offline ingestion for Yaswanth's AI Search Engine
+Loads local text files and web pages into the Local Knowledge search source.
+Re-running it only embeds documents that are new or changed.
+
+Usage: python ingest.py docs/ notes.md https://docs.smith.langchain.com/
+"""
+
+import argparse
+import os
+import sys
+from typing import List
+
+from langchain_core.documents import Document
+
+from config import KNOWLEDGE_CONFIG
+from knowledge import ingest_documents
+
+
+def load_documents(locations: List[str]) -> List[Document]:
+    """
+    Load documents from files, directories and URLs
+
+    Directories are walked for files with the configured extensions. URLs are
+    fetched with LangChain's WebBaseLoader.
+
+    Args:
+        locations (List[str]): File paths, directory paths or http(s) URLs
+
+    Returns:
+        List[Document]: Loaded documents with a 'source' in their metadata
+    """
+    documents = []
+    urls = [location for location in locations if location.startswith(("http://", "https://"))]
+
+    for location in locations:
+        if location in urls:
+            continue
+        if os.path.isdir(location):
+            paths = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(location)
+                for name in names
+                if os.path.splitext(name)[1].lower() in KNOWLEDGE_CONFIG["file_extensions"]
+            )
+        else:
+            paths = [location]
+
+        for path in paths:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                documents.append(Document(
+                    page_content=f.read(),
+                    metadata={"source": path, "title": os.path.basename(path)}
+                ))
+
+    if urls:
+        from langchain_community.document_loaders import WebBaseLoader
+
+        documents.extend(WebBaseLoader(urls).load())
+
+    return documents
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Build the Local Knowledge index from files and web pages")
+    parser.add_argument("locations", nargs="+", help="Files, directories or URLs to ingest")
+    parser.add_argument("--directory", default=KNOWLEDGE_CONFIG["directory"], help="Where the index is stored")
+    parser.add_argument("--prune", action="store_true", help="Delete indexed documents not given in this run")
+    args = parser.parse_args(argv)
+
+    print(f"🔄 Loading {len(args.locations)} location(s)...")
+    documents = load_documents(args.locations)
+    if not documents:
+        print("❌ No documents found")
+        return 1
+
+    summary = ingest_documents(documents, args.directory, prune=args.prune)
+    print(
+        f"✅ {summary['documents']} documents ({summary['unchanged_documents']} unchanged) in {args.directory}: "
+        f"{summary['chunks_embedded']} chunks embedded, {summary['chunks_reused']} reused, "
+        f"{summary['chunks_removed']} removed"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,488 @@
+"""
+Local knowledge base for Yaswanth's AI Search Engine
+Stores ingested document chunks in a persistent FAISS index that is
+memory-mapped at query time, with chunk text kept in a SQLite store
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from config import KNOWLEDGE_CONFIG
+from embeddings import get_embedder
+from lexical import LexicalIndex, publish_lexical_index, reciprocal_rank_fusion
+
+# Bump when the chunk store layout changes; older stores are rebuilt
+STORE_SCHEMA = "2"
+
+
+def get_knowledge_paths(directory: Optional[str] = None) -> Dict[str, str]:
+    """
+    Get the index and chunk store paths for a knowledge directory
+
+    Args:
+        directory (Optional[str]): Knowledge directory, defaults to the configured one
+
+    Returns:
+        Dict[str, str]: 'directory', 'index', 'store' and 'lexical' (pointer file) paths
+    """
+    directory = directory or KNOWLEDGE_CONFIG["directory"]
+    return {
+        'directory': directory,
+        'index': os.path.join(directory, KNOWLEDGE_CONFIG["index_file"]),
+        'store': os.path.join(directory, KNOWLEDGE_CONFIG["store_db"]),
+        'lexical': os.path.join(directory, KNOWLEDGE_CONFIG["lexical_pointer"])
+    }
+
+
+def open_store(store_path: str, read_only: bool = False) -> sqlite3.Connection:
+    """
+    Open the chunk store, creating its tables when writable
+
+    The store is also the ingestion manifest: 'documents' holds a content hash
+    per source and 'chunks' maps each chunk hash to its vector ID. Vector IDs
+    are AUTOINCREMENT row IDs, so they are never reused and an index loaded
+    before an ingestion cannot point at a different chunk.
+
+    Args:
+        store_path (str): SQLite file path
+        read_only (bool): Open without write access
+
+    Returns:
+        sqlite3.Connection: Store connection
+    """
+    if read_only:
+        return sqlite3.connect(f"file:{store_path}?mode=ro", uri=True, check_same_thread=False)
+
+    conn = sqlite3.connect(store_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    schema = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    if schema is None or schema[0] != STORE_SCHEMA:
+        # Stores from an older layout are rebuilt from scratch
+        conn.execute("DROP TABLE IF EXISTS chunks")
+        conn.execute("DROP TABLE IF EXISTS documents")
+        conn.execute("DELETE FROM meta")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('schema', ?)", (STORE_SCHEMA,))
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS documents ("
+        "source TEXT PRIMARY KEY, content_hash TEXT, updated_at REAL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS chunks ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT, title TEXT, text TEXT, chunk_hash TEXT)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks (source)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_hash ON chunks (chunk_hash)")
+    conn.commit()
+    return conn
+
+
+def content_hash(text: str) -> str:
+    """Get the SHA-256 hex digest of a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def write_index(index: faiss.Index, index_path: str) -> None:
+    """Write an index next to its final path and swap it in atomically"""
+    temp_path = f"{index_path}.tmp"
+    faiss.write_index(index, temp_path)
+    os.replace(temp_path, index_path)
+
+
+def get_index_version(paths: Dict[str, str]) -> tuple:
+    """
+    Identify the vector and lexical index files on disk
+
+    Each atomic swap gives a file a new inode, so the version changes on
+    every ingestion that rewrote either index.
+
+    Args:
+        paths (Dict[str, str]): Paths from get_knowledge_paths
+
+    Returns:
+        tuple: Inode and modification time of each file
+    """
+    stat = os.stat(paths['index'])
+    version = (stat.st_ino, stat.st_mtime_ns)
+    if os.path.exists(paths['lexical']):
+        stat = os.stat(paths['lexical'])
+        version += (stat.st_ino, stat.st_mtime_ns)
+    return version
+
+
+def split_documents(documents: List[Document]) -> List[Document]:
+    """
+    Split documents into overlapping chunks
+
+    Args:
+        documents (List[Document]): Loaded documents
+
+    Returns:
+        List[Document]: Chunks carrying their document's metadata
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=KNOWLEDGE_CONFIG["chunk_size"],
+        chunk_overlap=KNOWLEDGE_CONFIG["chunk_overlap"]
+    )
+    return splitter.split_documents(documents)
+
+
+def embed_in_batches(embedder: Any, texts: List[str], batch_size: int) -> Iterable[np.ndarray]:
+    """
+    Embed texts in fixed-size batches to bound memory use
+
+    Args:
+        embedder: Embedder with an encode(texts) method
+        texts (List[str]): Texts to embed
+        batch_size (int): Texts per encode call
+
+    Yields:
+        np.ndarray: Float32 vectors for each batch
+    """
+    for start in range(0, len(texts), batch_size):
+        yield np.ascontiguousarray(embedder.encode(texts[start:start + batch_size]), dtype=np.float32)
+
+
+def load_writable_index(conn: sqlite3.Connection, index_path: str, embedder: Any) -> Tuple[faiss.Index, bool]:
+    """
+    Load the index for ingestion and reconcile it with the chunk store
+
+    The index is written before the store commits, so after a crash the
+    index may hold vectors the store never recorded; those are removed. Store
+    rows without a vector are deleted and their documents marked for
+    re-ingestion. A new embedder or a missing index starts an empty
+    knowledge base.
+
+    Args:
+        conn (sqlite3.Connection): Writable store connection
+        index_path (str): FAISS index path
+        embedder: Embedder used for this ingestion
+
+    Returns:
+        Tuple[faiss.Index, bool]: In-memory index ready for updates, and whether
+        it already differs from the file on disk
+    """
+    meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    if (
+        not os.path.exists(index_path)
+        or meta.get("embedder") != embedder.name
+        or meta.get("dim") != str(embedder.dim)
+    ):
+        with conn:
+            conn.execute("DELETE FROM chunks")
+            conn.execute("DELETE FROM documents")
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("embedder", embedder.name), ("dim", str(embedder.dim))]
+            )
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(embedder.dim)), True
+
+    index = faiss.read_index(index_path)
+    index_ids = set(faiss.vector_to_array(index.id_map).tolist())
+    store_ids = {row[0] for row in conn.execute("SELECT id FROM chunks")}
+
+    orphans = index_ids - store_ids
+    if orphans:
+        index.remove_ids(np.asarray(sorted(orphans), dtype=np.int64))
+
+    missing = store_ids - index_ids
+    if missing:
+        with conn:
+            placeholders = ','.join('?' * len(missing))
+            conn.execute(
+                f"UPDATE documents SET content_hash = NULL WHERE source IN "
+                f"(SELECT source FROM chunks WHERE id IN ({placeholders}))",
+                list(missing)
+            )
+            conn.execute(f"DELETE FROM chunks WHERE id IN ({placeholders})", list(missing))
+    return index, bool(orphans)
+
+
+def ingest_documents(
+    documents: List[Document],
+    directory: Optional[str] = None,
+    embedder: Any = None,
+    batch_size: int = KNOWLEDGE_CONFIG["embed_batch_size"],
+    prune: bool = False
+) -> Dict[str, int]:
+    """
+    Incrementally add documents to the knowledge base
+
+    Documents whose content hash is unchanged are skipped without splitting.
+    Changed documents are re-split; chunks whose hash is already stored keep
+    their vector, vectors of identical chunks elsewhere are copied, and only
+    the remaining chunks are embedded, in batches. Chunks that disappeared
+    are deleted from the index. The index file is only rewritten when
+    something changed. The BM25 index is rebuilt from the chunk store
+    whenever chunks changed; that needs tokenizing but no embedding.
+
+    Args:
+        documents (List[Document]): Documents keyed by their 'source' metadata
+        directory (Optional[str]): Knowledge directory, defaults to the configured one
+        embedder: Embedder to use, defaults to the process-wide embedder
+        batch_size (int): Chunks embedded per batch
+        prune (bool): Also delete documents that are not in this run
+
+    Returns:
+        Dict[str, int]: Counts of documents and chunks added, unchanged, reused and removed
+    """
+    paths = get_knowledge_paths(directory)
+    os.makedirs(os.path.dirname(paths['index']) or ".", exist_ok=True)
+    embedder = embedder or get_embedder()
+    summary = {
+        'documents': 0, 'unchanged_documents': 0, 'removed_documents': 0,
+        'chunks_embedded': 0, 'chunks_reused': 0, 'chunks_removed': 0
+    }
+
+    conn = open_store(paths['store'])
+    try:
+        index, index_changed = load_writable_index(conn, paths['index'], embedder)
+        known = dict(conn.execute("SELECT source, content_hash FROM documents").fetchall())
+        seen = set()
+        stale_ids: List[int] = []
+        new_chunks: List[tuple] = []
+        updated_documents: List[tuple] = []
+
+        for document in documents:
+            source = document.metadata.get("source") or content_hash(document.page_content)
+            if source in seen:
+                continue
+            seen.add(source)
+            summary['documents'] += 1
+
+            document_hash = content_hash(document.page_content)
+            if known.get(source) == document_hash:
+                summary['unchanged_documents'] += 1
+                continue
+
+            stored = dict(conn.execute(
+                "SELECT chunk_hash, id FROM chunks WHERE source = ?", (source,)
+            ).fetchall())
+            wanted = {}
+            for chunk in split_documents([document]):
+                wanted.setdefault(content_hash(chunk.page_content), chunk)
+
+            stale_ids.extend(vector_id for chunk_hash, vector_id in stored.items() if chunk_hash not in wanted)
+            summary['chunks_reused'] += sum(1 for chunk_hash in wanted if chunk_hash in stored)
+            title = document.metadata.get("title") or source
+            new_chunks.extend(
+                (source, title, chunk.page_content, chunk_hash)
+                for chunk_hash, chunk in wanted.items()
+                if chunk_hash not in stored
+            )
+            updated_documents.append((source, document_hash, time.time()))
+
+        removed_sources = [source for source in known if source not in seen] if prune else []
+        for source in removed_sources:
+            stale_ids.extend(row[0] for row in conn.execute("SELECT id FROM chunks WHERE source = ?", (source,)))
+        summary['removed_documents'] = len(removed_sources)
+
+        # Copy vectors of identical chunks instead of embedding them again
+        vectors = np.zeros((len(new_chunks), embedder.dim), dtype=np.float32)
+        pending: Dict[str, List[int]] = {}
+        for row, (_, _, _, chunk_hash) in enumerate(new_chunks):
+            existing = conn.execute(
+                "SELECT id FROM chunks WHERE chunk_hash = ? LIMIT 1", (chunk_hash,)
+            ).fetchone()
+            if existing is not None:
+                vectors[row] = index.reconstruct(existing[0])
+                summary['chunks_reused'] += 1
+            else:
+                pending.setdefault(chunk_hash, []).append(row)
+
+        rows = list(pending.values())
+        offset = 0
+        for batch in embed_in_batches(embedder, [new_chunks[group[0]][2] for group in rows], batch_size):
+            for group, vector in zip(rows[offset:offset + len(batch)], batch):
+                vectors[group] = vector
+            offset += len(batch)
+        summary['chunks_embedded'] = len(rows)
+        summary['chunks_reused'] += sum(len(group) - 1 for group in rows)
+
+        with conn:
+            ids = [
+                conn.execute(
+                    "INSERT INTO chunks (source, title, text, chunk_hash) VALUES (?, ?, ?, ?)", chunk
+                ).lastrowid
+                for chunk in new_chunks
+            ]
+            if stale_ids:
+                conn.executemany("DELETE FROM chunks WHERE id = ?", [(vector_id,) for vector_id in stale_ids])
+            conn.executemany(
+                "INSERT OR REPLACE INTO documents (source, content_hash, updated_at) VALUES (?, ?, ?)",
+                updated_documents
+            )
+            conn.executemany("DELETE FROM documents WHERE source = ?", [(source,) for source in removed_sources])
+
+            if ids:
+                index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+            if stale_ids:
+                summary['chunks_removed'] = index.remove_ids(np.asarray(stale_ids, dtype=np.int64))
+
+            # Both indexes are swapped in before the store commits; see load_writable_index
+            if ids or stale_ids or index_changed or not os.path.exists(paths['lexical']):
+                publish_lexical_index(paths['directory'], conn.execute("SELECT id, text FROM chunks ORDER BY id"))
+            if ids or stale_ids or index_changed:
+                write_index(index, paths['index'])
+    finally:
+        conn.close()
+
+    return summary
+
+
+class LocalKnowledgeIndex:
+    """
+    Read-only view of a knowledge base built by ingest_documents
+
+    The FAISS index and the BM25 postings are memory-mapped, so opening them
+    costs little regardless of size and pages are shared between processes.
+    When hybrid search is enabled, vector and BM25 rankings are merged with
+    reciprocal rank fusion.
+
+    Args:
+        directory (Optional[str]): Knowledge directory, defaults to the configured one
+        embedder: Query embedder, defaults to the backend the index was built with
+    """
+
+    def __init__(self, directory: Optional[str] = None, embedder: Any = None):
+        self.paths = get_knowledge_paths(directory)
+        self.version = get_index_version(self.paths)
+        self.index = faiss.read_index(
+            self.paths['index'],
+            getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+        )
+        self._conn = open_store(self.paths['store'], read_only=True)
+        self._lock = threading.Lock()
+
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        self.embedder = embedder or get_embedder(meta.get("embedder"))
+        if self.embedder.dim != self.index.d:
+            raise ValueError(
+                f"Knowledge index has dimension {self.index.d} but the "
+                f"'{self.embedder.name}' embedder produces {self.embedder.dim}; re-run ingestion"
+            )
+        self.lexical = self._load_lexical()
+
+    def _load_lexical(self) -> Optional[LexicalIndex]:
+        """Open the current BM25 generation; search falls back to vectors only without it"""
+        try:
+            with open(self.paths['lexical'], "r", encoding="utf-8") as f:
+                generation = f.read().strip()
+            return LexicalIndex(os.path.join(self.paths['directory'], generation))
+        except (OSError, ValueError):
+            return None
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    def search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Find the chunks that best match a query
+
+        Args:
+            query (str): Search query
+            k (int): Maximum number of chunks
+
+        Returns:
+            List[Dict[str, Any]]: Chunks with 'id', 'score' (cosine similarity, or the fused
+            rank score in hybrid mode), 'source', 'title' and 'text', best first
+        """
+        if not len(self) or k <= 0:
+            return []
+
+        hybrid = KNOWLEDGE_CONFIG["hybrid_search"] and self.lexical is not None
+        candidates = max(k, KNOWLEDGE_CONFIG["hybrid_candidates"]) if hybrid else k
+        scores, ids = self.index.search(self.embedder.encode([query]), min(candidates, len(self)))
+        ranked = [(int(vector_id), float(score)) for vector_id, score in zip(ids[0], scores[0]) if vector_id != -1]
+
+        if hybrid:
+            lexical_ranked = self.lexical.search(query, candidates)
+            ranked = reciprocal_rank_fusion([
+                [vector_id for vector_id, _ in ranked],
+                [vector_id for vector_id, _ in lexical_ranked]
+            ])
+        hits = dict(ranked[:k])
+        if not hits:
+            return []
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, source, title, text FROM chunks WHERE id IN ({','.join('?' * len(hits))})",
+                list(hits)
+            ).fetchall()
+
+        # Rows deleted by a concurrent rebuild are skipped
+        results = [
+            {'id': row[0], 'score': hits[row[0]], 'source': row[1], 'title': row[2], 'text': row[3]}
+            for row in rows
+        ]
+        return sorted(results, key=lambda result: result['score'], reverse=True)
+
+    def close(self) -> None:
+        """Close the chunk store"""
+        self._conn.close()
+
+
+_knowledge_index: Optional[LocalKnowledgeIndex] = None
+_knowledge_lock = threading.Lock()
+
+
+def get_knowledge_index(directory: Optional[str] = None) -> Optional[LocalKnowledgeIndex]:
+    """
+    Get the process-wide knowledge index, reopening it after re-ingestion
+
+    Args:
+        directory (Optional[str]): Knowledge directory, defaults to the configured one
+
+    Returns:
+        Optional[LocalKnowledgeIndex]: Loaded index, or None if nothing has been ingested
+    """
+    global _knowledge_index
+    paths = get_knowledge_paths(directory)
+
+    try:
+        version = get_index_version(paths)
+    except FileNotFoundError:
+        return None
+
+    with _knowledge_lock:
+        current = _knowledge_index
+        # The old index stays usable by searches already holding it
+        if current is None or current.paths != paths or current.version != version:
+            _knowledge_index = LocalKnowledgeIndex(directory)
+        return _knowledge_index
+
+
+def search_local_knowledge(query: str, max_results: int, content_length: int) -> str:
+    """
+    Search the local knowledge base and format the results for the agent
+
+    Args:
+        query (str): Search query
+        max_results (int): Maximum number of chunks
+        content_length (int): Maximum characters per chunk
+
+    Returns:
+        str: Formatted results, or a note that nothing was found
+    """
+    index = get_knowledge_index()
+    if index is None:
+        return "No local knowledge base has been built yet. Run 'python ingest.py <paths or URLs>' first."
+
+    results = index.search(query, max_results)
+    if not results:
+        return "No good local knowledge result was found"
+
+    return "\n\n".join(
+        f"Source: {result['title']}\nContent: {result['text'][:content_length]}"
+        for result in results
+    )
@@ -0,0 +1,199 @@
+"""
+Lexical search for Yaswanth's AI Search Engine
+A BM25 inverted index with array-backed postings, memory-mapped from disk,
+and reciprocal rank fusion for combining ranked result lists
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from config import KNOWLEDGE_CONFIG
+from utils import STOP_WORDS
+
+# Keeps identifiers such as '2301.12345', 'gpt-4' and 'tcp/ip' as single terms
+_TERM_PATTERN = re.compile(r'\w+(?:[.\-/]\w+)*')
+_PART_PATTERN = re.compile(r'[.\-/]')
+
+ARRAY_FILES = ("offsets", "postings", "frequencies", "lengths", "ids")
+
+
+def tokenize_terms(text: str) -> List[str]:
+    """
+    Split text into index terms
+
+    Compound identifiers are kept whole and also split into their parts, so
+    'GPT-4' matches queries for 'gpt-4' and for 'gpt'. Short acronyms are
+    kept; only stop words are dropped.
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        List[str]: Lowercased terms in order of appearance
+    """
+    terms = []
+    for token in _TERM_PATTERN.findall(text.lower()):
+        if _PART_PATTERN.search(token):
+            terms.append(token)
+            terms.extend(part for part in _PART_PATTERN.split(token) if part and part not in STOP_WORDS)
+        elif token not in STOP_WORDS:
+            terms.append(token)
+    return terms
+
+
+def write_lexical_index(directory: str, documents: Iterable[Tuple[int, str]]) -> None:
+    """
+    Build a BM25 index over documents and save it as flat arrays
+
+    Postings for term t are postings[offsets[t]:offsets[t + 1]], holding
+    document positions, with matching term frequencies in frequencies.
+    ids maps document positions back to the caller's IDs.
+
+    Args:
+        directory (str): Empty or missing directory to write into
+        documents (Iterable[Tuple[int, str]]): (document ID, text) pairs
+    """
+    terms: Dict[str, int] = {}
+    ids, lengths = array('q'), array('i')
+    posting_terms, posting_docs, posting_freqs = array('i'), array('i'), array('i')
+
+    for position, (document_id, text) in enumerate(documents):
+        counts = Counter(tokenize_terms(text))
+        ids.append(document_id)
+        lengths.append(sum(counts.values()))
+        for term, count in counts.items():
+            posting_terms.append(terms.setdefault(term, len(terms)))
+            posting_docs.append(position)
+            posting_freqs.append(count)
+
+    term_ids = np.frombuffer(posting_terms, dtype=np.int32)
+    order = np.argsort(term_ids, kind="stable")
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+
+    os.makedirs(directory, exist_ok=True)
+    arrays = {
+        "offsets": offsets,
+        "postings": np.frombuffer(posting_docs, dtype=np.int32)[order],
+        "frequencies": np.frombuffer(posting_freqs, dtype=np.int32)[order].astype(np.float32),
+        "lengths": np.frombuffer(lengths, dtype=np.int32).astype(np.float32),
+        "ids": np.frombuffer(ids, dtype=np.int64)
+    }
+    for name in ARRAY_FILES:
+        np.save(os.path.join(directory, f"{name}.npy"), arrays[name])
+    with open(os.path.join(directory, "terms.json"), "w", encoding="utf-8") as f:
+        json.dump(list(terms), f)
+
+
+def publish_lexical_index(root: str, documents: Iterable[Tuple[int, str]]) -> str:
+    """
+    Write a new generation of the lexical index and make it current
+
+    Each generation lives in its own directory and 'lexical.current' is
+    swapped atomically to point at it, so readers never see a partial index.
+    Older generations are removed on a best-effort basis.
+
+    Args:
+        root (str): Knowledge directory
+        documents (Iterable[Tuple[int, str]]): (document ID, text) pairs
+
+    Returns:
+        str: Name of the new generation directory
+    """
+    generation = f"lexical-{time.time_ns()}"
+    write_lexical_index(os.path.join(root, generation), documents)
+
+    pointer = os.path.join(root, KNOWLEDGE_CONFIG["lexical_pointer"])
+    with open(f"{pointer}.tmp", "w", encoding="utf-8") as f:
+        f.write(generation)
+    os.replace(f"{pointer}.tmp", pointer)
+
+    for name in os.listdir(root):
+        if name.startswith("lexical-") and name != generation:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return generation
+
+
+class LexicalIndex:
+    """
+    Read-only BM25 index loaded with memory-mapped arrays
+
+    Args:
+        directory (str): Generation directory written by write_lexical_index
+        k1 (float): Term frequency saturation
+        b (float): Document length normalization
+    """
+
+    def __init__(self, directory: str, k1: float = KNOWLEDGE_CONFIG["bm25_k1"], b: float = KNOWLEDGE_CONFIG["bm25_b"]):
+        self.k1 = k1
+        self.b = b
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in ARRAY_FILES}
+        self.offsets = arrays["offsets"]
+        self.postings = arrays["postings"]
+        self.frequencies = arrays["frequencies"]
+        self.lengths = arrays["lengths"]
+        self.ids = arrays["ids"]
+        with open(os.path.join(directory, "terms.json"), "r", encoding="utf-8") as f:
+            self.terms = {term: term_id for term_id, term in enumerate(json.load(f))}
+        self.average_length = float(np.mean(self.lengths)) if len(self.lengths) else 1.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Rank documents by BM25 score for a query
+
+        Only the postings of the query terms are read.
+
+        Args:
+            query (str): Search query
+            k (int): Maximum number of documents
+
+        Returns:
+            List[Tuple[int, float]]: (document ID, score) pairs, best first
+        """
+        term_ids = [self.terms[term] for term in dict.fromkeys(tokenize_terms(query)) if term in self.terms]
+        if not term_ids or not len(self) or k <= 0:
+            return []
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        norms = self.k1 * (1 - self.b + self.b * self.lengths / (self.average_length or 1.0))
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            documents = self.postings[start:end]
+            frequencies = self.frequencies[start:end]
+            idf = np.log(1 + (len(self) - len(documents) + 0.5) / (len(documents) + 0.5))
+            scores[documents] += idf * frequencies * (self.k1 + 1) / (frequencies + norms[documents])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(scores[matched], -k)[-k:]]
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(self.ids[position]), float(scores[position])) for position in ranked]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = KNOWLEDGE_CONFIG["rrf_k"]) -> List[Tuple[Hashable, float]]:
+    """
+    Merge ranked lists by summing 1 / (k + rank) for each item
+
+    Args:
+        rankings (Sequence[Sequence[Hashable]]): Ranked item lists, best first
+        k (int): Damping constant; larger values flatten the rank weights
+
+    Returns:
+        List[Tuple[Hashable, float]]: Items with fused scores, best first
+    """
+    fused: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda entry: entry[1], reverse=True)
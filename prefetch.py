@@ -0,0 +1,120 @@
+"""
+Speculative prefetch for Yaswanth's AI Search Engine
+Runs likely follow-up queries through the search tools in the background so
+their results are already in the tool result cache when the user asks
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+from cache import LRUCache
+from config import PREFETCH_CONFIG
+from utils import get_search_suggestions
+
+
+def _lower_thread_priority() -> None:
+    """Raise the niceness of the calling worker thread where the OS allows it"""
+    try:
+        # On Linux the niceness of a thread ID applies to that thread only
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_CONFIG["niceness"])
+    except (AttributeError, OSError):
+        pass
+
+
+class Prefetcher:
+    """
+    Background warmer for the tool result cache
+
+    Work goes to a small pool of low-priority threads. When every slot is
+    taken, new work is dropped instead of queued, so prefetching never
+    builds a backlog behind real searches.
+
+    Args:
+        warm (Callable[[str, str, int, str], Tuple[str, str]]): Takes (source,
+            query, max_results, response_length) and returns (outcome, cache key).
+            The outcome is 'warmed', 'cached', 'throttled' or 'uncacheable'
+        workers (int): Worker threads
+        max_pending (int): Maximum queued and running prefetches
+        tracked_keys (int): Maximum prefetched keys remembered for hit-rate tracking
+    """
+
+    def __init__(
+        self,
+        warm: Callable[[str, str, int, str], Tuple[str, str]],
+        workers: int = PREFETCH_CONFIG["workers"],
+        max_pending: int = PREFETCH_CONFIG["max_pending"],
+        tracked_keys: int = PREFETCH_CONFIG["tracked_keys"]
+    ):
+        self.warm = warm
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="prefetch",
+            initializer=_lower_thread_priority
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._prefetched = LRUCache(tracked_keys)
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, event: str) -> None:
+        with self._lock:
+            self._counters[event] = self._counters.get(event, 0) + 1
+
+    def submit(self, query: str, sources: List[str], max_results: int, response_length: str) -> List[str]:
+        """
+        Queue the top follow-up suggestions for a query
+
+        Args:
+            query (str): Query that was just answered
+            sources (List[str]): Sources to warm
+            max_results (int): Maximum results per source, as used by the tools
+            response_length (str): Response length, as used by the tools
+
+        Returns:
+            List[str]: Suggestions that were queued
+        """
+        suggestions = get_search_suggestions(query)[:PREFETCH_CONFIG["suggestions"]]
+        for suggestion in suggestions:
+            for source in sources:
+                if not self._slots.acquire(blocking=False):
+                    self._count("dropped")
+                    continue
+                self._count("submitted")
+                self._pool.submit(self._run, source, suggestion, max_results, response_length)
+        return suggestions
+
+    def _run(self, source: str, query: str, max_results: int, response_length: str) -> None:
+        try:
+            outcome, key = self.warm(source, query, max_results, response_length)
+            if outcome == "warmed":
+                self._prefetched.set(key, True)
+            self._count(outcome)
+        except Exception:
+            self._count("failed")
+        finally:
+            self._slots.release()
+
+    def record_request(self, key: str, hit: bool) -> None:
+        """
+        Note a real tool call, counting it as used if a prefetch warmed its result
+
+        Args:
+            key (str): Tool result cache key of the call
+            hit (bool): Whether the call was answered from the cache
+        """
+        if self._prefetched.pop(key) is not None:
+            self._count("used" if hit else "expired")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get prefetch counters and the share of warmed results that were used
+
+        Returns:
+            Dict[str, float]: Outcome counters and 'hit_rate'
+        """
+        with self._lock:
+            counters = dict(self._counters)
+        warmed = counters.get("warmed", 0)
+        return {**counters, 'hit_rate': counters.get("used", 0) / warmed if warmed else 0.0}
@@ -0,0 +1,252 @@
+"""
+Rate limiting for Yaswanth's AI Search Engine
+Token-bucket limiters keyed by search source and by Groq API key, shared by
+every caller in the process, and single-flight coalescing of identical calls
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from config import API_CONFIG, SEARCH_SOURCES
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (Optional[float]): Maximum burst size, defaults to max(1, rate)
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Take tokens from the bucket, waiting for them if needed
+
+        Args:
+            tokens (float): Tokens to take
+            blocking (bool): Wait for tokens instead of failing immediately
+            timeout (Optional[float]): Maximum seconds to wait
+
+        Returns:
+            bool: True if the tokens were taken
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.acquired += 1
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+
+            if not blocking or (deadline is not None and now + wait > deadline):
+                return False
+            time.sleep(wait)
+            with self._lock:
+                self.waited += wait
+
+
+_limiters: Dict[Hashable, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def set_rate_limit(key: Hashable, rate: Optional[float], capacity: Optional[float] = None) -> None:
+    """
+    Set or remove the rate limit for a key
+
+    Args:
+        key (Hashable): Limiter key, e.g. a source name
+        rate (Optional[float]): Requests per second, or None to remove the limit
+        capacity (Optional[float]): Maximum burst size
+    """
+    with _limiters_lock:
+        if rate:
+            _limiters[key] = TokenBucket(rate, capacity)
+        else:
+            _limiters.pop(key, None)
+
+
+def get_configured_rate(key: Hashable) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Get the configured rate and burst size for a limiter key
+
+    Source names use their SEARCH_SOURCES settings and ("groq", key hash)
+    keys use the API_CONFIG request limits.
+
+    Args:
+        key (Hashable): Limiter key
+
+    Returns:
+        Tuple[Optional[float], Optional[float]]: Requests per second (None if
+        unlimited) and burst size
+    """
+    if isinstance(key, str):
+        settings = SEARCH_SOURCES.get(key, {})
+        return settings.get("rate_limit"), settings.get("rate_burst")
+    if isinstance(key, tuple) and key and key[0] == "groq":
+        return API_CONFIG["requests_per_second"], API_CONFIG["request_burst"]
+    return None, None
+
+
+def get_rate_limiter(key: Hashable) -> Optional[TokenBucket]:
+    """
+    Get the limiter for a key, creating it from configuration
+
+    Args:
+        key (Hashable): Limiter key, a source name or ("groq", key hash)
+
+    Returns:
+        Optional[TokenBucket]: Limiter, or None if the key is not limited
+    """
+    with _limiters_lock:
+        if key not in _limiters:
+            rate, capacity = get_configured_rate(key)
+            _limiters[key] = TokenBucket(rate, capacity) if rate else None
+        return _limiters[key]
+
+
+def acquire(key: Hashable) -> None:
+    """
+    Wait until a call for the key is allowed
+
+    Args:
+        key (Hashable): Limiter key, e.g. a source name
+    """
+    limiter = get_rate_limiter(key)
+    if limiter is not None:
+        limiter.acquire()
+
+
+def try_acquire(key: Hashable) -> bool:
+    """
+    Take a token for the key only if one is available right now
+
+    Args:
+        key (Hashable): Limiter key, e.g. a source name
+
+    Returns:
+        bool: True if the call may go ahead
+    """
+    limiter = get_rate_limiter(key)
+    return limiter is None or limiter.acquire(blocking=False)
+
+
+def get_rate_limit_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Get acquire and wait totals for every active limiter
+
+    Returns:
+        Dict[str, Dict[str, float]]: Counters keyed by source name or 'groq:<key hash prefix>'
+    """
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    stats = {}
+    for key, limiter in limiters.items():
+        if limiter is None:
+            continue
+        name = key if isinstance(key, str) else f"{key[0]}:{str(key[1])[:8]}"
+        stats[name] = {'acquired': limiter.acquired, 'waited_s': round(limiter.waited, 3)}
+    return stats
+
+
+class KeyedRateLimiter(BaseRateLimiter):
+    """
+    LangChain rate limiter backed by the shared token bucket for a key
+
+    Every chat model built for the same Groq API key draws from one bucket,
+    whichever model or session it serves.
+
+    Args:
+        key (Hashable): Limiter key, e.g. ("groq", key hash)
+        poll_interval (float): Seconds between checks when waiting asynchronously
+    """
+
+    def __init__(self, key: Hashable, poll_interval: float = 0.05):
+        self.key = key
+        self.poll_interval = poll_interval
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        limiter = get_rate_limiter(self.key)
+        return limiter is None or limiter.acquire(blocking=blocking)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        while not self.acquire(blocking=False):
+            if not blocking:
+                return False
+            await asyncio.sleep(self.poll_interval)
+        return True
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait and share its result or exception. Nothing is kept once the
+    call finishes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def run(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Run func, or wait for the in-flight call with the same key
+
+        Args:
+            key (Hashable): Identity of the call
+            func (Callable[[], Any]): Call to make
+
+        Returns:
+            Any: Result of the shared call
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return future.result()
+
+    def stats(self) -> Dict[str, int]:
+        """Get upstream call and coalesced call counters"""
+        with self._lock:
+            return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
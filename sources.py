@@ -0,0 +1,193 @@
+"""
+Search source clients for Yaswanth's AI Search Engine
+Run the LangChain Wikipedia, ArXiv and DuckDuckGo wrappers through the shared
+transport, so every source gets retries and a circuit breaker, and the
+Wikipedia and ArXiv clients reuse pooled keep-alive connections
+"""
+
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Optional, Tuple, Type
+
+from langchain_core.tools import ToolException
+
+from config import HTTP_CONFIG
+from transport import TRANSIENT_ERRORS, CircuitOpenError, call_source, get_requests_session, install_wikipedia_session
+
+# The client libraries are imported when a source is first used
+if TYPE_CHECKING:
+    from langchain_community.utilities import ArxivAPIWrapper, WikipediaAPIWrapper
+
+WIKIPEDIA_DESCRIPTION = (
+    "A wrapper around Wikipedia. Useful for when you need to answer general questions about "
+    "people, places, companies, facts, historical events, or other subjects. "
+    "Input should be a search query."
+)
+ARXIV_DESCRIPTION = (
+    "A wrapper around Arxiv.org Useful for when you need to answer questions about Physics, "
+    "Mathematics, Computer Science, Quantitative Biology, Quantitative Finance, Statistics, "
+    "Electrical Engineering, and Economics from scientific articles on arxiv.org. "
+    "Input should be a search query."
+)
+WEB_SEARCH_DESCRIPTION = (
+    "A wrapper around DuckDuckGo Search. Useful for when you need to answer questions about "
+    "current events. Input should be a search query."
+)
+
+
+def run_source(
+    source: str,
+    func: Callable[[], str],
+    retry_on: Tuple[Type[BaseException], ...] = TRANSIENT_ERRORS,
+    hedge_delay: Optional[float] = None
+) -> str:
+    """
+    Call a source through the transport and report failures to the agent
+
+    Args:
+        source (str): Source name
+        func (Callable[[], str]): Search call
+        retry_on (Tuple[Type[BaseException], ...]): Errors that are retried
+        hedge_delay (Optional[float]): Hedge the first attempt after this many seconds
+
+    Returns:
+        str: Search output
+
+    Raises:
+        ToolException: The source is skipped by its breaker or failed after retries
+    """
+    try:
+        return call_source(source, func, retry_on=retry_on, hedge_delay=hedge_delay)
+    except CircuitOpenError as e:
+        raise ToolException(str(e)) from e
+    except Exception as e:
+        raise ToolException(f"{source} request failed: {e}") from e
+
+
+@lru_cache(maxsize=32)
+def get_wikipedia_wrapper(top_k_results: int, doc_content_chars_max: int) -> "WikipediaAPIWrapper":
+    """
+    Get the LangChain Wikipedia wrapper for a result count and length
+
+    Args:
+        top_k_results (int): Maximum number of pages
+        doc_content_chars_max (int): Maximum characters in the output
+
+    Returns:
+        WikipediaAPIWrapper: Shared wrapper
+    """
+    from langchain_community.utilities import WikipediaAPIWrapper
+
+    return WikipediaAPIWrapper(top_k_results=top_k_results, doc_content_chars_max=doc_content_chars_max)
+
+
+class PooledArxivSearch:
+    """
+    arxiv.Search that runs on a given client, in place of the removed Search.results
+
+    Args:
+        client (arxiv.Client): Client sending the requests
+        *args, **kwargs: arxiv.Search arguments
+    """
+
+    def __init__(self, client: Any, *args, **kwargs):
+        import arxiv
+
+        self.client = client
+        self.search = arxiv.Search(*args, **kwargs)
+
+    def results(self):
+        return self.client.results(self.search)
+
+
+@lru_cache(maxsize=32)
+def get_arxiv_wrapper(top_k_results: int, doc_content_chars_max: int) -> "ArxivAPIWrapper":
+    """
+    Get the LangChain ArXiv wrapper for a result count and length
+
+    Searches run on an arxiv.Client using the pooled session. Its own retries
+    and delays are off because call_source and the rate limiter handle them.
+
+    Args:
+        top_k_results (int): Maximum number of papers
+        doc_content_chars_max (int): Maximum characters in the output
+
+    Returns:
+        ArxivAPIWrapper: Shared wrapper
+    """
+    import arxiv
+    from langchain_community.utilities import ArxivAPIWrapper
+
+    client = arxiv.Client(page_size=top_k_results, delay_seconds=0, num_retries=0)
+    client._session = get_requests_session()
+    wrapper = ArxivAPIWrapper(top_k_results=top_k_results, doc_content_chars_max=doc_content_chars_max)
+    wrapper.arxiv_search = lambda *args, **kwargs: PooledArxivSearch(client, *args, **kwargs)
+    return wrapper
+
+
+def search_wikipedia(query: str, top_k_results: int, doc_content_chars_max: int) -> str:
+    """
+    Search Wikipedia and return the summaries of the best matching pages
+
+    Args:
+        query (str): Search query
+        top_k_results (int): Maximum number of pages
+        doc_content_chars_max (int): Maximum characters in the output
+
+    Returns:
+        str: "Page: ...\\nSummary: ..." blocks separated by blank lines
+
+    Raises:
+        ToolException: Wikipedia could not be reached
+    """
+    from wikipedia.exceptions import HTTPTimeoutError
+
+    wrapper = get_wikipedia_wrapper(top_k_results, doc_content_chars_max)
+    return run_source("Wikipedia", lambda: wrapper.run(query), retry_on=TRANSIENT_ERRORS + (HTTPTimeoutError,))
+
+
+def search_arxiv(query: str, top_k_results: int, doc_content_chars_max: int) -> str:
+    """
+    Search arXiv and return the abstracts of the best matching papers
+
+    Args:
+        query (str): Search query or space-separated arXiv identifiers
+        top_k_results (int): Maximum number of papers
+        doc_content_chars_max (int): Maximum characters in the output
+
+    Returns:
+        str: "Published/Title/Authors/Summary" blocks separated by blank lines
+
+    Raises:
+        ToolException: arXiv could not be reached
+    """
+    wrapper = get_arxiv_wrapper(top_k_results, doc_content_chars_max)
+    return run_source("ArXiv", lambda: wrapper.run(query))
+
+
+def search_web(query: str) -> str:
+    """
+    Search the web with DuckDuckGo
+
+    The duckduckgo client opens its own connection per search, so instead of
+    pooling, a slow first attempt is hedged with a second request. Rate limit
+    and parsing errors are not retried, which would only deepen throttling.
+
+    Args:
+        query (str): Search query
+
+    Returns:
+        str: Result snippets
+
+    Raises:
+        ToolException: The search failed after retries
+    """
+    from ddgs.exceptions import TimeoutException
+    from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
+
+    wrapper = DuckDuckGoSearchAPIWrapper()
+    return run_source(
+        "Web Search",
+        lambda: wrapper.run(query),
+        retry_on=TRANSIENT_ERRORS + (TimeoutException,),
+        hedge_delay=HTTP_CONFIG["web_hedge_delay"]
+    )
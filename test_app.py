@@ -14,7 +14,10 @@ from utils import (
     validate_api_key,
     format_search_query,
     extract_keywords,
+    normalize_and_tokenize,
+    QueryNormalizer,
     calculate_search_score,
+    score_search_results,
     truncate_text,
     validate_search_sources
 )
@@ -63,6 +66,23 @@ class TestUtils:
         assert "does" not in keywords
         assert "it" not in keywords
     
+    def test_normalize_and_tokenize(self):
+        """Test combined cleaning and keyword extraction"""
+        cleaned, keywords = normalize_and_tokenize("  What is   machine@learning?  ")
+        
+        assert cleaned == format_search_query("  What is   machine@learning?  ")
+        assert cleaned == "What is machinelearning?"
+        assert keywords == ("machine", "learning")
+        assert normalize_and_tokenize("") == ("", ())
+    
+    def test_query_normalizer_cache(self):
+        """Test that repeated queries are served from the normalizer cache"""
+        normalizer = QueryNormalizer(stop_words=frozenset({"about"}))
+        
+        assert normalizer.keywords("tell me about python") == ("tell", "python")
+        normalizer.keywords("tell me about python")
+        assert normalizer.normalize_and_tokenize.cache_info().hits == 1
+    
     def test_calculate_search_score(self):
         """Test search score calculation"""
         query = "machine learning"
@@ -76,6 +96,34 @@ class TestUtils:
         score_empty = calculate_search_score("", result)
         assert score_empty == 0.0
     
+    def test_score_search_results(self):
+        """Test batch scoring matches per-result scoring"""
+        query = "machine learning for protein folding"
+        results = [
+            "Machine learning is a subset of artificial intelligence",
+            "Protein folding predicted with deep learning",
+            "Unrelated text about cooking",
+            ""
+        ]
+        
+        scores = score_search_results(query, results)
+        assert scores == [calculate_search_score(query, result) for result in results]
+        assert scores[2] == 0.0
+        assert score_search_results("", results) == [0.0] * len(results)
+    
+    def test_bm25_scoring(self):
+        """Test BM25 ranks documents with more query terms higher"""
+        query = "quantum computing"
+        results = [
+            "quantum computing uses qubits for quantum computing tasks",
+            "classical computing uses bits",
+            "a recipe for bread"
+        ]
+        
+        scores = score_search_results(query, results, method='bm25')
+        assert scores[0] > scores[1] > scores[2]
+        assert scores[2] == 0.0
+    
     def test_truncate_text(self):
         """Test text truncation"""
         long_text = "This is a very long text that should be truncated"
@@ -89,6 +137,17 @@ class TestUtils:
         short_text = "Short text"
         assert truncate_text(short_text, 20) == short_text
     
+    def test_is_simple_factual_query(self):
+        """Test detection of questions that skip the agent loop"""
+        from utils import is_simple_factual_query
+        
+        assert is_simple_factual_query("What is quantum computing?")
+        assert is_simple_factual_query("Who was Ada Lovelace")
+        assert not is_simple_factual_query("Compare the latest transformer architectures for vision")
+        assert not is_simple_factual_query("Why is the sky blue?")
+        assert not is_simple_factual_query("What is the difference between TCP and UDP?")
+        assert not is_simple_factual_query("")
+    
     def test_validate_search_sources(self):
         """Test search source validation"""
         sources = ["Wikipedia", "ArXiv", "InvalidSource", "Web Search"]
@@ -112,16 +171,1599 @@ class TestConfig:
         except ImportError:
             pytest.fail("Config module could not be imported")
 
+class TestEngine:
+    """Test agent and tool caching"""
+    
+    def test_lru_cache_eviction(self):
+        """Test that the least recently used entry is evicted"""
+        from cache import LRUCache
+        
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+        
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.stats()["evictions"] == 1
+
+    def test_get_or_create_builds_outside_lock(self):
+        """Test that a slow build blocks only callers for the same key"""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from cache import LRUCache
+
+        cache = LRUCache(maxsize=4)
+        started, release = threading.Event(), threading.Event()
+        builds = []
+
+        def slow_factory():
+            builds.append("slow")
+            started.set()
+            release.wait(5)
+            return "slow"
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            first = pool.submit(cache.get_or_create, "slow", slow_factory)
+            second = pool.submit(cache.get_or_create, "slow", slow_factory)
+            assert started.wait(5)
+            # Another key is served while the slow build is still running
+            assert cache.get_or_create("fast", lambda: "fast") == "fast"
+            release.set()
+            assert first.result(5) == second.result(5) == "slow"
+
+        assert builds == ["slow"]
+
+    def test_agent_reused_for_same_settings(self):
+        """Test that the agent is built once per settings key"""
+        from engine import get_search_agent, hash_api_key
+        
+        api_key = "gsk_1234567890abcdef1234567890abcdef"
+        first = get_search_agent(api_key, ["Wikipedia", "ArXiv"], 2, "Medium")
+        second = get_search_agent(api_key, ["ArXiv", "Wikipedia"], 2, "Medium")
+        other = get_search_agent(api_key, ["Wikipedia"], 2, "Medium")
+        
+        assert first is second
+        assert first is not other
+        assert first.tools[0] is other.tools[0]
+        assert hash_api_key(api_key) != api_key
+    
+    def test_agent_requires_valid_source(self):
+        """Test that no agent is built without a valid source"""
+        from engine import get_search_agent
+        
+        assert get_search_agent("gsk_1234567890abcdef1234567890abcdef", ["InvalidSource"], 2, "Medium") is None
+
+class TestToolResultCache:
+    """Test the two-tier tool result cache"""
+    
+    def test_result_survives_restart(self, tmp_path):
+        """Test that results stored on disk are served by a new cache instance"""
+        from cache import ToolResultCache
+        
+        db_path = str(tmp_path / "results.sqlite3")
+        ToolResultCache(db_path).set("Wikipedia", "Quantum  Computing", "result text", (2, 500))
+        
+        restarted = ToolResultCache(db_path)
+        assert restarted.get("Wikipedia", "quantum computing", (2, 500)) == "result text"
+        assert restarted.get("Wikipedia", "quantum computing", (1, 500)) is None
+        assert restarted.stats()["totals"]["disk_hits"] == 1
+    
+    def test_expired_results_are_misses(self, tmp_path, monkeypatch):
+        """Test that entries past the source TTL are not returned"""
+        import cache
+        
+        result_cache = cache.ToolResultCache(str(tmp_path / "results.sqlite3"))
+        result_cache.set("Web Search", "news", "old result")
+        
+        later = cache.time.time() + cache.SEARCH_SOURCES["Web Search"]["cache_ttl"] + 1
+        monkeypatch.setattr(cache.time, "time", lambda: later)
+        
+        assert result_cache.get("Web Search", "news") is None
+    
+    def test_get_or_compute_calls_tool_once(self):
+        """Test that repeated queries do not repeat the tool call"""
+        from cache import ToolResultCache
+        
+        calls = []
+        result_cache = ToolResultCache()
+        for _ in range(3):
+            result_cache.get_or_compute("ArXiv", "transformers", lambda: calls.append(1) or "papers")
+        
+        assert len(calls) == 1
+        assert result_cache.stats()["sources"]["ArXiv"]["memory_hits"] == 2
+    
+    def test_prefetch_serves_followup_from_cache(self, monkeypatch):
+        """Test that prefetched suggestions are answered from cache and counted as used"""
+        from langchain_core.tools import Tool
+        import engine
+        from cache import ToolResultCache, set_tool_result_cache
+        from prefetch import Prefetcher
+        
+        calls = []
+        
+        def fake_tool(source, max_results, response_length):
+            return Tool(name="wikipedia", func=lambda query: calls.append(query) or f"about {query}", description="test")
+        
+        prefetcher = Prefetcher(engine.warm_tool_result)
+        monkeypatch.setattr(engine, "build_search_tool", fake_tool)
+        monkeypatch.setattr(engine, "_prefetcher", prefetcher)
+        set_tool_result_cache(ToolResultCache())
+        try:
+            suggestions = prefetcher.submit("What is quantum computing", ["Wikipedia"], 2, "Short")
+            prefetcher._pool.shutdown(wait=True)
+            assert len(calls) == len(suggestions) == 2
+            
+            tool = engine.with_result_cache(fake_tool("Wikipedia", 2, "Short"), "Wikipedia", 2, "Short")
+            assert tool.run(suggestions[0]) == f"about {suggestions[0]}"
+            assert len(calls) == 2
+            
+            stats = prefetcher.stats()
+            assert stats["warmed"] == 2 and stats["used"] == 1
+            assert stats["hit_rate"] == 0.5
+        finally:
+            set_tool_result_cache(None)
+
+class TestSemanticAnswerCache:
+    """Test the semantic answer cache"""
+    
+    def test_paraphrase_hits_cache(self):
+        """Test that a paraphrased question reuses the stored answer"""
+        from cache import SemanticAnswerCache
+        from embeddings import HashingEmbedder
+        
+        answers = SemanticAnswerCache(HashingEmbedder())
+        scope = (("Wikipedia",), "Medium")
+        answers.store("What is quantum computing?", scope, "Quantum computing uses qubits.")
+        
+        hit = answers.lookup("explain quantum computing", scope)
+        assert hit["output"] == "Quantum computing uses qubits."
+        assert hit["similarity"] >= answers.threshold
+    
+    def test_different_topic_or_scope_misses(self):
+        """Test that unrelated queries and other scopes do not hit"""
+        from cache import SemanticAnswerCache
+        from embeddings import HashingEmbedder
+        
+        answers = SemanticAnswerCache(HashingEmbedder())
+        answers.store("What is quantum computing?", (("Wikipedia",), "Medium"), "answer")
+        
+        assert answers.lookup("history of the roman empire", (("Wikipedia",), "Medium")) is None
+        assert answers.lookup("what is quantum computing", (("ArXiv",), "Medium")) is None
+        assert answers.stats()["misses"] == 2
+
+    def test_different_question_type_misses(self):
+        """Test that questions about the same topic but asking for a different fact do not hit"""
+        from cache import SemanticAnswerCache
+        from embeddings import HashingEmbedder
+
+        scope = (("Wikipedia",), "Medium")
+        pairs = [
+            ("When was Alan Turing born?", "Where was Alan Turing born?"),
+            ("Who founded the Python Software Foundation?", "When was the Python Software Foundation founded?"),
+            ("How many moons does Jupiter have?", "Why does Jupiter have moons?"),
+        ]
+        for stored, asked in pairs:
+            answers = SemanticAnswerCache(HashingEmbedder())
+            answers.store(stored, scope, "answer")
+            assert answers.lookup(asked, scope) is None, (stored, asked)
+            assert answers.lookup(stored.lower(), scope)["output"] == "answer"
+
+    def test_version_and_acronym_near_misses(self):
+        """Test that queries differing only in a version number or short acronym do not hit"""
+        from cache import SemanticAnswerCache
+        from embeddings import HashingEmbedder
+
+        scope = (("Wikipedia",), "Medium")
+        pairs = [
+            ("what is python 2", "what is python 3"),
+            ("best GPU for AI", "best GPU for ML"),
+            ("what is gpt-4", "what is gpt-3"),
+        ]
+        for stored, asked in pairs:
+            answers = SemanticAnswerCache(HashingEmbedder())
+            answers.store(stored, scope, "answer")
+            assert answers.lookup(asked, scope) is None, (stored, asked)
+            assert answers.lookup(stored.upper(), scope)["output"] == "answer"
+
+    def test_scope_is_bounded(self):
+        """Test that the oldest entries are replaced once a scope is full"""
+        from cache import SemanticAnswerCache
+        from embeddings import HashingEmbedder
+        
+        answers = SemanticAnswerCache(HashingEmbedder(), max_entries=2)
+        scope = ((), "Short")
+        for topic in ["quantum computing", "neural networks", "protein folding"]:
+            answers.store(topic, scope, topic)
+        
+        assert answers.stats()["entries"] == 2
+        assert answers.lookup("quantum computing", scope) is None
+        assert answers.lookup("protein folding", scope)["output"] == "protein folding"
+    
+    def _fake_search(self, monkeypatch):
+        """Answer through the engine with an isolated answer cache and a recorded conversation"""
+        import engine
+        from cache import SemanticAnswerCache
+        from config import FEATURES
+        from embeddings import HashingEmbedder
+        
+        monkeypatch.setitem(FEATURES, "semantic_answer_cache", True)
+        monkeypatch.setattr(engine, "_semantic_cache", SemanticAnswerCache(HashingEmbedder()))
+        monkeypatch.setattr(
+            engine,
+            "run_parallel_search",
+            lambda api_key, query, sources, *args, conversation=None, **kwargs: {"input": query, "output": f"{query} | {conversation}"}
+        )
+        return lambda query, conversation=None: engine.run_search(
+            "gsk_test", query, ["Wikipedia"], mode="Parallel retrieval", prefetch=False, conversation=conversation
+        )
+    
+    def test_follow_ups_skip_answer_cache(self, monkeypatch):
+        """Test that the same follow-up in two conversations is answered for each conversation"""
+        import engine
+        from config import SEARCH_CONFIG
+        
+        search = self._fake_search(monkeypatch)
+        first = search("how fast is it?", "User: tell me about cheetahs")
+        second = search("how fast is it?", "User: tell me about light")
+        
+        assert first["output"] == "how fast is it? | User: tell me about cheetahs"
+        assert second["output"] == "how fast is it? | User: tell me about light"
+        assert not second["cached"]
+        assert engine.lookup_cached_answer("how fast is it?", ["Wikipedia"], SEARCH_CONFIG["default_response_length"]) is None
+    
+    def test_standalone_question_in_conversation_hits_cache(self, monkeypatch, tmp_path):
+        """Test that a standalone second question in a chat session is answered from cache"""
+        from history import HistoryStore
+        from transcript import ChatTranscript
+        
+        search = self._fake_search(monkeypatch)
+        search("What is quantum computing?")
+        transcript = ChatTranscript("s1", HistoryStore(str(tmp_path / "history.sqlite3")))
+        
+        # The app appends each question before searching and the answer after
+        for question in ["tell me about cheetahs", "explain quantum computing"]:
+            transcript.append("user", question)
+            response = search(question, transcript.summary(exclude_last=1))
+            transcript.append("assistant", response["output"])
+        
+        assert transcript.summary(exclude_last=2) is not None
+        assert response["cached"]
+        assert response["cached_query"] == "What is quantum computing?"
+
+class TestEmbeddingService:
+    """Test the batched, cached embedding service"""
+    
+    def _slow_embedder(self, calls):
+        import time
+        from embeddings import HashingEmbedder
+        
+        class SlowEmbedder(HashingEmbedder):
+            expensive = True
+            
+            def encode(self, texts):
+                calls.append(len(texts))
+                time.sleep(0.02)
+                return super().encode(texts)
+        
+        return SlowEmbedder(dim=64)
+    
+    def test_concurrent_requests_share_a_batch(self):
+        """Test that misses from concurrent callers are micro-batched"""
+        from concurrent.futures import ThreadPoolExecutor
+        from embeddings import EmbeddingService
+        
+        calls = []
+        service = EmbeddingService(self._slow_embedder(calls), max_batch_size=64, max_wait=0.05)
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda i: service.encode([f"query number {i}"]), range(8)))
+        
+        assert sum(calls) == 8
+        assert len(calls) < 8
+        assert all(result.shape == (1, 64) for result in results)
+        assert service.stats()["mean_batch_size"] > 1
+    
+    def test_disk_cache_survives_restart(self, tmp_path, monkeypatch):
+        """Test content-addressed vectors are reused by a new service and the file grows"""
+        import numpy as np
+        from config import EMBEDDING_CONFIG
+        from embeddings import EmbeddingDiskCache, EmbeddingService
+        
+        monkeypatch.setitem(EMBEDDING_CONFIG, "disk_cache_initial_rows", 2)
+        texts = ["alpha particles", "beta decay", "gamma rays", "alpha particles"]
+        calls = []
+        first = EmbeddingService(self._slow_embedder(calls), EmbeddingDiskCache(str(tmp_path), 64), max_wait=0)
+        expected = first.encode(texts)
+        
+        second = EmbeddingService(self._slow_embedder(calls), EmbeddingDiskCache(str(tmp_path), 64), max_wait=0)
+        
+        assert np.allclose(second.encode(texts), expected)
+        assert calls == [3]
+        assert second.stats()["disk_hits"] == 3
+        assert len(second.disk_cache) == 3
+    
+    def test_cheap_embedders_are_called_directly(self):
+        """Test that the hashing fallback skips batching and caching"""
+        from embeddings import EmbeddingService, HashingEmbedder
+        
+        service = EmbeddingService(HashingEmbedder(dim=32))
+        
+        assert service.encode(["hello world"]).shape == (1, 32)
+        assert service.stats()["batches"] == 0
+
+class TestParallelRetrieval:
+    """Test concurrent source lookups"""
+    
+    @staticmethod
+    def _slow_tool(name, delay):
+        import time
+        from langchain_core.tools import Tool
+        
+        def run(query):
+            time.sleep(delay)
+            return f"{name} result for {query}"
+        
+        return Tool(name=name, func=run, description=f"{name} test tool")
+    
+    def test_sources_run_concurrently(self):
+        """Test that wall time tracks the slowest source"""
+        import time
+        from engine import parallel_retrieve
+        
+        from callbacks import TracingHandler
+        
+        tools = [self._slow_tool(f"Source{i}", 0.3) for i in range(3)]
+        tracer = TracingHandler()
+        start = time.perf_counter()
+        results = parallel_retrieve("  quantum   computing ", tools, timeout=5, callbacks=[tracer])
+        elapsed = time.perf_counter() - start
+        
+        assert elapsed < 0.8
+        assert results["Source0"] == "Source0 result for quantum computing"
+        assert len(results) == 3
+        assert sorted(span["stage"] for span in tracer.spans) == ["tool:Source0", "tool:Source1", "tool:Source2"]
+    
+    def test_slow_source_times_out(self):
+        """Test that a source slower than the timeout is reported, not awaited"""
+        from engine import parallel_retrieve
+        
+        tools = [self._slow_tool("Fast", 0.0), self._slow_tool("Slow", 1.0)]
+        results = parallel_retrieve("query", tools, timeout=0.3)
+        
+        assert results["Fast"] == "Fast result for query"
+        assert "timed out" in results["Slow"]
+    
+    def test_synthesis_prompt_includes_results(self):
+        """Test that merged results are passed to the synthesis prompt"""
+        from engine import build_synthesis_prompt
+        
+        prompt = build_synthesis_prompt("What is AI?", {"wikipedia": "AI is ..."}, "Short")
+        assert "[wikipedia]" in prompt
+        assert "What is AI?" in prompt
+
+    def test_conversation_reaches_llm_but_not_sources(self, monkeypatch):
+        """Test that the conversation summary is in the prompt and tools get the bare query"""
+        import engine
+        from langchain_core.tools import Tool
+
+        prompts, queries = [], []
+
+        class RecordingLLM:
+            def invoke(self, prompt, config=None):
+                prompts.append(prompt)
+                return "answer"
+
+        monkeypatch.setattr(engine, "get_llm", lambda api_key, model=None: RecordingLLM())
+        monkeypatch.setattr(engine, "get_search_tools", lambda *args: [
+            Tool(name="wikipedia", func=lambda query: queries.append(query) or "result", description="wiki")
+        ])
+
+        engine.run_parallel_search(
+            "gsk_test", "how fast is it", ["Wikipedia"], 2, "Short", timeout=5,
+            conversation="User: what is a quantum computer"
+        )
+
+        assert "User: what is a quantum computer" in prompts[0]
+        assert "Current question: how fast is it" in prompts[0]
+        assert queries == ["how fast is it"]
+
+class TestContextPacking:
+    """Test cross-source dedup and context budget packing"""
+    
+    TURING = (
+        "Alan Turing was an English mathematician, computer scientist, logician, cryptanalyst, "
+        "philosopher and theoretical biologist. He was highly influential in the development of "
+        "theoretical computer science."
+    )
+    
+    def test_split_passages(self):
+        """Test paragraph and sentence splitting within the size limit"""
+        from context import split_passages
+        
+        text = "Short intro.\n\n" + " ".join(f"Sentence number {i} is here." for i in range(40))
+        passages = split_passages(text, max_chars=200)
+        
+        assert passages[0] == "Short intro."
+        assert all(len(passage) <= 200 for passage in passages)
+        assert "Sentence number 39 is here." in passages[-1]
+    
+    def test_near_duplicates_across_sources_are_dropped(self):
+        """Test that a lightly reworded copy from another source is removed"""
+        from context import find_near_duplicates, pack_context
+        
+        reworded = self.TURING.replace("philosopher and", "philosopher, and").replace("He was", "Turing was")
+        unrelated = "Turing was a British mathematician who shaped theoretical computer science."
+        packed = pack_context(
+            "alan turing",
+            {"wikipedia": self.TURING, "WebSearch": f"{reworded}\n\n{unrelated}"},
+            budget_tokens=1000
+        )
+        
+        assert find_near_duplicates([self.TURING, reworded, unrelated]) == [False, True, False]
+        kept = "\n\n".join(packed["results"].values())
+        assert packed["stats"]["duplicates"] == 1
+        assert (self.TURING in kept) != (reworded in kept)
+        assert unrelated in packed["results"]["WebSearch"]
+    
+    def test_packing_respects_budget_and_relevance(self):
+        """Test that the most relevant passages are kept within the token budget"""
+        from context import estimate_tokens, get_context_budget, pack_context
+        from config import API_CONFIG, CONTEXT_CONFIG
+        
+        results = {
+            "arxiv": "\n\n".join(f"Paper {i} studies graph neural networks for chemistry." for i in range(5)),
+            "wikipedia": "\n\n".join(f"Entry {i} covers medieval castle architecture in region {i}." for i in range(20))
+        }
+        packed = pack_context("castle architecture", results, budget_tokens=60)
+        
+        assert packed["stats"]["tokens"] <= 60
+        assert "arxiv" not in packed["results"]
+        assert sum(estimate_tokens(text) for text in packed["results"]["wikipedia"].split("\n\n")) == packed["stats"]["tokens"]
+        assert get_context_budget("Short") < get_context_budget("Detailed")
+        assert get_context_budget("Detailed") <= CONTEXT_CONFIG["context_window"] - API_CONFIG["max_tokens"]
+    
+    def test_parallel_search_sends_packed_context(self, monkeypatch):
+        """Test that the synthesis prompt only contains deduplicated passages"""
+        import engine
+        from langchain_core.language_models import FakeListLLM
+        from langchain_core.tools import Tool
+        
+        prompts = []
+        llm = FakeListLLM(responses=["answer"])
+        monkeypatch.setattr(engine, "get_llm", lambda api_key, model=None: llm)
+        monkeypatch.setattr(engine, "build_synthesis_prompt", lambda query, results, length: prompts.append(results) or "prompt")
+        monkeypatch.setattr(engine, "get_search_tools", lambda *args: [
+            Tool(name="wikipedia", func=lambda query: self.TURING, description="wiki"),
+            Tool(name="WebSearch", func=lambda query: self.TURING, description="web")
+        ])
+        
+        response = engine.run_parallel_search("gsk_test", "alan turing", ["Wikipedia"], 2, "Short", timeout=5)
+        
+        assert prompts == [{"wikipedia": self.TURING}]
+        assert response["context"]["duplicates"] == 1
+
+class TestStreamingAnswerHandler:
+    """Test progressive answer streaming"""
+    
+    class _Placeholder:
+        def __init__(self):
+            self.writes = []
+        
+        def markdown(self, text):
+            self.writes.append(text)
+    
+    def test_streams_only_final_answer(self):
+        """Test that ReAct thoughts are hidden and answer tokens are written as they arrive"""
+        from callbacks import StreamingAnswerHandler
+        
+        placeholder = self._Placeholder()
+        handler = StreamingAnswerHandler(placeholder)
+        
+        handler.on_llm_start({}, ["prompt"])
+        for token in ["Thought: look it up", "\nAction: wikipedia"]:
+            handler.on_llm_new_token(token)
+        handler.on_llm_end(None)
+        assert placeholder.writes == []
+        
+        handler.on_llm_start({}, ["prompt"])
+        for token in ["Thought: done\nFinal ", "Answer: Quantum", " computing", " uses qubits."]:
+            handler.on_llm_new_token(token)
+        handler.on_llm_end(None)
+        
+        assert handler.answer == "Quantum computing uses qubits."
+        assert placeholder.writes[0] == "Quantum▌"
+        assert placeholder.writes[-1] == "Quantum computing uses qubits."
+        
+        metrics = handler.metrics()
+        assert metrics["answer_tokens"] == 3
+        assert metrics["time_to_first_token"] <= metrics["time_to_first_answer_token"]
+    
+    def test_streams_everything_without_prefix(self):
+        """Test that every token is part of the answer without a prefix"""
+        from callbacks import StreamingAnswerHandler
+        
+        handler = StreamingAnswerHandler(answer_prefix=None)
+        handler.on_llm_start({}, ["prompt"])
+        for token in ["Hello", " world"]:
+            handler.on_llm_new_token(token)
+        
+        assert handler.answer == "Hello world"
+        assert handler.metrics()["answer_tokens"] == 2
+
+class TestSearchAPI:
+    """Test the headless search API"""
+    
+    def test_health(self):
+        """Test the liveness endpoint"""
+        from fastapi.testclient import TestClient
+        import api
+        
+        response = TestClient(api.app).get("/health")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ok"
+    
+    def test_search_requires_api_key(self, monkeypatch):
+        """Test that searches without a key are rejected"""
+        from fastapi.testclient import TestClient
+        import api
+        
+        monkeypatch.delenv("GROQ_API_KEY", raising=False)
+        response = TestClient(api.app).post("/search", json={"query": "quantum computing"})
+        assert response.status_code == 401
+
+    def test_server_key_requires_access_token(self, monkeypatch, tmp_path):
+        """Test that the server's Groq key is only spent for callers with the API token"""
+        from fastapi.testclient import TestClient
+        import api
+        from history import HistoryStore
+
+        used_keys = []
+
+        def fake_run_search(api_key, query, sources, **kwargs):
+            used_keys.append(api_key)
+            return {"output": "answer", "mode": kwargs["mode"], "cached": False, "duration": 0.01}
+
+        monkeypatch.setattr(api, "run_search", fake_run_search)
+        monkeypatch.setattr(api, "get_history_store", lambda: HistoryStore(str(tmp_path / "history.sqlite3")))
+        monkeypatch.setenv("GROQ_API_KEY", "gsk_server")
+        client = TestClient(api.app)
+        body = {"query": "quantum computing"}
+
+        monkeypatch.delenv("SEARCH_API_TOKEN", raising=False)
+        assert client.post("/search", json=body).status_code == 401
+
+        monkeypatch.setenv("SEARCH_API_TOKEN", "secret-token")
+        assert client.post("/search", json=body, headers={"Authorization": "Bearer wrong"}).status_code == 401
+        assert client.post("/search", json=body, headers={"Authorization": "Bearer secret-token"}).status_code == 200
+        assert client.post("/search", json=body, headers={"X-Groq-Api-Key": "gsk_caller"}).status_code == 200
+        assert used_keys == ["gsk_server", "gsk_caller"]
+
+    def test_failed_search_is_recorded(self, monkeypatch, tmp_path):
+        """Test that a failing search lands in history as unsuccessful"""
+        from fastapi.testclient import TestClient
+        import api
+        from history import HistoryStore
+
+        store = HistoryStore(str(tmp_path / "history.sqlite3"))
+
+        def failing_run_search(api_key, query, sources, **kwargs):
+            raise RuntimeError("upstream down")
+
+        monkeypatch.setattr(api, "run_search", failing_run_search)
+        monkeypatch.setattr(api, "get_history_store", lambda: store)
+        response = TestClient(api.app).post(
+            "/search",
+            json={"query": "quantum computing"},
+            headers={"X-Groq-Api-Key": "gsk_1234567890abcdef1234567890abcdef"}
+        )
+
+        assert response.status_code == 502
+        session_id = api.get_history_session("gsk_1234567890abcdef1234567890abcdef")
+        assert store.get_searches(session_id=session_id)[0]["success"] is False
+
+    def test_search_runs_engine_and_records_history(self, monkeypatch, tmp_path):
+        """Test that a search goes through the engine and lands in history"""
+        from fastapi.testclient import TestClient
+        import api
+        from history import HistoryStore
+        
+        store = HistoryStore(str(tmp_path / "history.sqlite3"))
+        
+        def fake_run_search(api_key, query, sources, **kwargs):
+            return {"output": f"answer to {query}", "mode": kwargs["mode"], "cached": False, "duration": 0.01}
+        
+        monkeypatch.setattr(api, "run_search", fake_run_search)
+        monkeypatch.setattr(api, "get_history_store", lambda: store)
+        client = TestClient(api.app)
+        response = client.post(
+            "/search",
+            json={"query": "quantum computing", "sources": ["Wikipedia", "Bogus"]},
+            headers={"X-Groq-Api-Key": "gsk_1234567890abcdef1234567890abcdef"}
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["output"] == "answer to quantum computing"
+        assert response.json()["sources"] == ["Wikipedia"]
+        history = client.get(
+            "/history",
+            params={"limit": 1},
+            headers={"X-Groq-Api-Key": "gsk_1234567890abcdef1234567890abcdef"}
+        )
+        assert history.json()[0]["query"] == "quantum computing"
+    
+    def test_history_and_stats_are_per_caller(self, monkeypatch, tmp_path):
+        """Test that history and stats need credentials and callers only see their own searches"""
+        from fastapi.testclient import TestClient
+        import api
+        from history import HistoryStore
+        
+        store = HistoryStore(str(tmp_path / "history.sqlite3"))
+        
+        def fake_run_search(api_key, query, sources, **kwargs):
+            return {"output": "answer", "mode": kwargs["mode"], "cached": False, "duration": 0.01}
+        
+        monkeypatch.setattr(api, "run_search", fake_run_search)
+        monkeypatch.setattr(api, "get_history_store", lambda: store)
+        monkeypatch.setenv("GROQ_API_KEY", "gsk_server")
+        monkeypatch.setenv("SEARCH_API_TOKEN", "secret-token")
+        client = TestClient(api.app)
+        alice = {"X-Groq-Api-Key": "gsk_alice"}
+        bob = {"X-Groq-Api-Key": "gsk_bob"}
+        service = {"Authorization": "Bearer secret-token"}
+        
+        client.post("/search", json={"query": "alice private question"}, headers=alice)
+        client.post("/search", json={"query": "service question"}, headers=service)
+        
+        assert client.get("/history").status_code == 401
+        assert client.get("/stats").status_code == 401
+        assert client.get("/history", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        assert [search["query"] for search in client.get("/history", headers=alice).json()] == ["alice private question"]
+        assert [search["query"] for search in client.get("/history", headers=service).json()] == ["service question"]
+        assert client.get("/history", headers=bob).json() == []
+        assert client.get("/stats", headers=service).status_code == 200
+
+class TestHistoryStore:
+    """Test the durable search history store"""
+    
+    def test_searches_survive_restart_and_paginate(self, tmp_path):
+        """Test that batched writes persist and pages follow before_id"""
+        from history import HistoryStore
+        
+        db_path = str(tmp_path / "history.sqlite3")
+        store = HistoryStore(db_path, batch_size=4)
+        for i in range(10):
+            store.record_search(f"query {i}", ["Wikipedia"] if i % 2 else ["ArXiv", "Web Search"], session_id="s1")
+        store.record_search("other session", ["Wikipedia"], session_id="s2", success=False)
+        store.flush()
+        
+        restarted = HistoryStore(db_path)
+        first = restarted.get_searches(session_id="s1", limit=4)
+        assert [search["query"] for search in first] == ["query 9", "query 8", "query 7", "query 6"]
+        second = restarted.get_searches(session_id="s1", before_id=first[-1]["id"], limit=4)
+        assert [search["query"] for search in second] == ["query 5", "query 4", "query 3", "query 2"]
+        
+        assert len(restarted.get_searches(source="Web Search", limit=None)) == 5
+        assert restarted.get_searches(success=False)[0]["query"] == "other session"
+        assert restarted.count_searches("s1") == 10
+    
+    def test_messages_in_conversation_order(self, tmp_path):
+        """Test that message pages return the newest messages oldest first"""
+        from history import HistoryStore
+        
+        store = HistoryStore(str(tmp_path / "history.sqlite3"))
+        for i in range(5):
+            store.record_message("s1", "user" if i % 2 == 0 else "assistant", f"message {i}")
+        
+        page = store.get_messages("s1", limit=2)
+        assert [message["content"] for message in page] == ["message 3", "message 4"]
+        older = store.get_messages("s1", before_id=page[0]["id"])
+        assert [message["content"] for message in older] == ["message 0", "message 1", "message 2"]
+        assert store.count_messages("s1") == 5
+
+    def test_reads_wait_only_for_own_session(self, tmp_path):
+        """Test that a read sees its session's writes at once and ignores other sessions' backlog"""
+        import threading
+        import time
+        from history import HistoryStore
+
+        store = HistoryStore(str(tmp_path / "history.sqlite3"), flush_interval=5)
+        start = time.monotonic()
+        store.record_message("s1", "user", "hello")
+        assert [message["content"] for message in store.get_messages("s1")] == ["hello"]
+        assert time.monotonic() - start < 2
+
+        # Stall the writer on another session's batch
+        release = threading.Event()
+        write_batch = store._write_batch
+        store._write_batch = lambda batch: release.wait(5) and write_batch(batch)
+        store.record_search("slow", ["Wikipedia"], session_id="s2")
+
+        start = time.monotonic()
+        assert [message["content"] for message in store.get_messages("s1")] == ["hello"]
+        assert store.count_searches() == 0
+        assert time.monotonic() - start < 1
+        release.set()
+        assert store.count_searches("s2") == 1
+
+    def test_writer_survives_unexpected_errors(self, tmp_path):
+        """Test that a non-SQLite error drops its batch but keeps the writer running"""
+        from history import HistoryStore
+
+        store = HistoryStore(str(tmp_path / "history.sqlite3"))
+        write_batch = store._write_batch
+        failures = [RuntimeError("bad record")]
+
+        def flaky_write(batch):
+            if failures:
+                raise failures.pop()
+            write_batch(batch)
+
+        store._write_batch = flaky_write
+        store.record_search("lost", ["Wikipedia"], session_id="s1")
+        store.flush()
+        store.record_search("kept", ["Wikipedia"], session_id="s1")
+
+        assert [search["query"] for search in store.get_searches(session_id="s1")] == ["kept"]
+        assert store.failed_writes == 1
+
+
+class TestChatTranscript:
+    """Test the bounded chat transcript"""
+
+    def test_window_spills_to_store_and_pages_back(self, tmp_path):
+        """Test that only the window stays in memory and older pages load in order"""
+        from history import HistoryStore
+        from transcript import ChatTranscript
+
+        store = HistoryStore(str(tmp_path / "history.sqlite3"))
+        transcript = ChatTranscript("s1", store, window_messages=4, page_messages=3)
+        for i in range(10):
+            transcript.append("user" if i % 2 == 0 else "assistant", f"message {i}")
+
+        assert [message["content"] for message in transcript.visible()] == [f"message {i}" for i in range(6, 10)]
+        assert transcript.has_older()
+        assert transcript.load_older() == 3
+        assert transcript.load_older() == 3
+        assert transcript.visible()[0]["content"] == "message 0"
+        assert not transcript.has_older()
+        assert transcript.load_older() == 0
+
+        transcript.append("user", "message 10")
+        assert len(transcript.visible()) == 4
+        assert ChatTranscript("s1", store, window_messages=4).visible() == transcript.visible()
+
+    def test_summary_is_bounded(self, tmp_path):
+        """Test that the LLM summary lists earlier questions and cuts recent messages"""
+        from history import HistoryStore
+        from transcript import ChatTranscript
+
+        store = HistoryStore(str(tmp_path / "history.sqlite3"))
+        transcript = ChatTranscript("s1", store, window_messages=4)
+        assert transcript.summary() is None
+        for i in range(50):
+            transcript.append("user", f"question {i}")
+            transcript.append("assistant", "answer " * 200)
+
+        summary = transcript.summary(exclude_last=1)
+        assert summary.startswith("Earlier questions: ")
+        assert "question 49" in summary.splitlines()[-1]
+        assert "question 0;" not in summary
+        assert len(summary) < 2000
+
+
+class TestSearchAggregates:
+    """Test the running search statistics"""
+    
+    def test_histogram_percentiles_within_precision(self):
+        """Test that percentiles match exact values within the configured error"""
+        import numpy as np
+        from aggregates import LatencyHistogram
+        
+        values = np.random.default_rng(0).lognormal(0, 1, 10000)
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(float(value))
+        
+        for p in (50, 95, 99):
+            exact = np.percentile(values, p, method="inverted_cdf")
+            assert abs(histogram.percentile(p) - exact) / exact <= histogram.precision
+    
+    def test_merge_matches_single_aggregate(self):
+        """Test that merged session aggregates equal aggregating every search at once"""
+        import json
+        from aggregates import SearchAggregates
+        
+        searches = [
+            (f"query {'x' * i}", ["Wikipedia"] if i % 3 else ["ArXiv", "Web Search"], i % 4 != 0, {"spans": [{"stage": "llm", "duration": 0.1 * (i + 1)}]})
+            for i in range(20)
+        ]
+        combined, first, second = SearchAggregates(), SearchAggregates(), SearchAggregates()
+        for i, search in enumerate(searches):
+            combined.add(*search)
+            (first if i < 7 else second).add(*search)
+        
+        # Round trip one side through JSON, as when merging across processes
+        merged = first.merge(SearchAggregates.from_dict(json.loads(json.dumps(second.to_dict()))))
+        expected, actual = combined.summary(), merged.summary()
+        assert actual["average_query_length"] == pytest.approx(expected["average_query_length"])
+        assert actual["stage_latency"] == expected["stage_latency"]
+        assert {key: actual[key] for key in ("successful_searches", "failed_searches", "most_used_sources")} == {
+            key: expected[key] for key in ("successful_searches", "failed_searches", "most_used_sources")
+        }
+
+
+class TestExport:
+    """Test the streaming history exporters"""
+    
+    RECORDS = [
+        {"timestamp": "2024-01-01 10:00:00", "query": 'say "hello", world', "sources": ["Wikipedia", "ArXiv"], "id": 1},
+        {"timestamp": "2024-01-01 10:05:00", "query": "line\nbreak", "sources": ["Web Search"], "id": 2},
+        {"timestamp": "2024-01-01 10:10:00", "query": "plain", "sources": [], "id": 3}
+    ]
+    
+    def test_csv_and_json_round_trip(self):
+        """Test that quotes, commas and newlines survive and chunking does not change output"""
+        import csv
+        import io
+        import json
+        from export import iter_export
+        
+        rows = list(csv.reader(io.StringIO(b"".join(iter_export(self.RECORDS, "csv", chunk_rows=2)).decode())))
+        assert rows[0] == ["timestamp", "query", "sources"]
+        assert rows[1] == ["2024-01-01 10:00:00", 'say "hello", world', "Wikipedia,ArXiv"]
+        assert rows[2][1] == "line\nbreak"
+        
+        expected = [{key: record[key] for key in ("timestamp", "query", "sources")} for record in self.RECORDS]
+        exported = b"".join(iter_export(self.RECORDS, "json", chunk_rows=2)).decode()
+        assert exported == json.dumps(expected, indent=2)
+        assert b"".join(iter_export([], "json")) == b"[]"
+        
+        lines = b"".join(iter_export(self.RECORDS, "ndjson", chunk_rows=2)).decode().splitlines()
+        assert [json.loads(line) for line in lines] == expected
+    
+    def test_export_search_data_empty_history(self):
+        """Test that an empty history exports as an empty CSV and an empty JSON list"""
+        from utils import export_search_data
+        
+        assert export_search_data([], "csv") == ""
+        assert export_search_data([], "json") == "[]"
+        assert export_search_data(self.RECORDS[:1], "csv").startswith("timestamp,query,sources")
+    
+    def test_parquet_streams_row_groups(self):
+        """Test that Parquet output is written one row group per chunk"""
+        import io
+        import pyarrow.parquet as pq
+        from export import iter_export
+        
+        records = ({"timestamp": str(i), "query": f"q{i}", "sources": ["ArXiv"] * (i % 3)} for i in range(25))
+        parquet = pq.ParquetFile(io.BytesIO(b"".join(iter_export(records, "parquet", chunk_rows=10))))
+        
+        assert parquet.metadata.num_rows == 25
+        assert parquet.metadata.num_row_groups == 3
+        assert parquet.read().column("sources").to_pylist()[2] == ["ArXiv", "ArXiv"]
+    
+    def test_history_store_export(self, tmp_path):
+        """Test that exports read the store page by page in chronological order"""
+        from export import export_to_bytes
+        from history import HistoryStore
+        
+        store = HistoryStore(str(tmp_path / "history.sqlite3"))
+        for i in range(7):
+            store.record_search(f"query {i}", ["Wikipedia"], session_id="s1")
+        
+        assert [search["query"] for search in store.iter_searches(session_id="s1", page_size=3)] == [f"query {i}" for i in range(7)]
+        exported = export_to_bytes(store.iter_searches(session_id="s1", page_size=3), "ndjson").decode()
+        assert len(exported.splitlines()) == 7
+    
+    def test_export_is_valid_download_data(self):
+        """Test that a deferred download button accepts the export"""
+        from export import export_to_bytes
+        from streamlit.runtime.media_file_manager import MediaFileManager
+        from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+        
+        storage = MemoryMediaFileStorage("/media")
+        manager = MediaFileManager(storage)
+        file_id = manager.add_deferred(lambda: export_to_bytes(self.RECORDS, "csv"), "text/csv", "sidebar", "history.csv")
+        url = manager.execute_deferred(file_id)
+        
+        media_file = storage.get_file(url.rsplit("/", 1)[-1])
+        assert media_file.content == export_to_bytes(self.RECORDS, "csv")
+        assert media_file.content.startswith(b"timestamp,query,sources")
+
+
+class TestBatchQueries:
+    """Test the batch query runner"""
+    
+    def test_batch_resumes_after_failures(self, tmp_path):
+        """Test that results are written per line and completed lines are skipped on rerun"""
+        import json
+        from batch import run_batch
+        
+        input_path = tmp_path / "queries.jsonl"
+        output_path = tmp_path / "results.jsonl"
+        input_path.write_text('"what is ai"\n\n{"query": "fail me"}\n{"query": "protein folding"}\n')
+        calls = []
+        
+        def fake_search(api_key, query, sources, **kwargs):
+            calls.append(query)
+            if query == "fail me" and len(calls) < 4:
+                raise RuntimeError("upstream error")
+            return {"output": query.upper()}
+        
+        first = run_batch(str(input_path), str(output_path), "key", workers=2, rate_limits={}, search=fake_search)
+        assert first == {"submitted": 3, "succeeded": 2, "failed": 1, "skipped": 0}
+        
+        # Simulate a crash in the middle of writing a line
+        with open(output_path, "a") as f:
+            f.write('{"line": 3, "succ')
+        
+        second = run_batch(str(input_path), str(output_path), "key", workers=2, rate_limits={}, search=fake_search)
+        assert second == {"submitted": 1, "succeeded": 1, "failed": 0, "skipped": 2}
+        
+        answered = {}
+        for line in output_path.read_text().splitlines():
+            if line.endswith("}"):
+                record = json.loads(line)
+                if record["success"]:
+                    answered[record["line"]] = record["output"]
+        assert answered == {1: "WHAT IS AI", 3: "FAIL ME", 4: "PROTEIN FOLDING"}
+    
+    def test_malformed_lines_fail_on_their_own(self, tmp_path, monkeypatch):
+        """Test that bad input lines are written as failures without stalling the run"""
+        import json
+        import threading
+        from batch import run_batch
+        from config import BATCH_CONFIG
+        
+        input_path = tmp_path / "queries.jsonl"
+        output_path = tmp_path / "results.jsonl"
+        input_path.write_text('{"query": \n[1]\n{"sources": ["ArXiv"]}\n42\n"what is ai"\n{"query": "protein folding"}\n')
+        monkeypatch.setitem(BATCH_CONFIG, "max_pending_per_worker", 1)
+        summaries = []
+        
+        runner = threading.Thread(target=lambda: summaries.append(run_batch(
+            str(input_path), str(output_path), "key", workers=1, rate_limits={},
+            search=lambda api_key, query, sources, **kwargs: {"output": query.upper()}
+        )))
+        runner.start()
+        runner.join(timeout=10)
+        
+        assert summaries == [{"submitted": 6, "succeeded": 2, "failed": 4, "skipped": 0}]
+        results = {record["line"]: record for record in map(json.loads, output_path.read_text().splitlines())}
+        assert [line for line, record in sorted(results.items()) if not record["success"]] == [1, 2, 3, 4]
+        assert all(results[line]["error"] for line in (1, 2, 3, 4))
+        assert results[6]["output"] == "PROTEIN FOLDING"
+    
+    def test_token_bucket_limits_rate(self):
+        """Test that the token bucket spaces out calls beyond the burst"""
+        import time
+        from ratelimit import TokenBucket
+        
+        bucket = TokenBucket(rate=20, capacity=1)
+        start = time.perf_counter()
+        for _ in range(4):
+            bucket.acquire()
+        
+        assert time.perf_counter() - start >= 0.14
+        assert not TokenBucket(rate=1, capacity=1).acquire(tokens=2, blocking=False)
+
+    def test_identical_tool_calls_are_coalesced(self):
+        """Test that concurrent identical calls share one upstream request"""
+        import threading
+        import time
+        from langchain_core.tools import Tool
+        from engine import with_result_cache
+        
+        calls = []
+        
+        def slow_search(query):
+            calls.append(query)
+            time.sleep(0.2)
+            return f"results for {query}"
+        
+        tool = with_result_cache(Tool(name="LocalKnowledge", func=slow_search, description="test"), "Local Knowledge", 2, "Short")
+        outputs = []
+        threads = [
+            threading.Thread(target=lambda query=query: outputs.append(tool.run(query)))
+            for query in ["Quantum  computing", "quantum computing", "QUANTUM COMPUTING "]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(calls) == 1
+        assert len(set(outputs)) == 1
+    
+    def test_groq_rate_limiter_is_shared_per_api_key(self, monkeypatch):
+        """Test that chat models for one API key draw from the same token bucket"""
+        from config import API_CONFIG
+        from engine import build_llm
+        from ratelimit import get_rate_limiter
+        
+        monkeypatch.setitem(API_CONFIG, "request_burst", 1)
+        first = build_llm("rate-limit-test-key", "model-a")
+        second = build_llm("rate-limit-test-key", "model-b")
+        other = build_llm("another-test-key", "model-a")
+        
+        assert first.rate_limiter.acquire(blocking=False)
+        assert not second.rate_limiter.acquire(blocking=False)
+        assert other.rate_limiter.acquire(blocking=False)
+        assert get_rate_limiter(first.rate_limiter.key) is get_rate_limiter(second.rate_limiter.key)
+
+
+class TestTracing:
+    """Test per-stage latency tracing"""
+    
+    def test_agent_run_records_spans(self):
+        """Test that LLM calls, tool calls and agent iterations are traced"""
+        from langchain.agents import AgentType, initialize_agent
+        from langchain_core.language_models import FakeListLLM
+        from langchain_core.tools import Tool
+        from callbacks import TracingHandler
+        
+        llm = FakeListLLM(responses=[
+            "Thought: I should look this up\nAction: Echo\nAction Input: qubits",
+            "Thought: I know the answer\nFinal Answer: Qubits"
+        ])
+        echo = Tool(name="Echo", func=lambda query: f"echo {query}", description="Echoes the query")
+        agent = initialize_agent([echo], llm, agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION)
+        
+        tracer = TracingHandler(trace_id="test")
+        response = agent.invoke({"input": "what are qubits"}, config={"callbacks": [tracer]})
+        summary = tracer.summary()
+        
+        assert response["output"] == "Qubits"
+        assert [span["stage"] for span in summary["spans"]] == ["llm", "tool:Echo", "llm"]
+        assert summary["agent_iterations"] == 1
+        assert summary["llm_calls"] == 2
+        assert all(span["duration"] >= 0 and span["trace_id"] == "test" for span in summary["spans"])
+    
+    def test_calculate_percentiles(self):
+        """Test nearest-rank percentiles"""
+        from utils import calculate_percentiles
+        
+        values = [float(value) for value in range(1, 101)]
+        assert calculate_percentiles(values) == {"p50": 50.0, "p95": 95.0, "p99": 99.0}
+        assert calculate_percentiles([2.0]) == {"p50": 2.0, "p95": 2.0, "p99": 2.0}
+        assert calculate_percentiles([]) == {}
+
+class TestExecutionBudget:
+    """Test agent iteration/token budgets and query routing"""
+    
+    def _looping_agent(self, max_iterations=6):
+        from langchain.agents import AgentType, initialize_agent
+        from langchain_core.language_models import FakeListLLM
+        from langchain_core.tools import Tool
+        
+        # Never reaches a final answer, so only the budget can stop it
+        llm = FakeListLLM(responses=["Thought: search again\nAction: Echo\nAction Input: qubits"])
+        echo = Tool(name="Echo", func=lambda query: f"finding about {query}", description="Echoes the query")
+        return initialize_agent(
+            [echo],
+            llm,
+            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            max_iterations=max_iterations,
+            early_stopping_method="force"
+        )
+    
+    def test_token_budget_returns_partial_answer(self, monkeypatch):
+        """Test that an exhausted token budget yields the findings so far"""
+        import engine
+        
+        monkeypatch.setitem(engine.BUDGET_CONFIG, "max_tokens", 300)
+        response = engine.run_agent_with_budget(self._looping_agent(max_iterations=50), "what are qubits", timeout=10)
+        
+        assert response["budget_exhausted"]
+        assert response["tokens_used"] >= 300
+        assert "finding about qubits" in response["output"]
+    
+    def test_iteration_limit_returns_partial_answer(self):
+        """Test that hitting max_iterations does not surface the raw stop message"""
+        import engine
+        
+        response = engine.run_agent_with_budget(self._looping_agent(max_iterations=2), "what are qubits", timeout=10)
+        
+        assert response["budget_exhausted"]
+        assert not response["output"].startswith("Agent stopped")
+        assert "finding about qubits" in response["output"]
+
+    def test_generated_answer_at_iteration_cap_is_flagged(self, monkeypatch):
+        """Test that a capped run is exhausted and uncached even when the LLM writes a final answer"""
+        from langchain.agents import AgentType, initialize_agent
+        from langchain_core.language_models import FakeListLLM
+        from langchain_core.tools import Tool
+        import engine
+        from config import FEATURES
+
+        action = "Thought: search again\nAction: Echo\nAction Input: qubits"
+        llm = FakeListLLM(responses=[action, action, "Final Answer: Qubits, as far as I got."])
+        echo = Tool(name="Echo", func=lambda query: f"finding about {query}", description="Echoes the query")
+        agent = initialize_agent(
+            [echo],
+            llm,
+            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            max_iterations=2,
+            early_stopping_method="generate"
+        )
+        stored = []
+        monkeypatch.setitem(FEATURES, "semantic_answer_cache", True)
+        monkeypatch.setitem(FEATURES, "query_router", False)
+        monkeypatch.setattr(engine, "get_search_agent", lambda *args, **kwargs: agent)
+        monkeypatch.setattr(engine, "lookup_cached_answer", lambda *args, **kwargs: None)
+        monkeypatch.setattr(engine, "store_answer", lambda *args: stored.append(args))
+
+        response = engine.run_search("gsk_test", "what are qubits", ["Wikipedia"], mode="Agent (ReAct)", prefetch=False)
+
+        assert response["budget_exhausted"]
+        assert response["output"] == "Qubits, as far as I got."
+        assert "intermediate_steps" not in response
+        assert stored == []
+
+    def test_simple_queries_take_direct_route(self, monkeypatch):
+        """Test that simple questions in agent mode use one preferred source"""
+        import engine
+        from config import FEATURES
+        
+        calls = []
+        monkeypatch.setitem(FEATURES, "semantic_answer_cache", False)
+        monkeypatch.setattr(
+            engine,
+            "run_parallel_search",
+            lambda api_key, query, sources, *args, **kwargs: calls.append(sources) or {"input": query, "output": "42"}
+        )
+        
+        response = engine.run_search("gsk_test", "What is entropy?", ["ArXiv", "Wikipedia"], mode="Agent (ReAct)")
+        
+        assert response["route"] == "direct"
+        assert calls == [["Wikipedia"]]
+        assert engine.select_route("Why do stars explode?", ["Wikipedia"], "Agent (ReAct)") == "agent"
+        assert engine.select_route("What is entropy?", ["Wikipedia"], "Parallel retrieval") == "parallel"
+        
+        monkeypatch.setitem(FEATURES, "query_router", False)
+        assert engine.select_route("What is entropy?", ["Wikipedia"], "Agent (ReAct)") == "agent"
+
+class TestLocalKnowledge:
+    """Test the Local Knowledge FAISS source"""
+    
+    def _documents(self):
+        from langchain_core.documents import Document
+        
+        return [
+            Document(page_content="Photosynthesis converts sunlight, water and carbon dioxide into glucose in plant chloroplasts.", metadata={"source": "bio.md", "title": "bio.md"}),
+            Document(page_content="Kubernetes schedules containers onto cluster nodes and restarts failed pods.", metadata={"source": "ops.md", "title": "ops.md"}),
+            Document(page_content="The French Revolution began in 1789 with the storming of the Bastille.", metadata={"source": "history.md", "title": "history.md"})
+        ]
+    
+    def test_ingest_and_search_memory_mapped_index(self, tmp_path):
+        """Test that an ingested index is reloaded from disk and searched"""
+        from embeddings import HashingEmbedder
+        from knowledge import LocalKnowledgeIndex, ingest_documents
+        
+        summary = ingest_documents(self._documents(), str(tmp_path), embedder=HashingEmbedder(), batch_size=2)
+        index = LocalKnowledgeIndex(str(tmp_path), embedder=HashingEmbedder())
+        results = index.search("how do chloroplasts use sunlight", k=2)
+        
+        assert summary["documents"] == 3 and summary["chunks_embedded"] == 3
+        assert len(index) == 3
+        assert results[0]["source"] == "bio.md"
+        assert results[0]["score"] >= results[-1]["score"]
+    
+    def test_tool_reflects_reingestion(self, tmp_path, monkeypatch):
+        """Test the engine tool, including the message before any ingestion"""
+        import engine
+        from config import KNOWLEDGE_CONFIG
+        from embeddings import HashingEmbedder
+        from knowledge import ingest_documents
+        
+        monkeypatch.setitem(KNOWLEDGE_CONFIG, "directory", str(tmp_path))
+        tool = engine.with_result_cache(
+            engine.build_search_tool("Local Knowledge", 1, "Short"), "Local Knowledge", 1, "Short"
+        )
+        
+        assert "No local knowledge base" in tool.run("kubernetes pods")
+        
+        ingest_documents(self._documents(), str(tmp_path), embedder=HashingEmbedder())
+        assert "ops.md" in tool.run("kubernetes pods")
+        
+        ingest_documents(self._documents()[:1], str(tmp_path), embedder=HashingEmbedder(), prune=True)
+        assert "ops.md" not in tool.run("kubernetes pods")
+    
+    def test_router_skips_empty_local_knowledge(self, tmp_path, monkeypatch):
+        """Test that the direct route only prefers Local Knowledge once it has vectors"""
+        import engine
+        from config import KNOWLEDGE_CONFIG
+        from embeddings import HashingEmbedder
+        from knowledge import ingest_documents
+
+        monkeypatch.setitem(KNOWLEDGE_CONFIG, "directory", str(tmp_path))
+        sources = ["Local Knowledge", "Wikipedia"]
+        assert engine.get_direct_source(sources) == "Wikipedia"
+
+        ingest_documents(self._documents()[:1], str(tmp_path), embedder=HashingEmbedder())
+        assert engine.get_direct_source(sources) == "Local Knowledge"
+
+        ingest_documents([], str(tmp_path), embedder=HashingEmbedder(), prune=True)
+        assert engine.get_direct_source(sources) == "Wikipedia"
+        assert engine.get_direct_source(["Local Knowledge"]) == "Local Knowledge"
+
+    def test_load_documents_from_directory(self, tmp_path):
+        """Test that ingestion walks directories for supported files"""
+        from ingest import load_documents
+        
+        (tmp_path / "notes.md").write_text("# Notes\nFAISS stores vectors.")
+        (tmp_path / "image.png").write_bytes(b"\x89PNG")
+        
+        documents = load_documents([str(tmp_path)])
+        
+        assert [document.metadata["title"] for document in documents] == ["notes.md"]
+    
+    def _counting_embedder(self):
+        from embeddings import HashingEmbedder
+        
+        class CountingEmbedder(HashingEmbedder):
+            embedded = 0
+            
+            def encode(self, texts):
+                CountingEmbedder.embedded += len(texts)
+                return super().encode(texts)
+        
+        return CountingEmbedder()
+    
+    def test_reingesting_unchanged_corpus_embeds_nothing(self, tmp_path):
+        """Test that unchanged documents are skipped and the index file is left alone"""
+        from knowledge import get_index_version, get_knowledge_paths, ingest_documents
+        
+        embedder = self._counting_embedder()
+        ingest_documents(self._documents(), str(tmp_path), embedder=embedder)
+        version = get_index_version(get_knowledge_paths(str(tmp_path)))
+        embedded = embedder.embedded
+        
+        summary = ingest_documents(self._documents(), str(tmp_path), embedder=embedder)
+        
+        assert summary["unchanged_documents"] == 3
+        assert embedder.embedded == embedded
+        assert get_index_version(get_knowledge_paths(str(tmp_path))) == version
+    
+    def test_changed_document_embeds_only_new_chunks(self, tmp_path, monkeypatch):
+        """Test that kept chunks reuse vectors and dropped chunks are deleted"""
+        from langchain_core.documents import Document
+        from config import KNOWLEDGE_CONFIG
+        from knowledge import LocalKnowledgeIndex, ingest_documents
+        
+        monkeypatch.setitem(KNOWLEDGE_CONFIG, "chunk_size", 40)
+        monkeypatch.setitem(KNOWLEDGE_CONFIG, "chunk_overlap", 0)
+        paragraphs = ["Glaciers carve deep valleys.", "Volcanoes build new islands.", "Rivers deposit fertile silt."]
+        embedder = self._counting_embedder()
+        
+        ingest_documents([Document(page_content="\n\n".join(paragraphs), metadata={"source": "geo.md"})], str(tmp_path), embedder=embedder)
+        embedded = embedder.embedded
+        paragraphs[1] = "Earthquakes shift tectonic plates."
+        summary = ingest_documents([Document(page_content="\n\n".join(paragraphs), metadata={"source": "geo.md"})], str(tmp_path), embedder=embedder)
+        index = LocalKnowledgeIndex(str(tmp_path), embedder=embedder)
+        
+        assert embedder.embedded - embedded == 1
+        assert (summary["chunks_embedded"], summary["chunks_reused"], summary["chunks_removed"]) == (1, 2, 1)
+        assert len(index) == 3
+        assert "Earthquakes" in index.search("tectonic earthquakes", k=1)[0]["text"]
+        assert all("Volcanoes" not in result["text"] for result in index.search("volcanoes islands", k=3))
+    
+    def test_duplicate_chunks_are_embedded_once(self, tmp_path):
+        """Test content-hash dedup across documents"""
+        from langchain_core.documents import Document
+        from knowledge import ingest_documents
+        
+        embedder = self._counting_embedder()
+        text = "Shared boilerplate paragraph about licensing."
+        summary = ingest_documents(
+            [Document(page_content=text, metadata={"source": name}) for name in ("a.md", "b.md")],
+            str(tmp_path),
+            embedder=embedder
+        )
+        copied = ingest_documents([Document(page_content=text, metadata={"source": "c.md"})], str(tmp_path), embedder=embedder)
+        
+        assert embedder.embedded == 1
+        assert (summary["chunks_embedded"], summary["chunks_reused"]) == (1, 1)
+        assert (copied["chunks_embedded"], copied["chunks_reused"]) == (0, 1)
+    
+    def test_lexical_index_matches_identifiers(self, tmp_path):
+        """Test BM25 postings on identifiers and acronyms"""
+        from lexical import LexicalIndex, tokenize_terms, write_lexical_index
+        
+        write_lexical_index(str(tmp_path), [
+            (10, "Attention Is All You Need, arXiv 1706.03762, introduced the Transformer."),
+            (11, "The transformer architecture scales with data and compute."),
+            (12, "GPT-4 is evaluated on many AI benchmarks.")
+        ])
+        index = LexicalIndex(str(tmp_path))
+        
+        assert "1706.03762" in tokenize_terms("see arXiv:1706.03762")
+        assert {"gpt-4", "gpt", "4"} <= set(tokenize_terms("GPT-4"))
+        assert index.search("1706.03762")[0][0] == 10
+        assert index.search("AI benchmarks")[0][0] == 12
+        assert [doc_id for doc_id, _ in index.search("transformer")] == [11, 10]
+        assert index.search("unknownterm") == []
+    
+    def test_reciprocal_rank_fusion(self):
+        """Test that items ranked well in both lists win"""
+        from lexical import reciprocal_rank_fusion
+        
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+        
+        assert [item for item, _ in fused] == ["b", "a", "d", "c"]
+        assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+    
+    def test_hybrid_search_finds_exact_terms(self, tmp_path, monkeypatch):
+        """Test that fusion surfaces an acronym the vectors ignore"""
+        from langchain_core.documents import Document
+        from config import KNOWLEDGE_CONFIG
+        from embeddings import HashingEmbedder
+        from knowledge import LocalKnowledgeIndex, ingest_documents
+        
+        class AcronymBlindEmbedder(HashingEmbedder):
+            def tokenize(self, text):
+                return [term for term in super().tokenize(text) if len(term) > 2]
+        
+        documents = [
+            Document(page_content=f"Filler paragraph {i} about gardening and soil.", metadata={"source": f"{i}.md"})
+            for i in range(10)
+        ] + [Document(page_content="The ML team reviews RL results weekly.", metadata={"source": "rl.md"})]
+        ingest_documents(documents, str(tmp_path), embedder=AcronymBlindEmbedder())
+        
+        hybrid = LocalKnowledgeIndex(str(tmp_path), embedder=AcronymBlindEmbedder()).search("RL", k=1)
+        monkeypatch.setitem(KNOWLEDGE_CONFIG, "hybrid_search", False)
+        vector_only = LocalKnowledgeIndex(str(tmp_path), embedder=AcronymBlindEmbedder()).search("RL", k=1)
+        
+        assert hybrid[0]["source"] == "rl.md"
+        assert vector_only[0]["source"] != "rl.md"
+    
+    def test_orphan_vectors_are_reconciled(self, tmp_path):
+        """Test recovery when the index was written but the store never committed"""
+        import faiss
+        import numpy as np
+        from knowledge import LocalKnowledgeIndex, get_knowledge_paths, ingest_documents, write_index
+        
+        embedder = self._counting_embedder()
+        ingest_documents(self._documents(), str(tmp_path), embedder=embedder)
+        index_path = get_knowledge_paths(str(tmp_path))["index"]
+        index = faiss.read_index(index_path)
+        index.add_with_ids(embedder.encode(["orphan"]), np.asarray([999], dtype=np.int64))
+        write_index(index, index_path)
+        
+        ingest_documents(self._documents(), str(tmp_path), embedder=embedder)
+        
+        assert len(LocalKnowledgeIndex(str(tmp_path), embedder=embedder)) == 3
+
+class TestTransport:
+    """Test retries, circuit breakers, hedging and the HTTP-backed sources"""
+    
+    @pytest.fixture(autouse=True)
+    def fast_transport(self, monkeypatch):
+        import transport
+        from config import HTTP_CONFIG
+        
+        monkeypatch.setitem(HTTP_CONFIG, "retry_base_delay", 0)
+        transport.reset_transport()
+        yield
+        transport.reset_transport()
+    
+    def mock_session(self, monkeypatch, handler):
+        """Route the pooled requests session to handler(request) -> (status, body)"""
+        import requests
+        import sources
+        import transport
+        
+        class FakeAdapter(requests.adapters.BaseAdapter):
+            def send(self, request, **kwargs):
+                status, body = handler(request)
+                response = requests.Response()
+                response.status_code = status
+                response._content = body.encode("utf-8")
+                response.url = request.url
+                response.request = request
+                return response
+            
+            def close(self):
+                pass
+        
+        monkeypatch.setattr(transport, "_requests_session", None)
+        session = transport.get_requests_session()
+        session.mount("https://", FakeAdapter())
+        session.mount("http://", FakeAdapter())
+        sources.get_wikipedia_wrapper.cache_clear()
+        sources.get_arxiv_wrapper.cache_clear()
+        transport.install_wikipedia_session()
+    
+    def test_retries_server_errors(self, monkeypatch):
+        """Test that 5xx responses are retried until one succeeds"""
+        from transport import get_requests_session, get_transport_stats, call_source
+        
+        calls = []
+        
+        def handler(request):
+            calls.append(request)
+            return (503, "") if len(calls) < 3 else (200, '{"ok": true}')
+        
+        self.mock_session(monkeypatch, handler)
+        response = call_source("Wikipedia", lambda: get_requests_session().get("https://example.org/api").json())
+        assert response == {"ok": True}
+        stats = get_transport_stats()["sources"]["Wikipedia"]
+        assert stats["retries"] == 2
+        assert stats["circuit"] == "closed"
+    
+    def test_only_transient_errors_are_retried(self, monkeypatch):
+        """Test that programming and parsing errors fail fast and retries are not hedged"""
+        import time
+        from config import HTTP_CONFIG
+        from transport import RetryableStatusError, call_source, get_transport_stats
+        
+        monkeypatch.setitem(HTTP_CONFIG, "retry_attempts", 3)
+        
+        calls = []
+        
+        def broken():
+            calls.append(None)
+            raise ValueError("unexpected response layout")
+        
+        with pytest.raises(ValueError):
+            call_source("Web Search", broken)
+        assert len(calls) == 1
+        
+        attempts = []
+        
+        def slow_failure():
+            attempts.append(None)
+            time.sleep(0.05)
+            raise RetryableStatusError("HTTP 503")
+        
+        with pytest.raises(RetryableStatusError):
+            call_source("Web Search", slow_failure, hedge_delay=0.01)
+        # The first attempt and its hedge, then one request per retry
+        assert len(attempts) == 4
+        assert get_transport_stats()["sources"]["Web Search"]["hedges"] == 1
+    
+    def test_circuit_breaker_opens_and_recovers(self):
+        """Test that a failing source is skipped, then retried after the reset timeout"""
+        import time
+        from transport import CircuitBreaker
+        
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow()
+        
+        time.sleep(0.06)
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+    
+    def test_open_circuit_becomes_tool_observation(self, monkeypatch):
+        """Test that a source failure is returned as tool output and not cached"""
+        import engine
+        from config import HTTP_CONFIG
+        
+        monkeypatch.setitem(HTTP_CONFIG, "retry_attempts", 1)
+        monkeypatch.setitem(HTTP_CONFIG, "breaker_failure_threshold", 1)
+        self.mock_session(monkeypatch, lambda request: (500, ""))
+        engine.reset_caches()
+        
+        tool = engine.get_search_tools(["Wikipedia"], 2, "Short")[0]
+        assert "failed" in tool.run("flaky source")
+        assert "temporarily unavailable" in tool.run("flaky source")
+    
+    def test_hedged_request_wins(self):
+        """Test that a slow first attempt is overtaken by the hedge"""
+        import time
+        from transport import get_transport_stats, hedged
+        
+        calls = []
+        
+        def call():
+            calls.append(None)
+            if len(calls) == 1:
+                time.sleep(0.5)
+                return "slow"
+            return "fast"
+        
+        start = time.time()
+        assert hedged("Web Search", call, 0.05) == "fast"
+        assert time.time() - start < 0.4
+        assert get_transport_stats()["sources"]["Web Search"]["hedge_wins"] == 1
+    
+    def test_wikipedia_and_arxiv_use_pooled_session(self, monkeypatch):
+        """Test that the upstream wrappers send their requests through the shared session"""
+        import json
+        from urllib.parse import parse_qs, urlsplit
+        from sources import search_arxiv, search_wikipedia
+        
+        feed = """<?xml version="1.0" encoding="UTF-8"?>
+        <feed xmlns="http://www.w3.org/2005/Atom"><entry>
+            <id>http://arxiv.org/abs/1706.03762v7</id>
+            <updated>2023-08-02T00:41:18Z</updated><published>2017-06-12T17:57:34Z</published>
+            <title>Attention Is All You Need</title><summary>Transformers.</summary>
+            <author><name>A. Vaswani</name></author><author><name>N. Shazeer</name></author>
+            <link href="http://arxiv.org/abs/1706.03762v7" rel="alternate" type="text/html"/>
+        </entry></feed>"""
+        hosts = []
+        
+        def handler(request):
+            url = urlsplit(request.url)
+            hosts.append(url.hostname)
+            params = {key: values[0] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+            if url.hostname == "export.arxiv.org":
+                assert params["id_list"] == "1706.03762"
+                return 200, feed
+            if params.get("list") == "search":
+                return 200, json.dumps({"query": {"search": [{"title": "Pooling"}]}})
+            if params.get("prop") == "info|pageprops":
+                return 200, json.dumps({"query": {"pages": {"7": {"pageid": 7, "title": "Pooling", "fullurl": "https://en.wikipedia.org/wiki/Pooling"}}}})
+            return 200, json.dumps({"query": {"pages": {"7": {"extract": "Shared connections."}}}})
+        
+        self.mock_session(monkeypatch, handler)
+        assert search_wikipedia("connection pooling", 1, 1000) == "Page: Pooling\nSummary: Shared connections."
+        assert search_arxiv("1706.03762", 1, 1000) == (
+            "Published: 2023-08-02\nTitle: Attention Is All You Need\n"
+            "Authors: A. Vaswani, N. Shazeer\nSummary: Transformers."
+        )
+        assert set(hosts) == {"en.wikipedia.org", "export.arxiv.org"}
+
+
+class TestOfflineBenchmark:
+    """Test the offline pipeline benchmark harness"""
+    
+    def test_pipeline_runs_on_fake_backends(self):
+        """Test that both search modes complete end to end without network access"""
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+        from bench_pipeline import FakeSearchLLM, LatencyModel, TOOL_NAMES, make_queries, make_tool_builder, offline_backends, run_load
+        import engine
+        
+        sources = ["Wikipedia", "ArXiv"]
+        llm = FakeSearchLLM(
+            tool_names=[TOOL_NAMES[source] for source in sources],
+            latency=LatencyModel(0),
+            tool_calls=2
+        )
+        tool_builder = make_tool_builder({source: LatencyModel(0) for source in sources}, 100)
+        original_builder = engine.build_search_tool
+        
+        with offline_backends(llm, tool_builder):
+            for mode in ["Agent (ReAct)", "Parallel retrieval"]:
+                result = run_load(make_queries(4, 4), 2, mode, sources, timeout=5)
+                assert result["errors"] == 0, result["first_error"]
+                assert result["latency_s"]["p50"] is not None
+        
+        assert engine.build_search_tool is original_builder
+
 def test_app_imports():
     """Test that main app can be imported without errors"""
     try:
         # This will test if all imports work correctly
         import app
         assert hasattr(app, 'st')
-        assert hasattr(app, 'ChatGroq')
+        assert hasattr(app, 'run_search')
     except ImportError as e:
         pytest.fail(f"App module could not be imported: {e}")
 
+def test_engine_imports_integrations_lazily():
+    """Test that importing the engine leaves the LangChain integrations unloaded"""
+    import subprocess
+    import sys
+    from deploy import LAZY_IMPORTS, parse_import_times
+    
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import engine"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    imported = {name for name, _, _, _ in parse_import_times(result.stderr)}
+    assert "engine" in imported
+    assert not imported.intersection(LAZY_IMPORTS)
+
 if __name__ == "__main__":
     # Run tests
     pytest.main([__file__, "-v"])
@@ -0,0 +1,153 @@
+"""
+Chat transcript for Yaswanth's AI Search Engine
+Keeps a fixed window of recent messages in memory, leaves older turns in
+the history store to be paged back in on request, and condenses the
+conversation into a short context for the LLM
+"""
+
+import re
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from config import DEFAULT_PROMPTS, TRANSCRIPT_CONFIG
+from history import HistoryStore
+from utils import truncate_text
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def compact_text(text: str, max_chars: int) -> str:
+    """Collapse whitespace and cut text to at most max_chars"""
+    return truncate_text(_WHITESPACE_PATTERN.sub(' ', text).strip(), max_chars)
+
+
+class ChatTranscript:
+    """
+    Bounded view of one session's chat
+
+    Every message is written to the history store. Only the latest
+    window_messages stay in memory, so the work per Streamlit rerun does not
+    grow with the length of the conversation. Older messages are read back
+    from the store a page at a time with load_older, and questions that
+    leave the window are kept in a short summary for the LLM.
+
+    Args:
+        session_id (str): Browser session the transcript belongs to
+        history_store (HistoryStore): Store holding the full conversation
+        window_messages (int): Recent messages kept in memory
+        page_messages (int): Older messages loaded per load_older call
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        history_store: HistoryStore,
+        window_messages: int = TRANSCRIPT_CONFIG["window_messages"],
+        page_messages: int = TRANSCRIPT_CONFIG["page_messages"]
+    ):
+        self.session_id = session_id
+        self.history_store = history_store
+        self.page_messages = page_messages
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=window_messages)
+        self.older: List[Dict[str, Any]] = []
+        self.earlier_questions: Deque[str] = deque(maxlen=TRANSCRIPT_CONFIG["summary_questions"])
+        # Pick up a session that already has messages, e.g. after a server restart
+        self.total = history_store.count_messages(session_id)
+        if self.total:
+            for message in history_store.get_messages(session_id, limit=window_messages):
+                self.recent.append({"role": message["role"], "content": message["content"]})
+
+    def append(self, role: str, content: str) -> None:
+        """
+        Add a message to the conversation and the history store
+
+        Args:
+            role (str): 'user' or 'assistant'
+            content (str): Message text
+        """
+        self.history_store.record_message(self.session_id, role, content)
+        if len(self.recent) == self.recent.maxlen and self.recent[0]["role"] == "user":
+            self.earlier_questions.append(compact_text(self.recent[0]["content"], TRANSCRIPT_CONFIG["question_chars"]))
+        self.recent.append({"role": role, "content": content})
+        self.total += 1
+        # Loaded pages are dropped with each new message so memory stays bounded
+        self.older = []
+
+    def has_older(self) -> bool:
+        """Whether messages before the visible ones are left in the store"""
+        return self.total > len(self.recent) + len(self.older)
+
+    def load_older(self) -> int:
+        """
+        Read the next page of older messages from the history store
+
+        Returns:
+            int: Messages loaded
+        """
+        if not self.has_older():
+            return 0
+        if self.older:
+            page = self.history_store.get_messages(
+                self.session_id, before_id=self.older[0]["id"], limit=self.page_messages
+            )
+        else:
+            # Messages in the window have no IDs yet; read past them once
+            page = self.history_store.get_messages(self.session_id, limit=len(self.recent) + self.page_messages)
+            page = page[:max(0, len(page) - len(self.recent))]
+        self.older = page + self.older
+        return len(page)
+
+    def visible(self) -> List[Dict[str, Any]]:
+        """
+        Get the messages to render, oldest first
+
+        Returns:
+            List[Dict[str, Any]]: Loaded older pages followed by the recent window
+        """
+        return self.older + list(self.recent)
+
+    def summary(self, exclude_last: int = 0) -> Optional[str]:
+        """
+        Condense the conversation into a short context for the LLM
+
+        Earlier questions are listed on one line and the latest messages are
+        cut to TRANSCRIPT_CONFIG["message_chars"], so the context stays small
+        however long the conversation gets.
+
+        Args:
+            exclude_last (int): Latest messages to leave out, e.g. the question
+                being answered
+
+        Returns:
+            Optional[str]: Conversation summary, or None before the first exchange
+        """
+        messages = list(self.recent)[:len(self.recent) - exclude_last]
+        cutoff = max(0, len(messages) - TRANSCRIPT_CONFIG["context_messages"])
+        questions = list(self.earlier_questions) + [
+            compact_text(message["content"], TRANSCRIPT_CONFIG["question_chars"])
+            for message in messages[:cutoff] if message["role"] == "user"
+        ]
+        lines = []
+        if questions:
+            lines.append("Earlier questions: " + "; ".join(questions[-TRANSCRIPT_CONFIG["summary_questions"]:]))
+        lines.extend(
+            f"{message['role'].capitalize()}: {compact_text(message['content'], TRANSCRIPT_CONFIG['message_chars'])}"
+            for message in messages[cutoff:]
+        )
+        return "\n".join(lines) or None
+
+
+def add_conversation(query: str, conversation: Optional[str]) -> str:
+    """
+    Put a conversation summary in front of a question
+
+    Args:
+        query (str): Current question
+        conversation (Optional[str]): Summary from ChatTranscript.summary
+
+    Returns:
+        str: Question with its conversation context, or the question unchanged
+    """
+    if not conversation:
+        return query
+    return DEFAULT_PROMPTS["conversation"].format(conversation=conversation, query=query)
@@ -0,0 +1,364 @@
+"""
+Outbound HTTP for Yaswanth's AI Search Engine
+Shared connection pools, jittered exponential backoff, per-source circuit
+breakers and hedged requests, with statistics for each source
+"""
+
+import importlib
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import API_CONFIG, ENGINE_CONFIG, HTTP_CONFIG
+
+
+class CircuitOpenError(Exception):
+    """Raised when a source's circuit breaker is skipping calls"""
+
+
+class RetryableStatusError(Exception):
+    """Raised for HTTP responses worth retrying, such as 429 and 5xx"""
+
+
+# Failures worth retrying: connection problems, timeouts and 429/5xx responses
+TRANSIENT_ERRORS: Tuple[Type[BaseException], ...] = (
+    httpx.TransportError,
+    requests.ConnectionError,
+    requests.Timeout,
+    RetryableStatusError
+)
+
+
+class CircuitBreaker:
+    """
+    Per-source circuit breaker
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are refused for reset_timeout seconds. Then one trial call is let through
+    (half-open); its success closes the circuit and its failure reopens it.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit
+        reset_timeout (float): Seconds to stay open before a trial call
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = HTTP_CONFIG["breaker_failure_threshold"],
+        reset_timeout: float = HTTP_CONFIG["breaker_reset_timeout"]
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half-open'"""
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if now - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go out now
+
+        Returns:
+            bool: False while open, or while another half-open trial is running
+        """
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful call"""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the circuit at the threshold"""
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+_http_client: Optional[httpx.Client] = None
+_requests_session: Optional[requests.Session] = None
+_http_client_lock = threading.Lock()
+_breakers: Dict[str, CircuitBreaker] = {}
+_stats: Dict[str, Dict[str, int]] = {}
+_state_lock = threading.Lock()
+# Small pool for hedged attempts so they never queue behind retrieval work
+_hedge_pool = ThreadPoolExecutor(max_workers=HTTP_CONFIG["hedge_workers"], thread_name_prefix="hedge")
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the process-wide pooled HTTP client
+
+    Groq calls and the search sources share its keep-alive connections,
+    pooled per host.
+
+    Returns:
+        httpx.Client: Shared client
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=ENGINE_CONFIG["http_max_connections"],
+                    max_keepalive_connections=ENGINE_CONFIG["http_max_keepalive_connections"],
+                    keepalive_expiry=HTTP_CONFIG["keepalive_expiry"]
+                ),
+                timeout=API_CONFIG["timeout"],
+                headers={"User-Agent": HTTP_CONFIG["user_agent"]}
+            )
+        return _http_client
+
+
+class _TimeoutAdapter(HTTPAdapter):
+    """Connection pool adapter that applies the configured timeouts when a caller sets none"""
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = (HTTP_CONFIG["connect_timeout"], HTTP_CONFIG["read_timeout"])
+        return super().send(request, **kwargs)
+
+
+def _raise_retryable_status(response: requests.Response, *args, **kwargs) -> None:
+    if response.status_code == 429 or response.status_code >= 500:
+        raise RetryableStatusError(f"HTTP {response.status_code} from {urlsplit(response.url).hostname}")
+
+
+def get_requests_session() -> requests.Session:
+    """
+    Get the process-wide pooled requests session
+
+    The Wikipedia and arXiv client libraries are built on requests, so they
+    are handed this session to reuse keep-alive connections per host. 429
+    and 5xx responses raise RetryableStatusError for call_source to retry.
+
+    Returns:
+        requests.Session: Shared session
+    """
+    global _requests_session
+    with _http_client_lock:
+        if _requests_session is None:
+            session = requests.Session()
+            adapter = _TimeoutAdapter(
+                pool_connections=ENGINE_CONFIG["http_max_keepalive_connections"],
+                pool_maxsize=ENGINE_CONFIG["http_max_connections"]
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = HTTP_CONFIG["user_agent"]
+            session.hooks["response"].append(_raise_retryable_status)
+            _requests_session = session
+        return _requests_session
+
+
+def install_wikipedia_session() -> None:
+    """
+    Send the wikipedia package's requests through the pooled session
+
+    The wikipedia package calls requests.get on its module-level requests
+    import, which opens a new connection per call. This rebinds that name to
+    the shared session for the whole process. Call it before the first
+    Wikipedia search; repeated calls leave the installed session in place.
+    """
+    module = importlib.import_module("wikipedia.wikipedia")
+    session = get_requests_session()
+    if module.requests is not session:
+        module.requests = session
+
+
+def get_circuit_breaker(source: str) -> CircuitBreaker:
+    """Get the circuit breaker for a source, creating it on first use"""
+    with _state_lock:
+        if source not in _breakers:
+            _breakers[source] = CircuitBreaker(
+                HTTP_CONFIG["breaker_failure_threshold"],
+                HTTP_CONFIG["breaker_reset_timeout"]
+            )
+        return _breakers[source]
+
+
+def _count(source: str, event: str, amount: int = 1) -> None:
+    with _state_lock:
+        counters = _stats.setdefault(source, {})
+        counters[event] = counters.get(event, 0) + amount
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Get the wait before a retry using exponential backoff with full jitter
+
+    Args:
+        attempt (int): Retry number, starting at 1
+
+    Returns:
+        float: Seconds to sleep
+    """
+    ceiling = min(HTTP_CONFIG["retry_max_delay"], HTTP_CONFIG["retry_base_delay"] * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+def hedged(source: str, func: Callable[[], Any], delay: float) -> Any:
+    """
+    Run a call, starting a second copy if the first is slow
+
+    The first attempt to succeed wins; the other is left to finish in the
+    background. If both fail, the last error is raised.
+
+    Args:
+        source (str): Source name for statistics
+        func (Callable[[], Any]): Call to make
+        delay (float): Seconds to wait before sending the hedge
+
+    Returns:
+        Any: Result of the first successful attempt
+    """
+    first = _hedge_pool.submit(func)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+
+    _count(source, "hedges")
+    second = _hedge_pool.submit(func)
+    pending = {first, second}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    _count(source, "hedge_wins")
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def call_source(
+    source: str,
+    func: Callable[[], Any],
+    retry_on: Tuple[Type[BaseException], ...] = TRANSIENT_ERRORS,
+    hedge_delay: Optional[float] = None
+) -> Any:
+    """
+    Call an upstream source through its circuit breaker with retries
+
+    Only the first attempt is hedged, so one call sends at most
+    retry_attempts + 1 requests.
+
+    Args:
+        source (str): Source name
+        func (Callable[[], Any]): Call to make
+        retry_on (Tuple[Type[BaseException], ...]): Errors that are retried
+        hedge_delay (Optional[float]): Send a hedged copy of the first attempt after this many seconds
+
+    Returns:
+        Any: Result of func
+
+    Raises:
+        CircuitOpenError: The source is failing and is being skipped
+    """
+    breaker = get_circuit_breaker(source)
+    if not breaker.allow():
+        _count(source, "short_circuited")
+        raise CircuitOpenError(f"{source} is temporarily unavailable after repeated failures")
+
+    attempts = HTTP_CONFIG["retry_attempts"]
+    for attempt in range(1, attempts + 1):
+        _count(source, "requests")
+        try:
+            if hedge_delay is not None and attempt == 1:
+                result = hedged(source, func, hedge_delay)
+            else:
+                result = func()
+        except retry_on:
+            if attempt == attempts:
+                _count(source, "failures")
+                breaker.record_failure()
+                raise
+            _count(source, "retries")
+            time.sleep(backoff_delay(attempt))
+        except Exception:
+            _count(source, "failures")
+            breaker.record_failure()
+            raise
+        else:
+            _count(source, "successes")
+            breaker.record_success()
+            return result
+
+
+def get_pool_connections() -> Dict[str, int]:
+    """Count open and idle connections in the shared pool"""
+    pool = getattr(getattr(_http_client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    return {
+        'open': len(connections),
+        'idle': sum(1 for connection in connections if connection.is_idle())
+    }
+
+
+def get_requests_pool_connections() -> Dict[str, int]:
+    """Count host pools and idle keep-alive connections in the shared requests session"""
+    hosts = idle = 0
+    adapters = set(_requests_session.adapters.values()) if _requests_session is not None else set()
+    for adapter in adapters:
+        pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+        for key in list(pools.keys()) if pools is not None else []:
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts += 1
+            idle += sum(1 for connection in list(pool.pool.queue) if connection is not None)
+    return {'hosts': hosts, 'idle': idle}
+
+
+def get_transport_stats() -> Dict[str, Any]:
+    """
+    Get pool usage and per-source request statistics
+
+    Returns:
+        Dict[str, Any]: 'pool' (httpx) and 'requests_pool' connection counts and,
+        per source, request, retry, failure, hedge and short-circuit counters
+        with breaker state
+    """
+    with _state_lock:
+        sources = {source: dict(counters) for source, counters in _stats.items()}
+        breakers = dict(_breakers)
+    for source, breaker in breakers.items():
+        sources.setdefault(source, {})['circuit'] = breaker.state
+    return {'pool': get_pool_connections(), 'requests_pool': get_requests_pool_connections(), 'sources': sources}
+
+
+def reset_transport() -> None:
+    """Forget breaker state and statistics"""
+    with _state_lock:
+        _breakers.clear()
+        _stats.clear()
@@ -3,12 +3,83 @@ Utility functions for Yaswanth's AI Search Engine
 Contains helper functions for data processing, validation, and formatting
 """
 
-import json
 import re
+from collections import Counter
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
 import streamlit as st
 
+from aggregates import SearchAggregates, get_search_aggregates
+from config import ROUTER_CONFIG, SEMANTIC_CACHE_CONFIG
+from history import get_history_store
+
+# Precompiled text patterns shared by the normalization helpers
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_SPECIAL_CHARS_PATTERN = re.compile(r'[^\w\s\?\!\.\,\-]')
+_WORD_PATTERN = re.compile(r'\b\w+\b')
+
+# Common stop words removed from keywords
+STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'what', 'when', 'where', 'why', 'how', 'who'})
+
+class QueryNormalizer:
+    """
+    Clean queries and extract their keywords with cached results
+    
+    Args:
+        stop_words (frozenset): Words never returned as keywords
+        min_keyword_length (int): Shortest word kept as a keyword
+        cache_size (int): Number of distinct queries remembered
+    """
+    
+    def __init__(self, stop_words: frozenset = STOP_WORDS, min_keyword_length: int = 3, cache_size: int = 4096):
+        self.stop_words = frozenset(stop_words)
+        self.min_keyword_length = min_keyword_length
+        self.normalize_and_tokenize = lru_cache(maxsize=cache_size)(self._normalize_and_tokenize)
+    
+    def _normalize_and_tokenize(self, query: str) -> Tuple[str, Tuple[str, ...]]:
+        """
+        Clean a query and extract its keywords
+        
+        Args:
+            query (str): Raw search query
+            
+        Returns:
+            Tuple[str, Tuple[str, ...]]: Cleaned query and its keywords
+        """
+        if not query:
+            return "", ()
+        
+        cleaned = _SPECIAL_CHARS_PATTERN.sub('', _WHITESPACE_PATTERN.sub(' ', query.strip()))
+        keywords = tuple(
+            word for word in _WORD_PATTERN.findall(query.lower())
+            if word not in self.stop_words and len(word) >= self.min_keyword_length
+        )
+        return cleaned, keywords
+    
+    def clean(self, query: str) -> str:
+        """Get the cleaned query"""
+        return self.normalize_and_tokenize(query)[0]
+    
+    def keywords(self, query: str) -> Tuple[str, ...]:
+        """Get the query keywords"""
+        return self.normalize_and_tokenize(query)[1]
+
+_default_normalizer = QueryNormalizer()
+
+def normalize_and_tokenize(query: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Clean a query and extract its keywords using the shared normalizer
+    
+    Args:
+        query (str): Raw search query
+        
+    Returns:
+        Tuple[str, Tuple[str, ...]]: Cleaned query and its keywords
+    """
+    return _default_normalizer.normalize_and_tokenize(query)
+
 def validate_api_key(api_key: str) -> bool:
     """
     Validate Groq API key format
@@ -35,16 +106,7 @@ def format_search_query(query: str) -> str:
     Returns:
         str: Formatted search query
     """
-    if not query:
-        return ""
-    
-    # Remove extra whitespace
-    query = re.sub(r'\s+', ' ', query.strip())
-    
-    # Remove special characters that might cause issues
-    query = re.sub(r'[^\w\s\?\!\.\,\-]', '', query)
-    
-    return query
+    return normalize_and_tokenize(query)[0]
 
 def extract_keywords(query: str) -> List[str]:
     """
@@ -56,16 +118,76 @@ def extract_keywords(query: str) -> List[str]:
     Returns:
         List[str]: List of extracted keywords
     """
-    # Remove common stop words
-    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'what', 'when', 'where', 'why', 'how', 'who'}
+    return list(normalize_and_tokenize(query)[1])
+
+def bm25_scores(query: str, results: List[str], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """
+    Score results against a query with BM25
     
-    # Extract words
-    words = re.findall(r'\b\w+\b', query.lower())
+    Term frequencies for the query keywords are held in a NumPy array of
+    shape (results, keywords) and IDF is computed over the given results.
     
-    # Filter out stop words and short words
-    keywords = [word for word in words if word not in stop_words and len(word) > 2]
+    Args:
+        query (str): Search query
+        results (List[str]): Result texts
+        k1 (float): Term frequency saturation
+        b (float): Document length normalization
+        
+    Returns:
+        List[float]: Unnormalized BM25 score per result
+    """
+    keywords = list(dict.fromkeys(extract_keywords(query))) if query else []
+    if not keywords or not results:
+        return [0.0] * len(results)
+    
+    column = {keyword: i for i, keyword in enumerate(keywords)}
+    tf = np.zeros((len(results), len(keywords)), dtype=np.float32)
+    lengths = np.zeros(len(results), dtype=np.float32)
+    
+    for row, text in enumerate(results):
+        words = Counter(_WORD_PATTERN.findall((text or '').lower()))
+        lengths[row] = sum(words.values())
+        for keyword, i in column.items():
+            tf[row, i] = words.get(keyword, 0)
+    
+    doc_freq = np.count_nonzero(tf, axis=0)
+    idf = np.log(1 + (len(results) - doc_freq + 0.5) / (doc_freq + 0.5))
+    avg_length = lengths.mean() or 1.0
+    norm = k1 * (1 - b + b * lengths / avg_length)
+    scores = (tf * (k1 + 1) / (tf + norm[:, np.newaxis])) @ idf
+    
+    return scores.tolist()
+
+def score_search_results(query: str, results: List[str], method: str = 'keyword') -> List[float]:
+    """
+    Score a batch of search results against one query
     
-    return keywords
+    Args:
+        query (str): Original search query
+        results (List[str]): Search result contents
+        method (str): 'keyword' for keyword overlap (0 to 1) or 'bm25'
+        
+    Returns:
+        List[float]: One score per result, in input order
+    """
+    if method == 'bm25':
+        return bm25_scores(query, results)
+    
+    keywords = extract_keywords(query) if query else []
+    if not keywords:
+        return [0.0] * len(results)
+    
+    # Keywords are counted once per query; each result is lowercased once
+    weighted = list(Counter(keywords).items())
+    scores = []
+    for result in results:
+        if not result:
+            scores.append(0.0)
+            continue
+        result_lower = result.lower()
+        matches = sum(count for keyword, count in weighted if keyword in result_lower)
+        scores.append(min(matches / len(keywords), 1.0))
+    return scores
 
 def calculate_search_score(query: str, result: str) -> float:
     """
@@ -81,19 +203,7 @@ def calculate_search_score(query: str, result: str) -> float:
     if not query or not result:
         return 0.0
     
-    query_keywords = extract_keywords(query)
-    result_lower = result.lower()
-    
-    if not query_keywords:
-        return 0.0
-    
-    # Count keyword matches
-    matches = sum(1 for keyword in query_keywords if keyword in result_lower)
-    
-    # Calculate score
-    score = matches / len(query_keywords)
-    
-    return min(score, 1.0)
+    return score_search_results(query, [result])[0]
 
 def format_timestamp(timestamp: str) -> str:
     """
@@ -150,35 +260,24 @@ def export_search_data(search_history: List[Dict], format_type: str = 'json') ->
     """
     Export search history in specified format
     
+    For large histories use export.iter_export or export.write_export, which
+    stream the rows instead of building one string.
+    
     Args:
         search_history (List[Dict]): List of search history items
-        format_type (str): Export format ('json' or 'csv')
+        format_type (str): Export format ('json', 'ndjson' or 'csv')
         
     Returns:
         str: Exported data as string
     """
-    if format_type == 'json':
-        return json.dumps(search_history, indent=2, default=str)
-    elif format_type == 'csv':
-        if not search_history:
-            return ""
-        
-        # Create CSV header
-        headers = ['timestamp', 'query', 'sources']
-        csv_lines = [','.join(headers)]
-        
-        # Add data rows
-        for item in search_history:
-            row = [
-                item.get('timestamp', ''),
-                f'"{item.get("query", "")}"',
-                f'"{",".join(item.get("sources", []))}"'
-            ]
-            csv_lines.append(','.join(row))
-        
-        return '\n'.join(csv_lines)
+    from export import iter_export
     
-    return ""
+    if format_type not in ('json', 'ndjson', 'csv'):
+        return ""
+    # An empty CSV export has no header row
+    if format_type == 'csv' and not search_history:
+        return ""
+    return b"".join(iter_export(search_history, format_type)).decode("utf-8")
 
 def get_search_suggestions(query: str) -> List[str]:
     """
@@ -221,6 +320,42 @@ def get_search_suggestions(query: str) -> List[str]:
     
     return suggestions[:5]  # Return top 5 suggestions
 
+def is_simple_factual_query(query: str) -> bool:
+    """
+    Detect short factual questions that one source and one LLM call can answer
+    
+    Args:
+        query (str): Search query
+        
+    Returns:
+        bool: True for queries like 'What is quantum computing?'
+    """
+    cleaned, keywords = normalize_and_tokenize(query)
+    text = cleaned.lower()
+    if not keywords or len(keywords) > ROUTER_CONFIG["max_keywords"]:
+        return False
+    if any(marker in f" {text} " for marker in ROUTER_CONFIG["complex_markers"]):
+        return False
+    return any(re.search(pattern, text) for pattern in ROUTER_CONFIG["simple_patterns"])
+
+def is_follow_up_query(query: str) -> bool:
+    """
+    Detect questions that only make sense with the earlier conversation
+    
+    Args:
+        query (str): Search query
+        
+    Returns:
+        bool: True for queries like 'how fast is it?' or 'what about Mars?',
+        and for queries without any keywords
+    """
+    cleaned, keywords = normalize_and_tokenize(query)
+    text = cleaned.lower()
+    if not keywords or text.startswith(tuple(SEMANTIC_CACHE_CONFIG["follow_up_prefixes"])):
+        return True
+    follow_up_words = SEMANTIC_CACHE_CONFIG["follow_up_words"]
+    return any(word in follow_up_words for word in _WORD_PATTERN.findall(text))
+
 def validate_search_sources(sources: List[str]) -> List[str]:
     """
     Validate and filter search sources
@@ -231,7 +366,7 @@ def validate_search_sources(sources: List[str]) -> List[str]:
     Returns:
         List[str]: Validated source names
     """
-    valid_sources = ['Wikipedia', 'ArXiv', 'Web Search']
+    valid_sources = ['Wikipedia', 'ArXiv', 'Web Search', 'Local Knowledge']
     return [source for source in sources if source in valid_sources]
 
 def create_progress_bar(current: int, total: int, label: str = "Progress") -> None:
@@ -247,61 +382,61 @@ def create_progress_bar(current: int, total: int, label: str = "Progress") -> No
         progress = current / total
         st.progress(progress, text=f"{label}: {current}/{total}")
 
-def log_search_activity(query: str, sources: List[str], success: bool = True) -> None:
+def log_search_activity(query: str, sources: List[str], success: bool = True, metrics: Optional[Dict[str, Any]] = None) -> None:
     """
-    Log search activity (placeholder for future logging implementation)
+    Record a search in the history store for the current browser session
     
     Args:
         query (str): Search query
         sources (List[str]): Search sources used
         success (bool): Whether search was successful
+        metrics (Optional[Dict[str, Any]]): Timing metrics recorded for the search
     """
-    # This could be extended to log to a file or database
-    timestamp = datetime.now().isoformat()
-    log_entry = {
-        'timestamp': timestamp,
-        'query': query,
-        'sources': sources,
-        'success': success
-    }
-    
-    # For now, just store in session state
-    if 'search_logs' not in st.session_state:
-        st.session_state.search_logs = []
+    get_history_store().record_search(
+        query,
+        sources,
+        session_id=st.session_state.get('session_id'),
+        success=success,
+        metrics=metrics
+    )
+    if 'search_aggregates' not in st.session_state:
+        st.session_state.search_aggregates = SearchAggregates()
+    st.session_state.search_aggregates.add(query, sources, success, metrics)
+    get_search_aggregates().add(query, sources, success, metrics)
+
+def calculate_percentiles(values: List[float], percentiles: Tuple[int, ...] = (50, 95, 99)) -> Dict[str, float]:
+    """
+    Calculate nearest-rank percentiles
     
-    st.session_state.search_logs.append(log_entry)
+    Args:
+        values (List[float]): Sample values
+        percentiles (Tuple[int, ...]): Percentiles to compute
+        
+    Returns:
+        Dict[str, float]: Values keyed 'p50', 'p95', ... (empty if no samples)
+    """
+    if not values:
+        return {}
+    
+    ordered = sorted(values)
+    result = {}
+    for percentile in percentiles:
+        rank = max(1, -(-percentile * len(ordered) // 100))
+        result[f'p{percentile}'] = ordered[rank - 1]
+    return result
 
 def get_search_statistics() -> Dict[str, Any]:
     """
-    Get search statistics from session state
+    Get search statistics for the current browser session
+    
+    Statistics come from running aggregates updated as each search is
+    logged, so this does not grow with the session.
     
     Returns:
         Dict[str, Any]: Search statistics
     """
-    stats = {
+    aggregates = st.session_state.get('search_aggregates') or SearchAggregates()
+    return {
         'total_searches': st.session_state.get('total_searches', 0),
-        'successful_searches': 0,
-        'failed_searches': 0,
-        'most_used_sources': {},
-        'average_query_length': 0
+        **aggregates.summary()
     }
-    
-    # Calculate statistics from search logs
-    if 'search_logs' in st.session_state:
-        logs = st.session_state.search_logs
-        stats['successful_searches'] = sum(1 for log in logs if log.get('success', False))
-        stats['failed_searches'] = len(logs) - stats['successful_searches']
-        
-        # Most used sources
-        source_counts = {}
-        query_lengths = []
-        
-        for log in logs:
-            for source in log.get('sources', []):
-                source_counts[source] = source_counts.get(source, 0) + 1
-            query_lengths.append(len(log.get('query', '')))
-        
-        stats['most_used_sources'] = source_counts
-        stats['average_query_length'] = sum(query_lengths) / len(query_lengths) if query_lengths else 0
-    
-    return stats